@@ -0,0 +1,81 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import matplotlib
+# No window: the charts are drawn with Agg, which does not need a display
+matplotlib.use("Agg")
+import chart
+from telemetry import load
+
+# Sessions of the log opened in this process (opened by start_process)
+sessions = None
+
+# Function to open the log and create the figure only once in every process
+def start_process(file_path):
+    global sessions
+    sessions = load(file_path)
+    chart.create_figure()
+
+# Function to get the image name of a session, like the ones of "Export Charts"
+def image_name(session, track):
+    """
+    Returns "{track}_{date}.png" with the date of the session instead of
+    the date of the export, so every session always gets the same name.
+    """
+    try:
+        date = datetime.strptime(session, "%d/%m/%Y %H:%M:%S.%f").strftime("%d-%m-%Y_%H-%M-%S")
+    except ValueError:
+        date = session.replace("/", "-").replace(":", "-").replace(" ", "_")
+    return f"{track}_{date}.png"
+
+# Function to draw every lap of a session and save it as an image
+def export_session(session, folder, dpi):
+    track = sessions.tracks.get(session) or "Unknown Track"
+    laps = sessions[session]
+    chart.draw_laps(session, track, laps, sorted(laps))
+    path = os.path.join(folder, image_name(session, track))
+    chart.fig.savefig(path, dpi=dpi, bbox_inches='tight', transparent=True)
+    return path
+
+# Export the charts of several sessions without opening the window
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exports without a window the charts of every session of the log (or of the chosen ones), splitting them among several processes")
+    parser.add_argument("log", help="Path of the telemetry log")
+    parser.add_argument("-o", "--output", default=chart.export_path, help="Folder where the images are saved")
+    parser.add_argument("-t", "--track", default=None, help="Export only the sessions of this track")
+    parser.add_argument("-s", "--session", action="append", default=None, help="Export only this session (can be repeated)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of processes (one per core by default; 1 = no processes)")
+    parser.add_argument("--dpi", type=int, default=300, help="Resolution of the images in dots per inch")
+    arguments = parser.parse_args()
+
+    export_start = time.perf_counter()
+
+    # Read first the sessions that are not in the cache, so every process only has to load them from it
+    start_process(arguments.log)
+    sessions.preload(arguments.workers)
+    chosen = [session for session, _ in sessions.find_sessions(arguments.track)
+              if arguments.session is None or session in arguments.session]
+    os.makedirs(arguments.output, exist_ok=True)
+
+    exported = 0
+    if arguments.workers == 1 or len(chosen) < 2:
+        for session in chosen:
+            try:
+                print(f"Chart exported as '{export_session(session, arguments.output, arguments.dpi)}'!")
+                exported += 1
+            except Exception as e:
+                print(f"Could not export session {session}: {e}")
+    else:
+        # Every process opens the log once and reuses its figure for all the sessions it gets
+        with ProcessPoolExecutor(max_workers=arguments.workers, initializer=start_process, initargs=(arguments.log,)) as pool:
+            futures = {pool.submit(export_session, session, arguments.output, arguments.dpi): session for session in chosen}
+            for future in as_completed(futures):
+                try:
+                    print(f"Chart exported as '{future.result()}'!")
+                    exported += 1
+                except Exception as e:
+                    print(f"Could not export session {futures[future]}: {e}")
+
+    print(f"{exported} of {len(chosen)} sessions exported in {time.perf_counter() - export_start:.2f} s")
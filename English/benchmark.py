@@ -0,0 +1,184 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+import matplotlib
+# No window: the charts are drawn with Agg, as in batch_export.py
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import numpy as np
+import batch_export
+import chart
+from generate_log import size_bytes, write_log
+from telemetry import cache_path, load
+
+# Name of the cache used for measuring (it does not touch the scripts' one)
+CACHE_NAME = "performance"
+
+# Function to measure a function several times and summarise the times
+def measure(function, repeats, times=1):
+    """
+    Calls function() `repeats` times and returns its times in seconds,
+    with the best one and the median. If `times` is greater than 1, every
+    repeat calls it `times` times and notes the average time of one call
+    (for measurements that are too short). What the scripts print is not
+    shown in the meantime.
+    """
+    results = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for _ in range(times):
+                function()
+            results.append((time.perf_counter() - start) / times)
+    return {"repeats": results, "best": min(results), "median": statistics.median(results)}
+
+# Function to get the version of the measured code
+def code_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Function to choose the session that takes the most bytes of the log
+def longest_session(sessions):
+    ranges = getattr(sessions, "ranges", {})
+    return max(sessions, key=lambda session: sum(end - start for start, _, end in ranges.get(session, [])))
+
+# Function to measure everything with a log
+def measure_log(file_path, session, repeats, dpi):
+    """
+    Measures reading the log (the index and a session, without cache and
+    with it), update_chart with a change of the lap selection, redrawing
+    the figure and the export to PNG. The English chart has no replay nor tooltips that look
+    up data, so those are not measured. Returns (log data, measurements).
+    """
+    measurements = {}
+
+    # Reading: the index and the session, first without cache and then from it
+    def index():
+        shutil.rmtree(cache_path(file_path, CACHE_NAME), ignore_errors=True)
+        return load(file_path, CACHE_NAME)
+    measurements["index"] = measure(index, repeats)
+    sessions = index()
+    session = session or longest_session(sessions)
+
+    def read_session():
+        new_sessions = index()
+        start = time.perf_counter()
+        new_sessions[session]
+        return time.perf_counter() - start
+    results = [read_session() for _ in range(repeats)]
+    measurements["read_session"] = {"repeats": results, "best": min(results), "median": statistics.median(results)}
+    measurements["index_with_cache"] = measure(lambda: load(file_path, CACHE_NAME), repeats)
+    measurements["load_session_cache"] = measure(lambda: load(file_path, CACHE_NAME)[session], repeats)
+
+    sessions = load(file_path, CACHE_NAME)
+    laps = sorted(sessions[session])
+    data = {
+        "path": os.path.abspath(file_path),
+        "bytes": os.path.getsize(file_path) if os.path.isfile(file_path) else None,
+        "sessions": len(sessions),
+        "session": session,
+        "session_bytes": sum(end - start for start, _, end in getattr(sessions, "ranges", {}).get(session, [])) or None,
+        "laps": len(laps),
+        "samples": sum(len(sessions[session][lap]["timestamps"]) for lap in laps),
+    }
+
+    # The chart, as in the window but with a canvas without display
+    chart.create_figure()
+    chart.canvas_fig = FigureCanvasAgg(chart.fig)
+    chart.sessions = sessions
+    chart.track_per_session = sessions.tracks
+    chart.selected_session = session
+
+    # Every repeat changes the selection: all the laps and only the odd ones, alternately
+    selections = itertools.cycle([laps[::2], laps])
+    measurements["update_chart"] = measure(lambda: chart.chart_laps(next(selections)), repeats)
+
+    # Only redrawing the figure, to tell what changing its data costs from what painting it costs
+    measurements["draw_figure"] = measure(chart.canvas_fig.draw, repeats)
+
+    # Export of the whole session to PNG, as batch_export.py does
+    batch_export.sessions = sessions
+    folder = tempfile.mkdtemp()
+    try:
+        measurements["export_png"] = measure(lambda: batch_export.export_session(session, folder, dpi), repeats)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    shutil.rmtree(cache_path(file_path, CACHE_NAME), ignore_errors=True)
+    return data, measurements
+
+# Function to compare the medians with the ones of another run
+def compare(measurements, previous_path, threshold=0.1):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    print(f"Comparison with '{previous_path}' ({previous.get('version') or 'no version'}):")
+    for name, measurement in measurements.items():
+        if name not in previous["measurements"]:
+            continue
+        before, now = previous["measurements"][name]["median"], measurement["median"]
+        ratio = now / before if before else float("inf")
+        warning = "  <- slower" if ratio > 1 + threshold else ""
+        print(f"  {name}: {before * 1000:.2f} ms -> {now * 1000:.2f} ms (x{ratio:.2f}){warning}")
+
+# Measure the scripts with a log (or a synthetic one) and save the results as JSON
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures reading the log, updating the chart and exporting it, and saves the times as JSON to compare them between versions")
+    parser.add_argument("log", nargs="?", default=None, help="Path of the telemetry log (if not given, a synthetic one is generated)")
+    parser.add_argument("-z", "--size", default="10MB", help="Size of the synthetic log")
+    parser.add_argument("-s", "--session", default=None, help="Session to measure (the longest one by default)")
+    parser.add_argument("-r", "--repeats", type=int, default=5, help="Repeats of each measurement")
+    parser.add_argument("--dpi", type=int, default=100, help="Resolution of the PNG export")
+    parser.add_argument("-o", "--output", default="performance.json", help="JSON file where the results are saved")
+    parser.add_argument("-c", "--compare", default=None, help="Previous results (JSON) to compare with")
+    arguments = parser.parse_args()
+
+    synthetic_folder = None
+    file_path = arguments.log
+    if file_path is None:
+        synthetic_folder = tempfile.mkdtemp()
+        file_path = os.path.join(synthetic_folder, "telemetrygta5.log")
+        print(f"Generating a synthetic log of {arguments.size}...")
+        write_log(file_path, size=size_bytes(arguments.size))
+
+    try:
+        log, measurements = measure_log(file_path, arguments.session, arguments.repeats, arguments.dpi)
+    finally:
+        if synthetic_folder:
+            shutil.rmtree(synthetic_folder, ignore_errors=True)
+    log["synthetic"] = synthetic_folder is not None
+
+    results = {
+        "version": code_version(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "system": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+        },
+        "log": log,
+        "measurements": measurements,
+    }
+    with open(arguments.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    print(f"Session {log['session']}: {log['laps']} laps, {log['samples']} samples")
+    for name, measurement in measurements.items():
+        print(f"  {name}: {measurement['median'] * 1000:.2f} ms (best {measurement['best'] * 1000:.2f} ms)")
+    print(f"Results saved to '{arguments.output}'")
+    if arguments.compare:
+        compare(measurements, arguments.compare)
@@ -0,0 +1,30 @@
+import argparse
+import shutil
+import time
+from telemetry import load, cache_path
+
+# Name of the cache used for measuring (it does not touch the scripts' one)
+CACHE_NAME = "benchmark"
+
+# Function to measure how long reading the whole log takes with `workers` processes
+def measure(file_path, workers):
+    shutil.rmtree(cache_path(file_path, CACHE_NAME), ignore_errors=True)
+    start = time.perf_counter()
+    sessions = load(file_path, CACHE_NAME)
+    sessions.preload(workers)
+    seconds = time.perf_counter() - start
+    shutil.rmtree(cache_path(file_path, CACHE_NAME), ignore_errors=True)
+    return seconds, len(sessions)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures the parallel read of the log with different numbers of processes")
+    parser.add_argument("log", help="Path of the telemetry log")
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Numbers of processes to try")
+    parser.add_argument("-r", "--repeats", type=int, default=3, help="Repeats of each measurement (the best one is kept)")
+    arguments = parser.parse_args()
+
+    base = None
+    for workers in arguments.workers:
+        seconds, count = min(measure(arguments.log, workers) for _ in range(arguments.repeats))
+        base = base or seconds
+        print(f"{workers} processes: {seconds:.2f} s ({count} sessions, x{base / seconds:.2f})")
@@ -1,17 +1,16 @@
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.gridspec as gridspec
-from matplotlib.ticker import FuncFormatter
+import time
+start_time = time.perf_counter()  # To measure how long the window takes to show up
 import tkinter as tk
 from tkinter import ttk
-import re
 from datetime import datetime
-import mplcursors
 import numpy as np
 import os
+import sys
+from telemetry import BackgroundLoad, time_seconds
+# Matplotlib, mplcursors and the 3D view are imported when first used, with the window already visible
 
-# File path
-file_path = r"C:\Users\pato\Desktop\scripts\Logs\telemetrygta5.log"
+# File path (another one can be passed as an argument)
+file_path = sys.argv[1] if len(sys.argv) > 1 else r"C:\Users\pato\Desktop\scripts\Logs\telemetrygta5.log"
 export_path = r"C:\Users\pato\Desktop\scripts\Logs\Exports"
 
 # Lists to store data
@@ -29,109 +28,23 @@ sessions = {}
 current_session = None
 track_per_session = {}  # Store track per session
 
-# Regular expressions to extract data
-time_pattern = re.compile(r"Date: (\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}\.\d{3})")
-speed_pattern = re.compile(r"Speed: ([\d,]+) km/h")
-brake_pattern = re.compile(r"Brake: ([\d,]+)%")
-rpm_pattern = re.compile(r"RPM: ([\d,]+)")
-gear_pattern = re.compile(r"Gear: (\d+)")
-lap_pattern = re.compile(r"Lap: (\d+)")
-track_pattern = re.compile(r"Track: (.+?) \| Lap:")
-position_pattern = re.compile(r"Position: \(([\d,-]+), ([\d,-]+), ([\d,-]+)\)")
-session_start_pattern = re.compile(r"=== Telemetry started (.+?) (.+?) (.+?) ===")
-
-# Function to clean the last line if it's a start record
-def clean_last_line_if_record(file_path, start_record):
-    if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-        with open(file_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        if lines and lines[-1].startswith(start_record):
-            lines.pop()
-            # If the new last line is blank, remove it too
-            if lines and lines[-1].strip() == "":
-                lines.pop()
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.writelines(lines)
-
-# Clean files if necessary
-clean_last_line_if_record(file_path, "=== Telemetry started")
-
-# Read and process the file
-with open(file_path, "r", encoding="utf-8") as file:
-    for line in file:
-        # Search for session start
-        session_match = session_start_pattern.search(line)
-        if session_match:
-            session_date = session_match.group(1).strip()  # Date
-            session_time = session_match.group(2).strip()  # Time
-            track = session_match.group(3).strip()      # Track
-            current_session = f"{session_date} {session_time}"  # Combine date and time
-            if current_session not in sessions:
-                sessions[current_session] = {}
-                track_per_session[current_session] = track
-            continue
+# Variables for live mode
+live_timer = None
+live_interval = 200  # ms between log reads (at most 5 refreshes per second)
+graphed_session = None  # Session drawn by the last full update
+graphed_laps = []  # Laps drawn by the last full update
 
-        # If we're not in any session, skip
-        if current_session is None:
-            continue
+# Variables for the 3D view, which shares the parsed sessions with the chart
+map3D_window = None
+map3D_view = None
 
-        # Search for track name
-        track_match = track_pattern.search(line)
-        if track_match:
-            track_per_session[current_session] = track_match.group(1).strip()
-
-        time_match = time_pattern.search(line)
-        speed_match = speed_pattern.search(line)
-        brake_match = brake_pattern.search(line)
-        rpm_match = rpm_pattern.search(line)
-        gear_match = gear_pattern.search(line)
-        lap_match = lap_pattern.search(line)
-        position_match = position_pattern.search(line)
-
-        if time_match:
-            current_timestamp = time_match.group(1)
-
-        if lap_match:
-            lap_number = int(lap_match.group(1))
-            if lap_number not in sessions[current_session]:
-                sessions[current_session][lap_number] = {
-                    "timestamps": [],
-                    "speeds": [],
-                    "brakes": [],
-                    "rpms": [],
-                    "gears": [],
-                    "durations": [],
-                    "positions": []
-                }
-            current_lap = lap_number
-
-        if speed_match and current_timestamp:
-            speed = float(speed_match.group(1).replace(",", "."))
-            time_object = datetime.strptime(current_timestamp, "%d/%m/%Y %H:%M:%S.%f")
-            sessions[current_session][current_lap]["timestamps"].append(time_object)
-            sessions[current_session][current_lap]["speeds"].append(speed)
-
-        if brake_match:
-            brake = float(brake_match.group(1).replace(",", "."))
-            sessions[current_session][current_lap]["brakes"].append(brake)
-
-        if rpm_match:
-            rpm = float(rpm_match.group(1).replace(",", "."))
-            sessions[current_session][current_lap]["rpms"].append(rpm)
-
-        if gear_match:
-            gear = int(gear_match.group(1))
-            sessions[current_session][current_lap]["gears"].append(gear)
-        
-        if position_match:
-            x = float(position_match.group(1).replace(",", "."))
-            y = float(position_match.group(2).replace(",", "."))
-            z = float(position_match.group(3).replace(",", "."))
-            
-            if current_lap in sessions[current_session]:
-                if "positions" not in sessions[current_session][current_lap]:
-                    sessions[current_session][current_lap]["positions"] = []
-                sessions[current_session][current_lap]["positions"].append((x, y, z))
+# Background load of the log (None once it has finished)
+log_load = None
+
+# Figure with every chart, created by create_figure()
+fig = None
+lap_lines = {}  # (axis, lap, marker) -> line of that lap, reused when the selection changes
+cursors = []  # Tooltips of the last update
 
 # Function to format seconds to mm:ss
 def seconds_to_minutes(seconds, pos):
@@ -139,74 +52,134 @@ def seconds_to_minutes(seconds, pos):
     seconds = int(seconds % 60)
     return f"{minutes:02d}:{seconds:02d}"
 
-# Calculate the duration of each data point relative to the start of the lap
-for session, lap_data in sessions.items():
-    for lap_number, data in lap_data.items():
-        if data["timestamps"]:
-            t0 = data["timestamps"][0]
-            data["durations"] = [(t - t0).total_seconds() for t in data["timestamps"]]
-
-# Create the figure using GridSpec with 11 rows:
-# Row 0: Lap times chart (line)
-# Row 1: Blank space for times chart
-# Row 2: Delta chart (bars, no title)
-# Row 3: Average speed
-# Row 4: Speed
-# Row 5: Brake
-# Row 6: RPM
-# Row 7: Gear
-# Row 8: G-Force (new)
-# Row 9: 2D Map
-# Row 10: (Final blank space, optional)
-fig = plt.figure(figsize=(12, 32))
-gs = gridspec.GridSpec(12, 1, height_ratios=[1, 0.2, 1, 1, 1, 1, 1, 1, 1, 0.4, 4, 1])
-plt.subplots_adjust(left=0.07, right=0.98, top=0.97, bottom=0, hspace=0.02)
-
-# Define each axis (we omit blank rows)
-ax0 = fig.add_subplot(gs[0])  # Lap times (line)
-ax1 = fig.add_subplot(gs[2])  # Delta (bars, no title)
-ax8 = fig.add_subplot(gs[3])  # Average speed
-ax2 = fig.add_subplot(gs[4])  # Speed
-ax3 = fig.add_subplot(gs[5])  # Brake
-ax4 = fig.add_subplot(gs[6])  # RPM
-ax5 = fig.add_subplot(gs[7])  # Gear
-ax7 = fig.add_subplot(gs[8])  # G-Force (new)
-ax6 = fig.add_subplot(gs[10])  # 2D Map
+# Function to create the figure and its axes (imports Matplotlib the first time)
+def create_figure():
+    global fig, gs, ax0, ax1, ax2, ax3, ax4, ax5, ax6, ax7, ax8, live_channels, lap_times_line, lap_lines
+    import matplotlib.pyplot as plt
+    import matplotlib.gridspec as gridspec
+    from matplotlib.ticker import FuncFormatter
+
+    # Create the figure using GridSpec with 11 rows:
+    # Row 0: Lap times chart (line)
+    # Row 1: Blank space for times chart
+    # Row 2: Delta chart (bars, no title)
+    # Row 3: Average speed
+    # Row 4: Speed
+    # Row 5: Brake
+    # Row 6: RPM
+    # Row 7: Gear
+    # Row 8: G-Force (new)
+    # Row 9: 2D Map
+    # Row 10: (Final blank space, optional)
+    fig = plt.figure(figsize=(12, 32))
+    gs = gridspec.GridSpec(12, 1, height_ratios=[1, 0.2, 1, 1, 1, 1, 1, 1, 1, 0.4, 4, 1])
+    plt.subplots_adjust(left=0.07, right=0.98, top=0.97, bottom=0, hspace=0.02)
+
+    # Define each axis (we omit blank rows)
+    ax0 = fig.add_subplot(gs[0])  # Lap times (line)
+    ax1 = fig.add_subplot(gs[2])  # Delta (bars, no title)
+    ax8 = fig.add_subplot(gs[3])  # Average speed
+    ax2 = fig.add_subplot(gs[4])  # Speed
+    ax3 = fig.add_subplot(gs[5])  # Brake
+    ax4 = fig.add_subplot(gs[6])  # RPM
+    ax5 = fig.add_subplot(gs[7])  # Gear
+    ax7 = fig.add_subplot(gs[8])  # G-Force (new)
+    ax6 = fig.add_subplot(gs[10])  # 2D Map
+
+    # Channel drawn by each time chart, to update its lines in live mode
+    live_channels = {
+        ax2: "speeds",
+        ax3: "brakes",
+        ax4: "rpms",
+        ax5: "gears"
+    }
+    lap_lines = {}
+
+    # Labels, grids and formats of the axes, which do not change when the laps change:
+    # updates only change the data of the lines and the limits
+    lap_times_line, = ax0.plot([], [], marker='o', linestyle='-', color='tab:orange', label="Lap time")
+    ax0.yaxis.set_major_formatter(FuncFormatter(seconds_to_minutes))
+    ax0.set_xlabel("Lap")
+    ax0.set_ylabel("Time (M:SS)")
+    ax0.grid()
+    ax0.legend()
 
-def update_chart():
-    global selected_session
+    ax1.set_ylabel("Delta (s)")
+    ax1.grid(axis="y")
+    ax1.set_xticks([])
 
-    print("Updating chart...")
-    selected_laps = listbox_laps.curselection()
-    
-    print(f"Selected session: {selected_session}")
-    print(f"Selected laps: {selected_laps}")
-    
-    if not selected_session or not selected_laps:
-        print("No session or laps selected.")
-        return
-    
-    # Get current session and track (use selected_session)
-    current_track = track_per_session.get(selected_session, "Unknown Track")
-    lap_data_session = sessions[selected_session]
+    ax8.set_ylabel("Average Speed (km/h)")
+    ax8.grid(axis="y")
+    ax8.set_xticks([])
 
-    print(f"Current session: {selected_session}")
-    print(f"Current track: {current_track}")
-    print(f"Session data: {lap_data_session.keys()}")
-    
-    # Clear ALL axes
-    for ax in [ax0, ax1, ax2, ax3, ax4, ax5, ax7, ax6, ax8]:
-        ax.cla()
+    # Speed, brake, RPM, gear and G-Force charts, with X labels only on the bottom one
+    labels = {
+        ax2: "Speed (km/h)",
+        ax3: "Brake (%)",
+        ax4: "RPM",
+        ax5: "Gear",
+        ax7: "G-Force"
+    }
+    for ax, label in labels.items():
+        ax.xaxis.set_major_formatter(FuncFormatter(seconds_to_minutes))
+        ax.set_ylabel(label)
+        ax.grid()
+        if ax is not ax7:
+            ax.set_xticks([])
+    ax7.set_xlabel("Time (s)")
+
+    # 2D map
+    ax6.set_aspect('equal')
+    ax6.set_facecolor('none')
+    ax6.grid(False)
+    ax6.set_xticks([])
+    ax6.set_yticks([])
+    ax6.set_title("Trajectories")
+    for spine in ax6.spines.values():
+        spine.set_visible(False)
+
+# Function to get the line of a lap on an axis, which is created the first time that lap is drawn
+def lap_line(ax, lap_number, marker=None, **style):
+    """
+    Without a marker it is the line of the lap data; with a marker ('o' or
+    's'), the start or end point of its trajectory, which is not in the
+    legend.
+    """
+    key = (ax, lap_number, marker)
+    if key not in lap_lines:
+        if marker is None:
+            lap_lines[key], = ax.plot([], [], label=f"Lap {lap_number}", **style)
+        else:
+            lap_lines[key], = ax.plot([], [], marker=marker, markersize=7, markeredgecolor='black',
+                                      linestyle='none', zorder=3, label=f"_Lap {lap_number}")
+    return lap_lines[key]
+
+# Function to put the data and color of a lap on its line and show it
+def show_line(ax, lap_number, x, y, color, marker=None, **style):
+    line = lap_line(ax, lap_number, marker, **style)
+    line.set_data(x, y)
+    line.set_color(color)
+    line.set_visible(True)
+    return line
+
+# Function to draw the laps of a session on the figure, without using the window (batch_export.py uses it too)
+def draw_laps(session, current_track, lap_data_session, selected_laps_list):
+    """
+    The laps reuse their lines from the previous update (only their data,
+    color and visibility change) and the axes keep their labels and grids.
+    """
+    import matplotlib.pyplot as plt
+
+    # Hide the lines of every lap; the ones of the selected laps are shown again with their data
+    for line in lap_lines.values():
+        line.set_visible(False)
+    for ax in [ax1, ax8]:
+        for bars in ax.containers[:]:
+            bars.remove()
     
     colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
 
     # Calculate common start and end for speed, brake, RPM and gear charts
-    selected_laps_list = []
-    for idx in selected_laps:
-        lap_text = listbox_laps.get(idx)
-        lap_number = int(lap_text.split()[1])
-        selected_laps_list.append(lap_number)
-
     start = min([lap_data_session[lap_number]["durations"][0] for lap_number in selected_laps_list if lap_number in lap_data_session and lap_data_session[lap_number]["durations"]], default=0)
     end = max([lap_data_session[lap_number]["durations"][-1] for lap_number in selected_laps_list if lap_number in lap_data_session and lap_data_session[lap_number]["durations"]], default=1)
     
@@ -219,6 +192,7 @@ def update_chart():
     lap_times = []
     lap_numbers_speed = []
     average_speeds = []
+    min_gear, max_gear = np.inf, -np.inf
 
     for idx, lap_number in enumerate(selected_laps_list):
         if lap_number not in lap_data_session:
@@ -227,23 +201,17 @@ def update_chart():
         color = colors[idx % len(colors)]
         
         # Plot on speed, brake, RPM and gear charts
-        try:
-            print(f"Duration length for lap {lap_number}: {len(lap_data_session[lap_number]['durations'])}")
-            print(f"Speed length for lap {lap_number}: {len(lap_data_session[lap_number]['speeds'])}")
-            ax2.plot(lap_data_session[lap_number]["durations"], lap_data_session[lap_number]["speeds"],
-                     color=color, alpha=0.7, label=f"Lap {lap_number}")
-            ax3.plot(lap_data_session[lap_number]["durations"], lap_data_session[lap_number]["brakes"],
-                     color=color, alpha=0.7, label=f"Lap {lap_number}")
-            ax4.plot(lap_data_session[lap_number]["durations"], lap_data_session[lap_number]["rpms"],
-                     color=color, alpha=0.7, label=f"Lap {lap_number}")
-            ax5.plot(lap_data_session[lap_number]["durations"], lap_data_session[lap_number]["gears"],
-                     color=color, alpha=0.7, label=f"Lap {lap_number}")
-        except Exception as e:
-            print(f"Error plotting lap {lap_number}: {e}")
+        print(f"Duration length for lap {lap_number}: {len(lap_data_session[lap_number]['durations'])}")
+        print(f"Speed length for lap {lap_number}: {len(lap_data_session[lap_number]['speeds'])}")
+        for ax, channel in live_channels.items():
+            show_line(ax, lap_number, lap_data_session[lap_number]["durations"], lap_data_session[lap_number][channel], color, alpha=0.7)
         
-        if lap_data_session[lap_number]["gears"]:
-            ax5.set_yticks(range(int(min(lap_data_session[lap_number]["gears"])),
-                                 int(max(lap_data_session[lap_number]["gears"])) + 1))
+        # Samples without gear are NaN
+        gears = np.array(lap_data_session[lap_number]["gears"], dtype=float)
+        gears = gears[~np.isnan(gears)]
+        if len(gears):
+            min_gear = min(min_gear, gears.min())
+            max_gear = max(max_gear, gears.max())
         
         # Collect data for lap times chart and delta chart
         if lap_data_session[lap_number]["durations"]:
@@ -254,128 +222,135 @@ def update_chart():
             lap_times.append(total_time)
 
         # Calculate average speed for this lap
-        if lap_number in lap_data_session and lap_data_session[lap_number]["speeds"]:
-            average_speed = np.mean(lap_data_session[lap_number]["speeds"])
+        if lap_data_session[lap_number]["speeds"] and not np.isnan(lap_data_session[lap_number]["speeds"]).all():
+            average_speed = np.nanmean(lap_data_session[lap_number]["speeds"])
             lap_numbers_speed.append(lap_number)
             average_speeds.append(average_speed)
 
+    # Gear ticks
+    if np.isfinite(min_gear):
+        ax5.set_yticks(range(int(min_gear), int(max_gear) + 1))
+    else:
+        ax5.yaxis.set_major_locator(plt.AutoLocator())
+
     # Lap times chart (ax0)
-    if lap_numbers_line:
-        ax0.plot(lap_numbers_line, total_times, marker='o', linestyle='-',
-                color='tab:orange', label="Lap time")
-        
-        ax0.yaxis.set_major_formatter(FuncFormatter(seconds_to_minutes))
-        
-    ax0.set_xlabel("Lap")
-    ax0.set_ylabel("Time (M:SS)")
-    ax0.grid()
-    ax0.legend()
+    lap_times_line.set_data(lap_numbers_line, total_times)
 
     # Delta chart (ax1): difference between each lap and the best lap (no title)
     if lap_times:
         best_time = min(lap_times)
         deltas = [t - best_time for t in lap_times]
         ax1.bar(lap_numbers_delta, deltas, color='tab:red')
-    ax1.set_ylabel("Delta (s)")
-    ax1.grid(axis="y")
-    ax1.set_xticks([])
-
-    # Configuration of speed, brake, RPM and gear charts
-    for ax in [ax2, ax3, ax4, ax5, ax7]:
-        ax.set_xlim(start, end)
-        ax.xaxis.set_major_formatter(FuncFormatter(seconds_to_minutes))
-    ax2.set_xticks([])
-    ax3.set_xticks([])
-    ax4.set_xticks([])
-    ax5.set_xticks([])
-
-    ax2.set_ylabel("Speed (km/h)")
-    ax2.grid()
-
-    ax3.set_ylabel("Brake (%)")
-    ax3.grid()
-
-    ax4.set_ylabel("RPM")
-    ax4.grid()
-
-    ax5.set_ylabel("Gear")
-    ax5.grid()
 
     # Average speed per lap chart (ax8)
     if lap_numbers_speed:
-        bars = ax8.bar(lap_numbers_speed, average_speeds, color=colors[:len(lap_numbers_speed)])
-        
-        # Add value labels
-        for bar in bars:
-            bar.get_height()
-    
-    ax8.set_ylabel("Average Speed (km/h)")
-    ax8.grid(axis="y")
-    ax8.set_xticks([])
+        ax8.bar(lap_numbers_speed, average_speeds, color=colors[:len(lap_numbers_speed)])
 
-    # New chart: G-Force (ax7)
+    # G-Force (ax7)
     # Calculate acceleration (m/s²) from speed (km/h converted to m/s)
     # and divide by 9.81 to get G-Force.
     for idx, lap_number in enumerate(selected_laps_list):
         if lap_number not in lap_data_session:
             continue
         color = colors[idx % len(colors)]
-        speed_list = lap_data_session[lap_number]["speeds"]
-        duration_list = lap_data_session[lap_number]["durations"]
-        if len(speed_list) >= 2 and len(duration_list) >= 2:
-            speeds_mps = np.array(speed_list) * 1000/3600  # Convert to m/s
-            durations = np.array(duration_list)
+        # Only the samples with speed (the others are NaN)
+        speed_list = np.array(lap_data_session[lap_number]["speeds"], dtype=float)
+        with_speed = ~np.isnan(speed_list)
+        if np.count_nonzero(with_speed) >= 2:
+            speeds_mps = speed_list[with_speed] * 1000/3600  # Convert to m/s
+            durations = np.array(lap_data_session[lap_number]["durations"])[with_speed]
             # Calculate acceleration using finite differences
             acceleration = np.diff(speeds_mps) / np.diff(durations)
             # Time at midpoints
             mid_times = (durations[:-1] + durations[1:]) / 2
             g_force = acceleration / 9.81
-            ax7.plot(mid_times, g_force, color=color, alpha=0.7, label=f"Lap {lap_number}")
-    ax7.set_xlabel("Time (s)")
-    ax7.set_ylabel("G-Force")
-    ax7.grid()
+            show_line(ax7, lap_number, mid_times, g_force, color, alpha=0.7)
 
-    # Draw 2D map (ax6)
-    ax6.set_aspect('equal')
-    ax6.set_facecolor('none')
-    ax6.grid(False)
-    ax6.set_xticks([])
-    ax6.set_yticks([])
-    ax6.set_title("Trajectories")
-    for spine in ax6.spines.values():
-        spine.set_visible(False)
-    
-    # Draw trajectories on the map
+    # Limits of the per lap charts and of the time charts (the Y axis fits the visible lines)
+    for ax in [ax0, ax1, ax8]:
+        ax.relim(visible_only=True)
+        ax.autoscale_view()
+    for ax in [ax2, ax3, ax4, ax5, ax7]:
+        ax.set_xlim(start, end)
+        ax.relim(visible_only=True)
+        ax.autoscale_view(scalex=False)
+
+    # Draw trajectories on the map (ax6)
+    trajectories = []
     for idx, lap_number in enumerate(selected_laps_list):
         if lap_number not in lap_data_session:
             continue
         color = colors[idx % len(colors)]
         if "positions" in lap_data_session[lap_number]:
-            positions = lap_data_session[lap_number]["positions"]
-            x = [p[0] for p in positions]
-            y = [p[1] for p in positions]
-            ax6.plot(x, y, color=color, alpha=0.7, linewidth=2, label=f"Lap {lap_number}")
-            if x and y:
-                ax6.scatter(x[0], y[0], color=color, marker='o', s=50,
-                           edgecolor='black', zorder=3)
-                ax6.scatter(x[-1], y[-1], color=color, marker='s', s=50,
-                           edgecolor='black', zorder=3)
+            positions = np.array(lap_data_session[lap_number]["positions"], dtype=float).reshape(-1, 3)
+            x = positions[:, 0]
+            y = positions[:, 1]
+            trajectories.append(show_line(ax6, lap_number, x, y, color, alpha=0.7, linewidth=2))
+            # Samples without position (NaN) break the line; start and end are the first and last with one
+            with_position = np.flatnonzero(~np.isnan(x))
+            if len(with_position):
+                show_line(ax6, lap_number, x[with_position[:1]], y[with_position[:1]], color, marker='o')
+                show_line(ax6, lap_number, x[with_position[-1:]], y[with_position[-1:]], color, marker='s')
     
     # Adjust map limits with 1% margin
-    all_x = [p[0] for lap_number in selected_laps_list if lap_number in lap_data_session and "positions" in lap_data_session[lap_number] for p in lap_data_session[lap_number]["positions"]]
-    all_y = [p[1] for lap_number in selected_laps_list if lap_number in lap_data_session and "positions" in lap_data_session[lap_number] for p in lap_data_session[lap_number]["positions"]]
-    if all_x and all_y:
-        margin_x = (max(all_x) - min(all_x)) * 0.01
-        margin_y = (max(all_y) - min(all_y)) * 0.01
-        ax6.set_xlim(min(all_x) - margin_x, max(all_x) + margin_x)
-        ax6.set_ylim(min(all_y) - margin_y, max(all_y) + margin_y)
+    all_x = np.array([p[0] for lap_number in selected_laps_list if lap_number in lap_data_session and "positions" in lap_data_session[lap_number] for p in lap_data_session[lap_number]["positions"]], dtype=float)
+    all_y = np.array([p[1] for lap_number in selected_laps_list if lap_number in lap_data_session and "positions" in lap_data_session[lap_number] for p in lap_data_session[lap_number]["positions"]], dtype=float)
+    all_x = all_x[~np.isnan(all_x)]
+    all_y = all_y[~np.isnan(all_y)]
+    if len(all_x) and len(all_y):
+        margin_x = (all_x.max() - all_x.min()) * 0.01
+        margin_y = (all_y.max() - all_y.min()) * 0.01
+        ax6.set_xlim(all_x.min() - margin_x, all_x.max() + margin_x)
+        ax6.set_ylim(all_y.min() - margin_y, all_y.max() + margin_y)
     
-    ax6.legend(loc='upper center', bbox_to_anchor=(0.5, -0.1), ncol=7, frameon=True, framealpha=0.8)
+    # The legend only has the visible trajectories, in the order of the selection
+    ax6.legend(handles=trajectories, loc='upper center', bbox_to_anchor=(0.5, -0.1), ncol=7, frameon=True, framealpha=0.8)
     
-    fig.suptitle(f"Session: {current_session} | Track: {current_track}", 
+    fig.suptitle(f"Session: {session} | Track: {current_track}", 
                  fontsize=14, fontweight="bold")
+
+def update_chart():
+    print("Updating chart...")
+    selected_laps = listbox_laps.curselection()
+    
+    print(f"Selected session: {selected_session}")
+    print(f"Selected laps: {selected_laps}")
+    
+    if not selected_session or not selected_laps:
+        print("No session or laps selected.")
+        return
+    
+    # Get current session and track (use selected_session)
+    current_track = track_per_session.get(selected_session, "Unknown Track")
+
+    print(f"Current session: {selected_session}")
+    print(f"Current track: {current_track}")
     
-    # Configure tooltips (with mplcursors) for some charts
+    # Numbers of the selected laps
+    selected_laps_list = []
+    for idx in selected_laps:
+        lap_text = listbox_laps.get(idx)
+        lap_number = int(lap_text.split()[1])
+        selected_laps_list.append(lap_number)
+
+    chart_laps(selected_laps_list)
+
+# Function to draw the chosen laps of the selected session and set up their tooltips (benchmark.py uses it too)
+def chart_laps(selected_laps_list):
+    global graphed_session, graphed_laps
+    import mplcursors
+
+    current_track = track_per_session.get(selected_session, "Unknown Track")
+
+    # Only the samples of the laps that are going to be drawn are loaded
+    lap_data_session = sessions.laps(selected_session, selected_laps_list)
+    print(f"Session data: {lap_data_session.keys()}")
+
+    draw_laps(selected_session, current_track, lap_data_session, selected_laps_list)
+
+    # Configure tooltips (with mplcursors) for some charts, replacing the ones of the previous update
+    for cursor in cursors:
+        cursor.remove()
     cursor0 = mplcursors.cursor(ax0, hover=True)
     cursor0.connect("add", lambda sel: sel.annotation.set_text(
         f"Lap: {sel.target[0]:.0f}\nTime: {sel.target[1]:.2f} s"))
@@ -402,9 +377,13 @@ def update_chart():
         f"Lap: {sel.target[0]:.0f}\nAverage Speed: {sel.target[1]:.2f} km/h"))
     cursor6 = mplcursors.cursor(ax6, hover=True)
     cursor6.connect("add", lambda sel: sel.annotation.set_text(
-        sel.artist.get_label()))
+        sel.artist.get_label().lstrip("_")))
+    cursors[:] = [cursor0, cursor1, cursor2, cursor3, cursor4, cursor5, cursor6, cursor7, cursor8]
     
+    graphed_session = selected_session
+    graphed_laps = selected_laps_list
     canvas_fig.draw()
+    show_map3D()
 
 # Function to export the chart (add at the beginning of the code, along with other functions)
 def export_chart(fig, track_name):
@@ -431,65 +410,225 @@ def load_laps(event=None):
     selected_session = current_session
     
     # Update laps listbox
+    fill_laps()
+
+# Function to get the track chosen in the filter (None if all of them)
+def chosen_track():
+    track = combo_tracks.get()
+    return None if track in ("", "All") else track
+
+# Function to get the maximum lap time typed in the filter (None if there is no valid one)
+def chosen_max_time():
+    try:
+        return time_seconds(entry_max_time.get()) if entry_max_time.get().strip() else None
+    except ValueError:
+        return None
+
+# Function to get the numbers of the selected laps
+def selected_lap_numbers():
+    return [int(listbox_laps.get(idx).split()[1]) for idx in listbox_laps.curselection()]
+
+# Function to fill the sessions list with the ones of the catalog that pass the filter
+def fill_sessions():
+    global available_sessions
+    combo_tracks["values"] = ["All"] + sessions.find_tracks()
+    rows = sessions.find_sessions(chosen_track())  # From most recent to oldest
+    available_sessions = [session for session, _ in rows]
+    listbox_sessions.delete(0, tk.END)
+    for session, track in rows:
+        listbox_sessions.insert(tk.END, f"{session} - {track or 'Unknown Track'}")
+    if selected_session in available_sessions:
+        listbox_sessions.select_set(available_sessions.index(selected_session))
+
+# Function to fill the laps list of the session with the ones of the catalog that pass the filter
+def fill_laps(selected=()):
     listbox_laps.delete(0, tk.END)
-    laps = sorted(sessions[current_session].keys())
-    for lap in laps:
-        listbox_laps.insert(tk.END, f"Lap {lap}")
-
-# Create graphical interface
-root = tk.Tk()
-selected_session = None
-root.title("Telemetry Charts")
-root.geometry("1200x900")
-screen_width = root.winfo_screenwidth()
-screen_height = root.winfo_screenheight()
-x = (screen_width - 1200) // 2
-y = (screen_height - 900) // 2
-root.geometry(f"+{x}+{y}")
-
-control_frame = tk.Frame(root)
-control_frame.pack(side=tk.TOP, fill=tk.X)
-
-# Add ListBox for sessions
-tk.Label(control_frame, text="Sessions:").pack(side=tk.LEFT, padx=1, pady=1)
-listbox_sessions = tk.Listbox(control_frame, selectmode=tk.SINGLE, width=40)
-available_sessions = sorted(sessions.keys(), reverse=True)  # Sort from most recent to oldest
-for session in available_sessions:
-    track = track_per_session.get(session, "Unknown Track")
-    listbox_sessions.insert(tk.END, f"{session} - {track}")
-listbox_sessions.pack(side=tk.LEFT, padx=1, pady=1)
-
-listbox_sessions.bind("<<ListboxSelect>>", load_laps)
-
-# ListBox for laps
-tk.Label(control_frame, text="Laps:").pack(side=tk.LEFT, padx=1, pady=1)
-listbox_laps = tk.Listbox(control_frame, selectmode=tk.MULTIPLE)
-listbox_laps.pack(side=tk.LEFT, padx=1, pady=1)
-tk.Button(control_frame, text="Update", command=update_chart).pack(side=tk.LEFT, padx=0, pady=0)
-
-export_button = tk.Button(control_frame, text="Export Charts", command=lambda: export_chart(fig, track_per_session.get(selected_session.split(" - ")[0])))
-export_button.pack(side=tk.RIGHT, padx=5)
-
-canvas = tk.Canvas(root)
-canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL, command=canvas.yview)
-scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-canvas.configure(yscrollcommand=scrollbar.set)
-canvas.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-
-frame = ttk.Frame(canvas)
-canvas.create_window((0, 0), window=frame, anchor="nw")
-canvas_fig = FigureCanvasTkAgg(fig, master=frame)
-canvas_fig.draw()
-canvas_fig.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-# Select last session by default if exists and select all laps
-if available_sessions:
-    listbox_sessions.select_set(0)
-    load_laps()
-    for i in range(listbox_laps.size()):
-        listbox_laps.select_set(i)
-    update_chart()
+    for row in sessions.find_laps(current_session, max_time=chosen_max_time()):
+        text = f"Lap {row['lap']}"
+        if row["complete"]:
+            text += f" - {int(row['time'] // 60):02d}:{row['time'] % 60:06.3f}"
+        listbox_laps.insert(tk.END, text)
+        if row["lap"] in selected:
+            listbox_laps.select_set(tk.END)
+
+# Function to filter the lists again when the track or the maximum time changes
+def filter_lists(event=None):
+    if log_load is not None:
+        return
+    selected = selected_lap_numbers()
+    fill_sessions()
+    if current_session is not None:
+        fill_laps(selected)
+
+# Function to turn live mode on or off
+def toggle_live():
+    global live_timer
+    if live_mode.get():
+        follow_log()
+    elif live_timer:
+        root.after_cancel(live_timer)
+        live_timer = None
+
+# Function to read what the game has appended to the log and show it
+def follow_log():
+    global live_timer
+    live_timer = None
+    if not live_mode.get():
+        return
+
+    # While the log is being indexed there is nothing to follow yet
+    if log_load is not None:
+        live_timer = root.after(live_interval, follow_log)
+        return
+
+    live_session = sessions.last_session()
+    new_sessions = sessions.update()
+    if new_sessions:
+        refresh_live(new_sessions, selected_session in (None, live_session))
+
+    # Reads are batched per interval, not per sample, to bound the refresh rate
+    live_timer = root.after(live_interval, follow_log)
+
+# Function to show the new samples redrawing only what is needed
+def refresh_live(new_sessions, following):
+    # Add the new sessions to the list without losing the selection
+    if [session for session, _ in sessions.find_sessions(chosen_track())] != available_sessions:
+        selected_laps = listbox_laps.curselection()
+        fill_sessions()
+        for idx in selected_laps:
+            listbox_laps.select_set(idx)
+
+    # If the live session was being watched and the game started another one (that passes the filter), switch to it
+    live_session = sessions.last_session()
+    if following and live_session in available_sessions and live_session != selected_session:
+        listbox_sessions.selection_clear(0, tk.END)
+        listbox_sessions.select_set(available_sessions.index(live_session))
+        load_laps()
+        listbox_laps.select_set(0, tk.END)
+        update_chart()
+        return
+
+    if selected_session not in new_sessions:
+        return
+
+    # New laps in the selected session (or that now pass the filter): add them and redraw everything
+    listed_laps = [int(listbox_laps.get(idx).split()[1]) for idx in range(listbox_laps.size())]
+    catalog_laps = [row["lap"] for row in sessions.find_laps(selected_session, max_time=chosen_max_time())]
+    if catalog_laps != listed_laps:
+        fill_laps(selected_lap_numbers() + [lap for lap in catalog_laps if lap not in listed_laps])
+        update_chart()
+        return
+
+    if selected_session != graphed_session:
+        return
+
+    # Only laps already drawn have grown: update the data of their lines
+    lap_data_session = sessions[selected_session]
+    end = ax2.get_xlim()[1]
+    for ax, channel in live_channels.items():
+        for lap_number in new_sessions[selected_session]:
+            line = lap_lines.get((ax, lap_number, None))
+            if line is None or not line.get_visible():
+                continue
+            durations = lap_data_session[lap_number]["durations"]
+            # Every channel has one row per sample, even if the sample is half written
+            line.set_data(durations, lap_data_session[lap_number][channel])
+            if durations:
+                end = max(end, durations[-1])
+        ax.relim(visible_only=True)
+        ax.autoscale_view(scalex=False)
+
+    for ax in [ax2, ax3, ax4, ax5, ax7]:
+        ax.set_xlim(ax.get_xlim()[0], end)
+
+    # Trajectory on the map, widening the limits if the car leaves them
+    for lap_number in new_sessions[selected_session]:
+        line = lap_lines.get((ax6, lap_number, None))
+        if line is None or not line.get_visible():
+            continue
+        positions = np.array(lap_data_session[lap_number]["positions"], dtype=float).reshape(-1, 3)
+        if np.isnan(positions[:, 0]).all():
+            continue
+        x = positions[:, 0]
+        y = positions[:, 1]
+        line.set_data(x, y)
+        min_x, max_x = ax6.get_xlim()
+        min_y, max_y = ax6.get_ylim()
+        ax6.set_xlim(min(min_x, np.nanmin(x)), max(max_x, np.nanmax(x)))
+        ax6.set_ylim(min(min_y, np.nanmin(y)), max(max_y, np.nanmax(y)))
+
+    canvas_fig.draw_idle()
+    if map3D_view is not None:
+        map3D_view.refresh(new_sessions[selected_session])
+
+# Function to open the 3D view, which follows the session and laps of the chart
+def open_map3D():
+    global map3D_window, map3D_view
+    if log_load is not None:
+        return
+    if map3D_window is not None:
+        map3D_window.lift()
+        return
+    from map3D_view import Map3DView
+    map3D_window = tk.Toplevel(root)
+    map3D_window.title("3D Telemetry Visualization")
+    map3D_window.geometry("1000x800")
+    map3D_window.protocol("WM_DELETE_WINDOW", close_map3D)
+    map3D_view = Map3DView(map3D_window, sessions, track_per_session)
+    show_map3D()
+
+# Function to close the 3D view
+def close_map3D():
+    global map3D_window, map3D_view
+    map3D_window.destroy()
+    map3D_window = None
+    map3D_view = None
+
+# Function to draw in the 3D view the laps of the chart, with the same colors
+def show_map3D():
+    if map3D_view is None or graphed_session is None:
+        return
+    import matplotlib.pyplot as plt
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    map3D_view.show(graphed_session, graphed_laps, [colors[idx % len(colors)] for idx in range(len(graphed_laps))])
+
+# Function to create the figure inside the window
+def show_figure():
+    global canvas_fig
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    create_figure()
+    canvas_fig = FigureCanvasTkAgg(fig, master=frame)
+    canvas_fig.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+# Function to show the progress of the log load and, when it finishes, fill the lists and draw the last session
+def check_load():
+    global log_load, sessions, track_per_session
+    if not log_load.done():
+        load_bar["value"] = log_load.progress * 100
+        root.after(50, check_load)
+        return
+    if log_load.error is not None:
+        load_label.config(text=f"Could not read the log: {log_load.error}")
+        load_bar.pack_forget()
+        return
+
+    sessions = log_load.sessions
+    track_per_session = sessions.tracks
+    log_load = None
+    print(f"Index of {len(sessions)} sessions ready in {time.perf_counter() - start_time:.2f} s")
+    load_frame.pack_forget()
+    fill_sessions()
+
+    # Select last session by default if exists and select all laps
+    if available_sessions:
+        listbox_sessions.select_set(0)
+        load_laps()
+        for i in range(listbox_laps.size()):
+            listbox_laps.select_set(i)
+        update_chart()
+    else:
+        canvas_fig.draw()
+    print(f"Chart ready in {time.perf_counter() - start_time:.2f} s")
 
 # Function to close the console
 def close_program():
@@ -498,7 +637,86 @@ def close_program():
     # Close Python interpreter
     exit()
 
-# Assign close function to window close event
-root.protocol("WM_DELETE_WINDOW", close_program)
-
-root.mainloop()
\ No newline at end of file
+# Create graphical interface (only when running the script: batch_export.py imports the drawing functions without opening any window)
+if __name__ == "__main__":
+    root = tk.Tk()
+    selected_session = None
+    root.title("Telemetry Charts")
+    root.geometry("1200x900")
+    screen_width = root.winfo_screenwidth()
+    screen_height = root.winfo_screenheight()
+    x = (screen_width - 1200) // 2
+    y = (screen_height - 900) // 2
+    root.geometry(f"+{x}+{y}")
+
+    control_frame = tk.Frame(root)
+    control_frame.pack(side=tk.TOP, fill=tk.X)
+
+    # Filter of the sessions by track
+    tk.Label(control_frame, text="Track:").pack(side=tk.LEFT, padx=1, pady=1)
+    combo_tracks = ttk.Combobox(control_frame, state="readonly", width=20)
+    combo_tracks.set("All")
+    combo_tracks.pack(side=tk.LEFT, padx=1, pady=1)
+    combo_tracks.bind("<<ComboboxSelected>>", filter_lists)
+
+    # Add ListBox for sessions (filled from the catalog, from most recent to oldest)
+    tk.Label(control_frame, text="Sessions:").pack(side=tk.LEFT, padx=1, pady=1)
+    listbox_sessions = tk.Listbox(control_frame, selectmode=tk.SINGLE, width=40)
+    listbox_sessions.pack(side=tk.LEFT, padx=1, pady=1)
+    available_sessions = []  # Filled when the log has been indexed
+
+    listbox_sessions.bind("<<ListboxSelect>>", load_laps)
+
+    # ListBox for laps
+    tk.Label(control_frame, text="Laps:").pack(side=tk.LEFT, padx=1, pady=1)
+    listbox_laps = tk.Listbox(control_frame, selectmode=tk.MULTIPLE, width=24)
+    listbox_laps.pack(side=tk.LEFT, padx=1, pady=1)
+
+    # Filter of the complete laps by maximum time ("mm:ss.fff" or seconds)
+    tk.Label(control_frame, text="Max time:").pack(side=tk.LEFT, padx=1, pady=1)
+    entry_max_time = tk.Entry(control_frame, width=9, exportselection=False)
+    entry_max_time.pack(side=tk.LEFT, padx=1, pady=1)
+    entry_max_time.bind("<Return>", filter_lists)
+    tk.Button(control_frame, text="Update", command=update_chart).pack(side=tk.LEFT, padx=0, pady=0)
+
+    export_button = tk.Button(control_frame, text="Export Charts", command=lambda: export_chart(fig, track_per_session.get(selected_session.split(" - ")[0])))
+    export_button.pack(side=tk.RIGHT, padx=5)
+
+    # Button to open the 3D view of the selected laps
+    tk.Button(control_frame, text="3D Map", command=open_map3D).pack(side=tk.RIGHT, padx=5)
+
+    # Checkbox to follow the log while the game is writing it
+    live_mode = tk.BooleanVar(value=False)
+    tk.Checkbutton(control_frame, text="Live", variable=live_mode, command=toggle_live).pack(side=tk.RIGHT, padx=5)
+
+    # Progress of the log indexing, removed when it finishes
+    load_frame = tk.Frame(root)
+    load_frame.pack(side=tk.TOP, fill=tk.X)
+    load_label = tk.Label(load_frame, text="Indexing the log...")
+    load_label.pack(side=tk.LEFT, padx=5, pady=2)
+    load_bar = ttk.Progressbar(load_frame, length=300, maximum=100)
+    load_bar.pack(side=tk.LEFT, padx=5, pady=2)
+
+    canvas = tk.Canvas(root)
+    canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL, command=canvas.yview)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    canvas.configure(yscrollcommand=scrollbar.set)
+    canvas.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+
+    frame = ttk.Frame(canvas)
+    canvas.create_window((0, 0), window=frame, anchor="nw")
+
+    # Assign close function to window close event
+    root.protocol("WM_DELETE_WINDOW", close_program)
+
+    # Show the window now, before indexing the log and importing Matplotlib
+    root.update()
+    print(f"Window visible in {time.perf_counter() - start_time:.2f} s")
+
+    # Index the log in the background while the figure is created
+    log_load = BackgroundLoad(file_path)
+    show_figure()
+    check_load()
+
+    root.mainloop()
\ No newline at end of file
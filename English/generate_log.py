@@ -0,0 +1,220 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+# Tracks of the synthetic log: name, radii of the layout (x, y) in meters, center and average lap time in seconds
+TRACKS = [
+    ("Nurburgring GP", 900, 600, (-1200, 3400), 95),
+    ("Spa", 1400, 800, (2100, -800), 140),
+    ("Monza 1966", 1100, 500, (300, 5200), 110),
+    ("Fujimi_Kaido", 700, 900, (-2600, -1500), 100),
+]
+
+# GTA 5 weathers as the mod writes them (World.Weather)
+WEATHERS = ["ExtraSunny", "Clear", "Clouds", "Overcast", "Raining", "ThunderStorm", "Foggy", "Clearing"]
+
+# Lines of every sample for each dialect, in the order the mod writes them. The date and the
+# game time go apart because their dot does not change with the decimal separator
+SAMPLE = {
+    "en": ("Telemetry | Date: {date} | Track: {track} | Lap: {lap}\r\n",
+           "  Speed: {speed:.1f} km/h\r\n"
+           "  RPM: {rpm:.0f}\r\n"
+           "  Gear: {gear}\r\n"
+           "  Brake: {brake:.0f}%\r\n"
+           "  Fuel level: {fuel:.1f}%\r\n"
+           "  Position: ({x:.2f}, {y:.2f}, {z:.2f})\r\n"
+           "  Direction: ({dx:.2f}, {dy:.2f}, {dz:.2f})\r\n"
+           "  4 wheels on ground: {on_ground}\r\n"),
+    "es": ("Telemetría | Fecha: {date} | Circuito: {track} | Vuelta: {lap}\r\n"
+           "  Hora del juego: {game_time}\r\n",
+           "  Clima: {weather}\r\n"
+           "  Velocidad: {speed:.1f} km/h\r\n"
+           "  Velocidad de las ruedas: {wheel_speed:.1f} km/h\r\n"
+           "  Velocidad vectores: X={vx:.1f} Y={vy:.1f} Z={vz:.1f} m/s\r\n"
+           "  Pedal Acelerador: {throttle_pedal:.0f}%\r\n"
+           "  Acelerador: {throttle:.0f}%\r\n"
+           "  RPM: {rpm:.0f}\r\n"
+           "  Freno: {brake:.0f}%\r\n"
+           "  Embrague: {clutch:g}\r\n"
+           "  Marcha: {gear}\r\n"
+           "  Ángulo de giro: {steering_angle:.1f}º\r\n"
+           "  Turbo: {turbo:.0f}%\r\n"
+           "  Nivel de combustible: {fuel:.1f}L\r\n"
+           "  Nivel de aceite: {oil:.1f}L\r\n"
+           "  Temperatura del motor: {temperature:.1f}ºC\r\n"
+           "  Posición: ({x:.2f}, {y:.2f}, {z:.2f})\r\n"
+           "  Dirección: ({dx:.2f}, {dy:.2f}, {dz:.2f})\r\n"
+           "  4 ruedas en el suelo: {on_ground}\r\n"
+           "  Nivel de suciedad: {dirt:.0f}%\r\n"
+           "  Luces: {lights}\r\n"
+           "  Luces Largas: {high_beams}\r\n"),
+}
+
+# Session header of each dialect (WriteLine("\n=== ...") leaves a blank line before it)
+HEADER = {
+    "en": "\n=== Telemetry started {date} {track} ===\r\n",
+    "es": "\n=== Telemetría iniciada {date} {track} ===\r\n",
+}
+
+# Function to convert a size like "10MB" or "2GB" to bytes
+def size_bytes(text):
+    text = text.strip().upper().rstrip("B")
+    for suffix, factor in (("K", 1024), ("M", 1024 ** 2), ("G", 1024 ** 3)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+# Function to write a date like the mod (dd/MM/yyyy HH:mm:ss.fff)
+def format_date(date):
+    return date.strftime("%d/%m/%Y %H:%M:%S.") + f"{date.microsecond // 1000:03d}"
+
+# Function to calculate the samples of a lap of the track
+def lap_samples(track, duration, rate, generator):
+    """
+    Returns a dictionary of arrays with one row per sample: the car does a
+    lap of the track layout in `duration` seconds, slower in the corners,
+    and the rest of the channels are derived from its speed.
+    """
+    _, radius_x, radius_y, (center_x, center_y), _ = track
+    n = max(int(duration * rate), 2)
+    progress = np.arange(n) / n
+    angle = 2 * np.pi * (progress + 0.03 * np.sin(6 * np.pi * progress)) + generator.uniform(-0.01, 0.01)
+    x = center_x + radius_x * (np.cos(angle) + 0.15 * np.cos(3 * angle)) + generator.normal(0, 0.3, n)
+    y = center_y + radius_y * (np.sin(angle) + 0.10 * np.sin(2 * angle)) + generator.normal(0, 0.3, n)
+    z = 30 + 5 * np.sin(angle) + generator.normal(0, 0.05, n)
+
+    # Speed and direction from the displacement to the next sample (the layout is closed)
+    dx, dy, dz = np.roll(x, -1) - x, np.roll(y, -1) - y, np.roll(z, -1) - z
+    distance = np.sqrt(dx * dx + dy * dy + dz * dz)
+    speed = distance * rate * 3.6
+    direction = np.stack([dx, dy, dz]) / np.maximum(distance, 1e-9)
+    acceleration = np.gradient(speed) * rate
+
+    # Steering: change of heading between samples
+    heading = np.unwrap(np.arctan2(dy, dx))
+    steering = np.clip(np.gradient(heading) * rate * 25, -40, 40)
+
+    brake = np.clip(-acceleration * 8, 0, 100)
+    throttle = np.where(brake > 0, 0, np.clip(60 + acceleration * 8, 0, 100))
+    gear = np.clip(1 + speed // 45, 1, 7).astype(int)
+    rpm = np.clip(2500 + (speed - (gear - 1) * 45) / 45 * 5500, 900, 8500)
+    clutch = np.where(np.diff(gear, prepend=gear[0]) != 0, 0.2, 1)
+
+    return {
+        "n": n,
+        "speed": speed,
+        "wheel_speed": speed * (1 + generator.normal(0, 0.01, n)),
+        "vx": direction[0] * speed / 3.6,
+        "vy": direction[1] * speed / 3.6,
+        "vz": direction[2] * speed / 3.6,
+        "throttle_pedal": np.clip(throttle + generator.normal(0, 2, n), 0, 100),
+        "throttle": throttle,
+        "rpm": rpm,
+        "brake": brake,
+        "clutch": clutch,
+        "gear": gear,
+        "steering_angle": steering,
+        "turbo": np.clip(throttle * 0.9 - 5, -10, 100),
+        "temperature": 90 + 4 * np.sin(angle) + generator.normal(0, 0.2, n),
+        "x": x, "y": y, "z": z,
+        "dx": direction[0], "dy": direction[1], "dz": direction[2],
+        "on_ground": generator.random(n) > 0.002,
+    }
+
+# Function to write a synthetic log
+def write_log(path, dialect="en", sessions=3, laps=10, rate=10, size=None, seed=1, comma=None):
+    """
+    Writes to `path` a telemetry log like the mod's one, with `sessions`
+    sessions of `laps` laps and `rate` samples per second. Every session is
+    on a random track, game time and weather (night ones have the lights
+    on and, above 120 km/h, the high beams; the English log does not write
+    them). With `size` (bytes) sessions keep being added until it is
+    reached. `comma` tells whether decimals use a comma, as in Windows in
+    Spanish (by default, only in the "es" dialect).
+    Returns {"sessions", "laps", "samples", "bytes"}.
+    """
+    generator = np.random.default_rng(seed)
+    if comma is None:
+        comma = dialect == "es"
+    fixed, variable = SAMPLE[dialect]
+    summary = {"sessions": 0, "laps": 0, "samples": 0, "bytes": 0}
+    date = datetime(2025, 3, 1, 20, 0, 0)
+    with open(path, "wb") as f:
+        while (summary["bytes"] < size) if size else (summary["sessions"] < sessions):
+            track = TRACKS[generator.integers(len(TRACKS))]
+            weather = WEATHERS[generator.integers(len(WEATHERS))]
+            game_second = generator.uniform(0, 86400)  # One real second is 30 game seconds
+            fuel = generator.uniform(40, 65)
+            dirt = 0.0
+
+            date += timedelta(hours=float(generator.uniform(1, 30)))
+            text = HEADER[dialect].format(date=format_date(date), track=track[0])
+            f.write(text.encode("utf-8"))
+            summary["bytes"] += len(text.encode("utf-8"))
+            summary["sessions"] += 1
+
+            for lap in range(1, laps + 1):
+                # The weather changes now and then between laps
+                if generator.random() < 0.1:
+                    weather = WEATHERS[generator.integers(len(WEATHERS))]
+                data = lap_samples(track, track[4] * generator.uniform(0.97, 1.05), rate, generator)
+                n = data.pop("n")
+                data = {key: values.tolist() for key, values in data.items()}
+                consumption = np.linspace(0, 0.03 * track[4], n)
+                dirtied = np.linspace(0, 12 if weather in ("Raining", "ThunderStorm") else 4, n)
+
+                parts = []
+                for i in range(n):
+                    instant = date + timedelta(seconds=i / rate)
+                    seconds = (game_second + i / rate * 30) % 86400
+                    hour = int(seconds // 3600)
+                    night = hour >= 20 or hour < 7
+                    values = {key: values[i] for key, values in data.items()}
+                    lines = variable.format(
+                        weather=weather,
+                        fuel=max(fuel - consumption[i], 0),
+                        oil=5.0,
+                        dirt=min(dirt + dirtied[i], 100),
+                        lights=night,
+                        high_beams=night and values["speed"] > 120,
+                        **values)
+                    if comma:
+                        lines = lines.replace(".", ",")
+                    parts.append(fixed.format(
+                        date=format_date(instant),
+                        track=track[0],
+                        lap=lap,
+                        game_time=f"{hour:02d}:{int(seconds // 60 % 60):02d}:{int(seconds % 60):02d}.000") + lines)
+
+                lap_data = "".join(parts).encode("utf-8")
+                f.write(lap_data)
+                summary["bytes"] += len(lap_data)
+                summary["laps"] += 1
+                summary["samples"] += n
+                date += timedelta(seconds=n / rate)
+                game_second += n / rate * 30
+                fuel = max(fuel - consumption[-1], 0)
+                dirt = min(dirt + dirtied[-1], 100)
+                if size and summary["bytes"] >= size:
+                    break
+    return summary
+
+# Generate a synthetic log to try and measure the scripts without playing
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates a synthetic telemetry log, in the format of the English or Spanish mod")
+    parser.add_argument("log", help="Path of the log that is created")
+    parser.add_argument("-d", "--dialect", choices=sorted(SAMPLE), default="en", help="Language of the mod that writes it")
+    parser.add_argument("-s", "--sessions", type=int, default=3, help="Number of sessions")
+    parser.add_argument("-l", "--laps", type=int, default=10, help="Laps per session")
+    parser.add_argument("-r", "--rate", type=float, default=10, help="Samples per second")
+    parser.add_argument("-z", "--size", default=None, help="Approximate size (for example 10MB or 2GB); sessions are added until it is reached")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the random generator, to repeat the same log")
+    parser.add_argument("--comma", action="store_true", help="Write decimals with a comma even if the dialect is English")
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = write_log(arguments.log, arguments.dialect, arguments.sessions, arguments.laps, arguments.rate,
+                        size_bytes(arguments.size) if arguments.size else None, arguments.seed, True if arguments.comma else None)
+    print(f"{summary['sessions']} sessions, {summary['laps']} laps and {summary['samples']} samples "
+          f"({summary['bytes'] / 1024 ** 2:.1f} MB) written to '{arguments.log}' in {time.perf_counter() - start:.2f} s")
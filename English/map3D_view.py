@@ -0,0 +1,139 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import tkinter as tk
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Line3D
+
+class Map3DView:
+    """
+    3D view of the racing lines of a session inside a Tk frame.
+    It draws the positions straight from the session index it is given, so
+    chart.py and map3D.py can share the data already read without parsing
+    the log again.
+    """
+    def __init__(self, master, sessions, track_per_session):
+        self.sessions = sessions
+        self.track_per_session = track_per_session
+        self.session = None
+        self.lines = {}  # lap -> drawn 3D line
+
+        # Create 3D figure (without pyplot, so it does not mix with other open figures)
+        self.figure = Figure(figsize=(8, 10))
+        self.ax = self.figure.add_subplot(111, projection='3d')
+        self.configure_axes()
+        self.ax.set_title("Select a session", pad=20)
+
+        # Adjust chart aspect ratio
+        self.ax.set_box_aspect([1, 1, 0.1])
+
+        # Canvas for the chart
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        # Associate scroll events
+        self.canvas.get_tk_widget().bind("<MouseWheel>", self.zoom)
+
+    # Function to hide the axes and panes of the chart
+    def configure_axes(self):
+        self.ax.set_xticks([])
+        self.ax.set_yticks([])
+        self.ax.set_zticks([])
+        self.ax.grid(False)
+
+        for axis in [self.ax.xaxis, self.ax.yaxis, self.ax.zaxis]:
+            axis.pane.fill = False
+            axis.line.set_color((0.0, 0.0, 0.0, 0.0))
+
+    # Function to draw the laps of a session (all of them if laps is None)
+    def show(self, session, laps=None, colors=None):
+        self.ax.cla()
+        self.lines = {}
+        self.session = session
+
+        if session not in self.sessions:
+            self.canvas.draw()
+            return
+
+        session_data = self.sessions[session]
+        if laps is None:
+            laps = list(session_data)
+        if colors is None:
+            laps = [lap for lap in laps if lap in session_data]
+            colors = plt.cm.viridis(np.linspace(0, 1, len(laps)))
+        # Each lap keeps its color even if other laps have no data
+        colors = dict(zip(laps, colors))
+        laps = [lap for lap in laps if lap in session_data and session_data[lap]['positions']]
+
+        # First collect all points to calculate ranges (samples without position are NaN)
+        positions = {lap: np.asarray(session_data[lap]['positions']) for lap in laps}
+        positions = {lap: points for lap, points in positions.items() if not np.isnan(points[:, 0]).all()}
+
+        if not positions:
+            self.canvas.draw()
+            return
+
+        # Calculate ranges for each axis
+        minimums = np.min([np.nanmin(points, axis=0) for points in positions.values()], axis=0)
+        maximums = np.max([np.nanmax(points, axis=0) for points in positions.values()], axis=0)
+        range_x, range_y, range_z = maximums - minimums
+
+        # Adjust aspect ratio based on actual ranges
+        aspect_ratio = [range_x, range_y, range_z * 0.2]  # Reduce importance of Z axis
+        self.ax.set_box_aspect(aspect_ratio)
+
+        # Draw laps
+        for lap, points in positions.items():
+            x, y, z = points.T
+            self.lines[lap] = Line3D(x, y, z, color=colors[lap], alpha=0.7, linewidth=2,
+                                     label=f"Lap {lap}")
+            self.ax.add_line(self.lines[lap])
+        self.ax.auto_scale_xyz(*zip(minimums, maximums), had_data=False)
+
+        # Chart configuration
+        self.configure_axes()
+
+        # Adjust view for better perspective
+        self.ax.view_init(elev=30, azim=45)  # Viewing angle
+
+        if session in self.track_per_session:
+            self.ax.set_title(f"Track: {self.track_per_session[session]}\nSession: {session}", pad=20)
+
+        self.ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+        self.canvas.draw()
+
+    # Function to extend the racing lines of the laps that received data (live mode)
+    def refresh(self, laps):
+        session_data = self.sessions[self.session]
+        changed = False
+        for lap in laps:
+            if lap in self.lines:
+                x, y, z = np.asarray(session_data[lap]['positions']).T
+                self.lines[lap].set_data_3d(x, y, z)
+                changed = True
+        if changed:
+            self.canvas.draw_idle()
+
+    # Function to handle zoom with mouse wheel
+    def zoom(self, event):
+        if event.delta > 0 or event.num == 4:
+            scale = 0.9  # Zoom in
+        else:
+            scale = 1.1  # Zoom out
+
+        # Get current limits
+        x_limits = self.ax.get_xlim3d()
+        y_limits = self.ax.get_ylim3d()
+        z_limits = self.ax.get_zlim3d()
+
+        def scale_limits(limits):
+            middle = (limits[0] + limits[1]) / 2
+            range_val = (limits[1] - limits[0]) * scale / 2
+            return (middle - range_val, middle + range_val)
+
+        self.ax.set_xlim3d(scale_limits(x_limits))
+        self.ax.set_ylim3d(scale_limits(y_limits))
+        self.ax.set_zlim3d(scale_limits(z_limits))
+
+        self.canvas.draw()
@@ -0,0 +1,6 @@
+# Reading of the mod telemetry logs, shared by chart.py and map3D.py
+from .archive import ArchiveIndex
+from .cache import SessionIndex, read_lines, cache_path
+from .catalog import Catalog, time_seconds
+from .dialects import DIALECTS
+from .log import CACHE_NAME, BackgroundLoad, Chunk, LogReader, load, read_log, calculate_durations, timestamp_seconds
@@ -0,0 +1,24 @@
+import argparse
+import time
+from .catalog import time_seconds
+from .log import load
+
+# Read the whole log at once and save it to the cache
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m telemetry", description="Reads every session of the log in parallel and saves them to the cache")
+    parser.add_argument("log", help="Path of the telemetry log")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of processes (one per core by default; 1 = no processes)")
+    parser.add_argument("-t", "--track", default=None, help="Show the laps of this track afterwards")
+    parser.add_argument("-m", "--max-time", type=time_seconds, default=None, help="Show the complete laps faster than this time (mm:ss.fff) afterwards")
+    arguments = parser.parse_args()
+
+    load_start = time.perf_counter()
+    sessions = load(arguments.log)
+    read = sessions.preload(arguments.workers)
+    print(f"{len(read)} sessions read in {time.perf_counter() - load_start:.2f} s")
+
+    # Query the catalog, which already has every lap of the log
+    if arguments.track is not None or arguments.max_time is not None:
+        for row in sessions.find_laps(track=arguments.track, max_time=arguments.max_time):
+            lap_time = row["time"]
+            print(f"  {row['track']}: {int(lap_time // 60):02d}:{lap_time % 60:06.3f} (session {row['session']}, lap {row['lap']})")
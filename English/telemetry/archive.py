@@ -0,0 +1,246 @@
+import lzma
+import os
+from collections import ChainMap
+from collections.abc import Mapping
+from datetime import datetime
+from .cache import HEADER_BYTES, SessionIndex, merge_sessions, open_log
+from .catalog import filter_laps, lap_rows
+from .dialects import SAMPLE_MARKERS, SESSION_PREFIX
+
+# Function to know whether a file is a telemetry log, compressed or not
+def is_log(file_path):
+    try:
+        with open_log(file_path) as f:
+            head = f.read(HEADER_BYTES)
+    except (OSError, EOFError, lzma.LZMAError):
+        return False
+    return SESSION_PREFIX in head or any(marker in head for marker in SAMPLE_MARKERS)
+
+# Function to get the date a log starts at, to sort them
+def log_date(file_path, index):
+    """
+    Uses the first session of the log ("dd/mm/yyyy hh:mm:ss.fff") or, if it
+    has no header, the modification time of the file.
+    """
+    for session in index.ranges:
+        try:
+            return datetime.strptime(session, "%d/%m/%Y %H:%M:%S.%f").timestamp()
+        except ValueError:
+            break
+    return os.path.getmtime(file_path)
+
+class ArchiveIndex(Mapping):
+    """
+    Index of the sessions of a folder of rotated logs (for example the
+    previous months compressed with gzip and the current month's log
+    uncompressed), used just like the SessionIndex of a single log.
+    Every file has its own SessionIndex, with its cache next to it, and the
+    files are walked in chronological order by their first session.
+    If the rotation cut a session, the samples at the start of the next file
+    (those before its first header) are added to that session when it is
+    opened.
+    """
+    def __init__(self, folder_path, name, read, calculate=None, as_lists=False, capacity=8, progress=None):
+        self.folder_path = folder_path
+        self.name = name
+        self.read = read
+        self.calculate = calculate
+        self.as_lists = as_lists
+        self.capacity = capacity
+        self.indexes = {}  # path -> SessionIndex, from the oldest log to the newest
+        self.skipped = {}  # path -> modification time of the files that are not logs
+        self.continued = {}  # session -> (path of the next log, end of its samples without header)
+        self.joined = {}  # session -> laps with the samples of the next log already added
+        self.tracks = ChainMap()
+
+        self.find_logs(progress)
+
+    def __getitem__(self, session):
+        if session in self.joined:
+            return self.joined[session]
+        for index in self.indexes.values():
+            if session in index:
+                laps = index[session]
+                break
+        else:
+            raise KeyError(session)
+        if session in self.continued:
+            laps = self.join(session, index, laps)
+        return laps
+
+    def __contains__(self, session):
+        return any(session in index for index in self.indexes.values())
+
+    def __iter__(self):
+        seen = set()
+        for index in self.indexes.values():
+            for session in index:
+                if session not in seen:
+                    seen.add(session)
+                    yield session
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    # Function to get the last session with data of the newest log that has any
+    def last_session(self):
+        for index in reversed(self.indexes.values()):
+            session = index.last_session()
+            if session is not None:
+                return session
+        return None
+
+    # Function to find the logs of the folder and sort them
+    def find_logs(self, progress=None):
+        """
+        Creates the index of the new logs, forgets the ones that are gone
+        (for example, the one that was just compressed under another name)
+        and sorts them again. Returns the paths of the new logs.
+        `progress` (optional) receives the fraction of the folder already indexed.
+        """
+        new_logs = []
+        paths = set()
+        names = sorted(os.listdir(self.folder_path))
+        for number, name in enumerate(names):
+            path = os.path.join(self.folder_path, name)
+            if not os.path.isfile(path):
+                continue  # The cache folders, among others
+            paths.add(path)
+            if path in self.indexes:
+                continue
+            modified = os.path.getmtime(path)
+            if self.skipped.get(path) == modified:
+                continue
+            if not is_log(path):
+                self.skipped[path] = modified
+                continue
+            self.skipped.pop(path, None)
+            # Every log takes the same share of the progress of the folder
+            log_progress = (lambda fraction, number=number: progress((number + fraction) / len(names))) if progress else None
+            self.indexes[path] = SessionIndex(path, self.name, self.read, self.calculate, self.as_lists, self.capacity, log_progress)
+            new_logs.append(path)
+
+        removed = [path for path in self.indexes if path not in paths]
+        for path in removed:
+            del self.indexes[path]
+        if new_logs or removed:
+            order = sorted(self.indexes, key=lambda path: log_date(path, self.indexes[path]))
+            self.indexes = {path: self.indexes[path] for path in order}
+            # If a session shows up in several logs, its tracks are those of the oldest one
+            self.tracks.maps = [index.tracks for index in self.indexes.values()]
+            self.find_continuations()
+        return new_logs
+
+    # Function to find the sessions the rotation split between two logs
+    def find_continuations(self):
+        continued = {}
+        paths = list(self.indexes)
+        for previous, following in zip(paths, paths[1:]):
+            session = self.indexes[previous].final_session()
+            if session is None or session not in self.indexes[previous]:
+                continue
+            # The samples without header at the start of the next log
+            index = self.indexes[following]
+            end = min((ranges[0][0] for ranges in index.ranges.values()), default=index.scanned)
+            if (following, end) == self.continued.get(session):
+                continued[session] = (following, end)
+                continue
+            with open_log(following) as f:
+                head = f.read(min(end, HEADER_BYTES))
+            # They can be just the last data lines of a sample
+            if head.strip():
+                continued[session] = (following, end)
+
+        # Sessions joined with another part of the next log are joined again when requested
+        for session in list(self.joined):
+            if continued.get(session) != self.continued.get(session):
+                del self.joined[session]
+        self.continued = continued
+
+    # Function to add to a session the samples the rotation left in the next log
+    def join(self, session, index, laps):
+        path, end = self.continued[session]
+        _, state = index.opened[session]
+        # Copy the lists so the session kept in the index of the log is not extended
+        joined = {lap: {channel: list(values) if isinstance(values, list) else values for channel, values in data.items()}
+                  for lap, data in laps.items()}
+        if state is not None:
+            new_sessions, tracks, _ = self.read(path, dict(state, offset=0), 0, end)
+            for data in merge_sessions({session: joined}, {}, new_sessions, tracks):
+                if self.calculate:
+                    self.calculate(data)
+        self.joined[session] = joined
+        return joined
+
+    # Function to get only some laps of a session, like SessionIndex.laps
+    def laps(self, session, numbers):
+        if session in self.continued:
+            laps = self[session]
+            return {lap: laps[lap] for lap in numbers if lap in laps}
+        for index in self.indexes.values():
+            if session in index:
+                return index.laps(session, numbers)
+        raise KeyError(session)
+
+    # Function to get the tracks of the sessions of every catalog
+    def find_tracks(self):
+        return sorted({track for index in self.indexes.values() for track in index.find_tracks()})
+
+    # Function to get [(session, track), ...] of every catalog, from the most recent to the oldest
+    def find_sessions(self, track=None):
+        sessions = {}
+        for index in self.indexes.values():
+            for session, session_track in index.find_sessions(track):
+                sessions.setdefault(session, session_track)
+        return sorted(sessions.items(), reverse=True)
+
+    # Function to find laps in the catalogs of every log, like SessionIndex.find_laps
+    def find_laps(self, session=None, track=None, max_time=None):
+        """
+        A session split by the rotation is summarised from its laps already
+        joined, because the catalog of each log only has its own part (the
+        bytes of each lap are those of the log it starts in).
+        """
+        if session in self.continued:
+            end = next(index.ranges[session][-1][2] for index in self.indexes.values() if session in index)
+            rows = lap_rows(session, self.tracks.get(session), self[session], end)
+            return filter_laps(rows, track, max_time)
+        rows = []
+        for index in self.indexes.values():
+            if session is None or session in index:
+                rows.extend(index.find_laps(session, track, max_time))
+                if session is not None:
+                    break
+        if session is None:
+            rows.sort(key=lambda row: row["time"])
+        return rows
+
+    # Function to read at once every session that is not in the cache
+    def preload(self, workers=None):
+        """
+        Preloads every log of the folder, from the oldest to the newest, like
+        SessionIndex.preload. Returns the sessions read.
+        """
+        read = []
+        for index in self.indexes.values():
+            read.extend(index.preload(workers))
+        return read
+
+    # Function to incorporate what has been added to the folder
+    def update(self):
+        """
+        Updates every log and adds the new logs of the folder. Returns
+        {session: {lap: new data}} like SessionIndex.update; the sessions of
+        the new logs show up without laps.
+        """
+        changes = {}
+        for path in self.find_logs():
+            changes.update((session, {}) for session in self.indexes[path])
+        for path, index in self.indexes.items():
+            if os.path.exists(path):
+                changes.update(index.update())
+        if changes:
+            for session in changes:
+                self.joined.pop(session, None)
+            self.find_continuations()
+        return changes
@@ -0,0 +1,635 @@
+import bz2
+import gzip
+import hashlib
+import json
+import lzma
+import mmap
+import os
+import zipfile
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .catalog import Catalog, lap_rows
+from .dialects import SAMPLE_MARKERS, SESSION_PREFIX, session_marker
+
+# Cache format version (changing it invalidates existing caches)
+CACHE_VERSION = 8
+
+# Bytes at the start of the log used to detect whether it has been replaced
+HEADER_BYTES = 64 * 1024
+
+# Bytes before the already parsed part used to detect whether it has been rewritten
+TAIL_BYTES = 4 * 1024
+
+# Size of the blocks the log is walked in when looking for sessions
+BLOCK_SIZE = 1024 * 1024
+
+# Extension of the compressed logs -> function to open them decompressing while reading
+DECOMPRESSORS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+# Compressed log read last, left open to continue where it stopped:
+# [path, (size, modification time), file]
+open_compressed = [None, None, None]
+
+# Function to know whether a log is compressed
+def compressed(file_path):
+    return os.path.splitext(file_path)[1].lower() in DECOMPRESSORS
+
+# Function to open a log in binary, decompressing it while reading if it is compressed
+def open_log(file_path):
+    opener = DECOMPRESSORS.get(os.path.splitext(file_path)[1].lower(), open)
+    return opener(file_path, "rb")
+
+# Function to get the cache folder next to the log
+def cache_path(file_path, name):
+    return f"{file_path}.{name}"
+
+# Function to get the signature of the first `size` bytes of the log
+def log_signature(file_path, size):
+    # A compressed log does not grow: the whole compressed file is signed, without decompressing it
+    if compressed(file_path):
+        size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        header = f.read(min(size, HEADER_BYTES))
+        f.seek(max(size - TAIL_BYTES, 0))
+        tail = f.read(min(size, TAIL_BYTES))
+    return {
+        "size": size,
+        "header_hash": hashlib.sha1(header).hexdigest(),
+        "tail_hash": hashlib.sha1(tail).hexdigest()
+    }
+
+# Function to get the byte the complete lines of the log reach
+def complete_lines_end(file_path):
+    if compressed(file_path):
+        # No direct access to the end: go through the whole decompressed log
+        end = 0
+        last_newline = 0
+        with open_log(file_path) as f:
+            while True:
+                block = f.read(BLOCK_SIZE)
+                if not block:
+                    return last_newline
+                newline = block.rfind(b"\n")
+                if newline != -1:
+                    last_newline = end + newline + 1
+                end += len(block)
+    with open(file_path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(end - TAIL_BYTES, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                return start + newline + 1
+            end = start
+    return 0
+
+# Function to go through the complete lines of the log from byte `start`
+def read_lines(file_path, start, end=None):
+    """
+    Yields one by one, as bytes and without the newline, the lines that
+    start between `start` and `end` (or the end of the file), without the
+    last one if it is still being written. The log is mapped into memory
+    with mmap and split in blocks, so the lines come straight from the
+    system page cache, without a read buffer or decoding them.
+    In a compressed log the positions are those of the decompressed log
+    (see read_compressed_lines).
+    """
+    if compressed(file_path):
+        yield from read_compressed_lines(file_path, start, end)
+        return
+    with open(file_path, "rb") as file:
+        stop = os.fstat(file.fileno()).st_size
+        if end is not None:
+            stop = min(stop, end)
+        if start >= stop:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            while start < stop:
+                # The block ends at the last newline before `stop`
+                cut = data.rfind(b"\n", start, min(start + BLOCK_SIZE, stop))
+                if cut == -1:
+                    # No line ends in the block: look for the end of the one starting at `start`
+                    cut = data.find(b"\n", min(start + BLOCK_SIZE, stop))
+                    if cut == -1:
+                        # A line without a final newline is still being written
+                        return
+                yield from data[start:cut].split(b"\n")
+                start = cut + 1
+
+# Function to go through the lines of a compressed log from byte `start`
+def read_compressed_lines(file_path, start, end=None):
+    """
+    Like read_lines, but decompressing the log in blocks. Reaching `start`
+    means decompressing everything before it, so the file is left open when
+    finished and nothing past `end` is ever read: reading the sessions in
+    log order decompresses it only once instead of starting over from the
+    beginning for each of them.
+    """
+    stat = os.stat(file_path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    path, open_signature, file = open_compressed
+    if path != file_path or open_signature != signature:
+        if file is not None:
+            file.close()
+        file = open_log(file_path)
+        open_compressed[:] = [file_path, signature, file]
+
+    position = start  # Byte of the decompressed log read so far
+    rest = b""  # Start of the line that continues in the next block
+    while end is None or position < end:
+        # Another read of the same file may have moved it between two blocks
+        if file.tell() != position:
+            file.seek(position)  # Backwards it decompresses again from the beginning
+        block = file.read(BLOCK_SIZE if end is None else min(BLOCK_SIZE, end - position))
+        if not block:
+            # A line without a final newline is still being written
+            return
+        position += len(block)
+        lines = (rest + block).split(b"\n")
+        rest = lines.pop()
+        yield from lines
+
+    # The last line starts before `end`: it is yielded whole
+    while rest:
+        if file.tell() != position:
+            file.seek(position)
+        block = file.read(BLOCK_SIZE)
+        if not block:
+            return
+        position += len(block)
+        newline = block.find(b"\n")
+        if newline != -1:
+            yield rest + block[:newline]
+            return
+        rest += block
+
+# Function to find the session headers between two bytes of the log
+def find_headers(file_path, start, end, progress=None):
+    """
+    Returns [(start, header_end, session, track)] for every complete
+    "=== Telemetry started <date> <time> <track> ===" line between `start`
+    and `end`, in any of the dialects of the log. The marker is only
+    searched for in large blocks, without splitting the log into lines or
+    decoding it. `progress` (optional) receives after every block the
+    fraction of the range already covered.
+    """
+    headers = []
+    with open_log(file_path) as f:
+        # Also read the previous byte to know whether `start` is a line start
+        base = max(start - 1, 0)
+        f.seek(base)
+        data = b""
+        minimum = start - base  # Markers before this position of `data` were already handled
+        while base + len(data) < end:
+            block = f.read(min(BLOCK_SIZE, end - base - len(data)))
+            if not block:
+                break
+            data += block
+            if progress:
+                progress((base + len(data) - start) / max(end - start, 1))
+            position = data.find(SESSION_PREFIX, minimum)
+            while position != -1:
+                # The marker only counts at the start of a line
+                if base + position == 0 or data[position - 1] == 0x0A:
+                    line_end = data.find(b"\n", position)
+                    if line_end == -1:
+                        break
+                    marker, _ = session_marker(data, position)
+                    if marker:
+                        line = data[position + len(marker):line_end].decode("utf-8", errors="replace").strip()
+                        parts = line[:-3].strip().split(" ", 2) if line.endswith("===") else []
+                        if len(parts) == 3:
+                            headers.append((base + position, base + line_end + 1, f"{parts[0]} {parts[1]}", parts[2].strip()))
+                position = data.find(SESSION_PREFIX, position + 1)
+
+            # Keep the end of the block in case a header is split across two blocks
+            if position != -1:
+                cut = max(position - 1, 0)
+            else:
+                cut = max(len(data) - len(SESSION_PREFIX), 0)
+            if cut:
+                base += cut
+                data = data[cut:]
+                minimum = 1
+    return headers
+
+# Function to know whether the new data starts with the rest of the last sample of a lap
+def split_sample(previous, data):
+    """
+    If the previous read stopped halfway through a sample, the next one puts
+    the rest of its lines in another row with the same timestamp (the
+    previous row keeps its timestamp and the byte where the sample starts).
+    """
+    timestamps = previous.get("timestamps")
+    new_timestamps = data.get("timestamps")
+    return timestamps is not None and new_timestamps is not None and len(timestamps) > 0 and len(new_timestamps) > 0 and timestamps[-1] == new_timestamps[0]
+
+# Function to join the fields of the two parts of a split sample
+def join_row(previous, new):
+    """
+    Every field is only in one of the two parts and in the other one it is
+    a gap (NaN), so the one of the new part is taken if it has it.
+    """
+    new_array = np.asarray(new)
+    if new_array.dtype.kind == "f":
+        gap = np.isnan(new_array)
+    else:
+        gap = new_array == new_array.dtype.type()
+    row = np.where(gap, np.asarray(previous), new_array)
+    if isinstance(new, (list, tuple)):
+        return type(new)(row.tolist())
+    return row.tolist() if row.ndim == 0 else row
+
+# Function to add the sessions read from the new part of the log
+def merge_sessions(sessions, track_per_session, new_sessions, new_tracks):
+    """
+    Appends the new data to the end of each lap and creates the sessions
+    and laps that did not exist. Returns the dictionaries of the laps that
+    already existed and were extended, so their derived data can be
+    recalculated.
+    """
+    extended = []
+    for session, laps in new_sessions.items():
+        session_laps = sessions.setdefault(session, {})
+        for lap, data in laps.items():
+            if lap not in session_laps:
+                session_laps[lap] = data
+                continue
+            previous = session_laps[lap]
+            split = split_sample(previous, data)
+            for channel, values in data.items():
+                if channel not in previous:
+                    previous[channel] = values
+                    continue
+                if split:
+                    # The first new row completes the last row of the lap
+                    if channel not in ("timestamps", "offsets"):
+                        row = join_row(previous[channel][-1], values[0])
+                        if isinstance(previous[channel], list):
+                            previous[channel][-1] = row
+                        else:
+                            previous[channel] = np.concatenate([previous[channel][:-1], [row]])
+                    values = values[1:]
+                if isinstance(previous[channel], list):
+                    previous[channel].extend(values)
+                elif len(values):
+                    previous[channel] = np.concatenate([previous[channel], values])
+            extended.append(previous)
+    track_per_session.update(new_tracks)
+    return extended
+
+# Function to read the ranges of a session that have not been processed yet
+def read_session(file_path, read, calculate, session, ranges, laps=None, state=None):
+    """
+    Reads the ranges of the session from the byte where `state` stopped
+    and adds the data to `laps`. Returns (laps, new_laps, tracks, state),
+    where new_laps are the laps that received data.
+    It does not use the index, so it can also run in another process.
+    """
+    laps = {} if laps is None else laps
+    new_laps = {}
+    tracks = {}
+    for start, header_end, end in ranges:
+        read_up_to = state["offset"] if state else 0
+        if end <= read_up_to:
+            continue
+        # Continue the half-read range or start another one from its header
+        resume = state if start < read_up_to else None
+        read_sessions, read_tracks, state = read(file_path, resume, start, end)
+        for data in merge_sessions({session: laps}, tracks, read_sessions, read_tracks):
+            if calculate:
+                calculate(data)
+        new_laps.update(read_sessions.get(session, {}))
+    return laps, new_laps, tracks, state
+
+class SessionIndex(Mapping):
+    """
+    Index of the sessions in the log with the byte range of each one.
+    It is used like a session -> laps dictionary, but opening it only looks
+    for the session headers: the samples of a session are read the first
+    time it is requested and the last `capacity` used ones are kept.
+    Every session read is saved to the cache next to the log, along with
+    the reader state, so it is not read again on the next launches, and its
+    laps are summarised in the catalog (`catalog`), which allows listing and
+    filtering sessions and laps without reading their samples.
+
+    read(file_path, state, start, end) returns
+    (sessions, track_per_session, state) like read_log, and calculate
+    (optional) receives every extended lap to recalculate its derived data.
+    progress (optional) receives the fraction of the log covered while indexing it.
+    """
+    def __init__(self, file_path, name, read, calculate=None, as_lists=False, capacity=8, progress=None):
+        self.file_path = file_path
+        self.path = cache_path(file_path, name)
+        self.read = read
+        self.calculate = calculate
+        self.as_lists = as_lists
+        self.capacity = capacity
+        self.ranges = {}  # session -> [[start, header_end, end], ...] in log order
+        self.tracks = {}
+        self.with_data = set()
+        self.scanned = 0
+        self.opened = OrderedDict()  # session -> (laps, state), from least to most recently used
+
+        self.load_index()
+        self.catalog = Catalog(os.path.join(self.path, "catalog.sqlite"), CACHE_VERSION)
+        if self.catalog.empty():
+            self.catalog_sessions(self)
+        if self.scan(progress):
+            self.save_index()
+
+    def __getitem__(self, session):
+        if session not in self.with_data:
+            raise KeyError(session)
+        if session in self.opened:
+            self.opened.move_to_end(session)
+            return self.opened[session][0]
+        return self.open(session)
+
+    def __contains__(self, session):
+        return session in self.with_data
+
+    def __iter__(self):
+        return (session for session in self.ranges if session in self.with_data)
+
+    def __len__(self):
+        return len(self.with_data)
+
+    # Function to get the session whose range reaches the end of the log
+    def final_session(self):
+        if not self.ranges:
+            return None
+        return max(self.ranges, key=lambda session: self.ranges[session][-1][0])
+
+    # Function to get the session the game is writing, if it has data
+    def last_session(self):
+        session = self.final_session()
+        return session if session in self.with_data else None
+
+    # Function to extend the index with what was written since the last scan
+    def scan(self, progress=None):
+        """
+        Looks for new headers and extends the range of the last session.
+        Returns the sessions with data whose range has changed.
+        """
+        # A compressed log is a closed file: scanning it once is enough
+        if self.scanned and compressed(self.file_path):
+            return []
+        end = complete_lines_end(self.file_path)
+        if end <= self.scanned:
+            return []
+
+        last = self.final_session()
+        changed = [last] if last is not None else []
+        for start, header_end, session, track in find_headers(self.file_path, self.scanned, end, progress):
+            if last is not None:
+                self.ranges[last][-1][2] = start
+            self.ranges.setdefault(session, []).append([start, header_end, end])
+            self.tracks.setdefault(session, track)
+            last = session
+            changed.append(session)
+        if last is not None:
+            self.ranges[last][-1][2] = end
+        self.scanned = end
+
+        # A session only shows up once there is some sample after its header
+        with open_log(self.file_path) as f:
+            for session in changed:
+                if session in self.with_data:
+                    continue
+                for start, header_end, range_end in self.ranges[session]:
+                    f.seek(header_end)
+                    block = f.read(min(range_end - header_end, TAIL_BYTES))
+                    if any(marker in block for marker in SAMPLE_MARKERS):
+                        self.with_data.add(session)
+                        break
+        changed = [session for session in dict.fromkeys(changed) if session in self.with_data]
+        self.catalog_sessions(changed)
+        return changed
+
+    # Function to save the track and byte range of some sessions to the catalog
+    def catalog_sessions(self, sessions):
+        self.catalog.save_sessions([(session, self.tracks.get(session), self.ranges[session][0][0], self.ranges[session][-1][2])
+                                    for session in sessions])
+
+    # Function to save the summary of the laps read from a session to the catalog
+    def catalog_laps(self, session, laps):
+        self.catalog.save_laps(session, lap_rows(session, self.tracks.get(session), laps, self.ranges[session][-1][2]))
+
+    # Function to read the samples of a session that have not been processed yet
+    def read_ranges(self, session, laps, state):
+        laps, new_laps, tracks, state = read_session(self.file_path, self.read, self.calculate, session, self.ranges[session], laps, state)
+        self.tracks.update(tracks)
+        return new_laps, state
+
+    # Function to read a session (from the cache if possible)
+    def open(self, session):
+        laps, state = self.load_session(session) or ({}, None)
+        new_laps, state = self.read_ranges(session, laps, state)
+        if new_laps:
+            self.save_session(session, laps, state)
+            self.save_index()
+        if new_laps or not self.catalog.has_laps(session):
+            self.catalog_laps(session, laps)
+        self.remember(session, laps, state)
+        return laps
+
+    # Function to get only some laps of a session
+    def laps(self, session, numbers):
+        """
+        Returns {lap: data} with the laps `numbers` the session has. If the
+        session is not open and the cache already has all its samples, only
+        those laps are loaded from the cache; otherwise the whole session is
+        read.
+        """
+        if session not in self.opened and session in self.with_data:
+            loaded = self.load_session(session, numbers)
+            if loaded is not None and loaded[1] is not None and loaded[1]["offset"] >= self.ranges[session][-1][2]:
+                return loaded[0]
+        laps = self[session]
+        return {lap: laps[lap] for lap in numbers if lap in laps}
+
+    # Function to get the tracks of the sessions in the catalog
+    def find_tracks(self):
+        return self.catalog.find_tracks()
+
+    # Function to get [(session, track), ...] of the sessions in the catalog, from the most recent to the oldest
+    def find_sessions(self, track=None):
+        return self.catalog.find_sessions(track)
+
+    # Function to find in the catalog laps of a session or of every session read
+    def find_laps(self, session=None, track=None, max_time=None):
+        """
+        Like Catalog.find_laps. The laps of a session are catalogued when it
+        is read, so if a session that has not been read yet is requested it
+        is read first; to search every session they have to be preloaded.
+        """
+        if session is not None and session in self.with_data and not self.catalog.has_laps(session):
+            self[session]
+        return self.catalog.find_laps(session, track, max_time)
+
+    # Function to keep a read session among the last `capacity` used ones
+    def remember(self, session, laps, state):
+        self.opened[session] = (laps, state)
+        self.opened.move_to_end(session)
+        while len(self.opened) > self.capacity:
+            self.opened.popitem(last=False)
+
+    # Function to read at once every session that is not in the cache
+    def preload(self, workers=None):
+        """
+        Reads in parallel the sessions with data that have not been saved to
+        the cache yet, splitting their byte ranges among `workers` processes
+        (one per core if None). With workers=1 they are read one after another
+        in this same process. To use several processes, `read` and `calculate`
+        must live in an importable module (not in the script being run) and
+        the script must protect its code with `if __name__ == "__main__":`,
+        because on Windows every process imports it.
+        A compressed log is always read in this process and in order, to
+        decompress it only once.
+        Returns the sessions read.
+        """
+        pending = [session for session in self if session not in self.opened
+                   and not os.path.exists(os.path.join(self.path, self.session_file(session)))]
+        if compressed(self.file_path):
+            pending.sort(key=lambda session: self.ranges[session][0][0])
+            workers = 1
+        else:
+            # Longest sessions first, so no process is left working alone at the end
+            pending.sort(key=lambda session: sum(end - start for start, _, end in self.ranges[session]), reverse=True)
+
+        if workers == 1 or len(pending) < 2:
+            for session in pending:
+                self.open(session)
+            return pending
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {session: pool.submit(read_session, self.file_path, self.read, self.calculate, session, self.ranges[session])
+                       for session in pending}
+            for session in pending:
+                laps, new_laps, tracks, state = futures.pop(session).result()
+                self.tracks.update(tracks)
+                self.save_session(session, laps, state)
+                self.catalog_laps(session, laps)
+                self.remember(session, laps, state)
+        self.save_index()
+        return pending
+
+    # Function to take in what has been appended to the log
+    def update(self):
+        """
+        Extends the index and reads the new samples of the open sessions.
+        Returns {session: {lap: new data}} with the sessions that changed;
+        the ones that are not open show up without laps.
+        """
+        changes = {}
+        for session in self.scan():
+            if session in self.opened:
+                laps, state = self.opened[session]
+                changes[session], state = self.read_ranges(session, laps, state)
+                self.opened[session] = (laps, state)
+                if changes[session]:
+                    self.catalog_laps(session, laps)
+            else:
+                changes[session] = {}
+        return changes
+
+    # Function to load the saved index if the log still starts the same way
+    def load_index(self):
+        path = os.path.join(self.path, "index.json")
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                index = json.load(f)
+            if index["version"] != CACHE_VERSION:
+                raise ValueError("different version")
+            scanned = index["scanned"]
+            # In a compressed log `scanned` is a position of the decompressed log
+            if (not compressed(self.file_path) and os.path.getsize(self.file_path) < scanned) or log_signature(self.file_path, scanned) != index["signature"]:
+                raise ValueError("the log has changed")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Invalid cache '{self.path}', reading the log again: {e}")
+            self.clear_cache()
+            return
+
+        for session, track, with_data, ranges in index["sessions"]:
+            self.ranges[session] = ranges
+            self.tracks[session] = track
+            if with_data:
+                self.with_data.add(session)
+        self.scanned = scanned
+
+    # Function to save the index next to the log
+    def save_index(self):
+        index = {
+            "version": CACHE_VERSION,
+            "signature": log_signature(self.file_path, self.scanned),
+            "scanned": self.scanned,
+            "sessions": [[session, self.tracks.get(session), session in self.with_data, ranges] for session, ranges in self.ranges.items()]
+        }
+        self.write("index.json", lambda f: f.write(json.dumps(index).encode("utf-8")))
+
+    # Function to get the cache file of a session
+    def session_file(self, session):
+        return hashlib.sha1(session.encode("utf-8")).hexdigest()[:16] + ".npz"
+
+    # Function to save the laps read from a session
+    def save_session(self, session, laps, state):
+        arrays = {}
+        for lap, data in laps.items():
+            for channel, values in data.items():
+                arrays[f"{lap}/{channel}"] = np.asarray(values)
+        arrays["meta"] = np.array(json.dumps({"session": session, "state": state}))
+        self.write(self.session_file(session), lambda f: np.savez(f, **arrays))
+
+    # Function to load the laps of a session from the cache
+    def load_session(self, session, numbers=None):
+        """
+        Returns (laps, state) or None if the session is not in the cache.
+        With `numbers` only those laps are loaded.
+        """
+        path = os.path.join(self.path, self.session_file(session))
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as cache:
+                meta = json.loads(str(cache["meta"]))
+                if meta["session"] != session:
+                    return None
+                laps = {}
+                for key in cache.files:
+                    if key == "meta":
+                        continue
+                    lap, channel = key.split("/", 1)
+                    if numbers is not None and int(lap) not in numbers:
+                        continue
+                    values = cache[key]
+                    laps.setdefault(int(lap), {})[channel] = values.tolist() if self.as_lists else values
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            print(f"Invalid cache for session {session}, reading it again: {e}")
+            return None
+        return laps, meta["state"]
+
+    # Function to write a cache file without leaving it half written
+    def write(self, name, write):
+        path = os.path.join(self.path, name)
+        temp_path = path + ".tmp"
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                write(f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Could not save cache '{path}': {e}")
+
+    # Function to delete the cache when it no longer matches the log
+    def clear_cache(self):
+        for name in os.listdir(self.path):
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import numpy as np
+
+# Catalog tables: one row per session with data and another per lap read
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session TEXT PRIMARY KEY,
+    track TEXT,
+    start_offset INTEGER,
+    end_offset INTEGER
+);
+CREATE TABLE IF NOT EXISTS laps (
+    session TEXT,
+    lap INTEGER,
+    track TEXT,
+    time REAL,
+    complete INTEGER,
+    samples INTEGER,
+    average_speed REAL,
+    max_speed REAL,
+    weather TEXT,
+    start_offset INTEGER,
+    end_offset INTEGER,
+    PRIMARY KEY (session, lap)
+);
+CREATE INDEX IF NOT EXISTS sessions_track ON sessions (track, session);
+CREATE INDEX IF NOT EXISTS laps_track_time ON laps (track, time);
+"""
+
+# Columns of every lap of the catalog, in table order
+LAP_COLUMNS = ["session", "lap", "track", "time", "complete", "samples",
+               "average_speed", "max_speed", "weather", "start_offset", "end_offset"]
+
+# Function to summarise the laps read from a session into catalog rows
+def lap_rows(session, track, laps, end):
+    """
+    Returns a dictionary per lap with the columns of LAP_COLUMNS. The time
+    of a lap is, as in chart.py, the time from its first to its last
+    sample, and only laps followed by another lap are complete (the last
+    one is usually left unfinished). Every lap goes from the byte of its
+    first sample to the byte of the first sample of the next lap (or `end`,
+    the end of the session). The English log has no weather.
+    """
+    rows = []
+    for lap, data in laps.items():
+        timestamps = data["timestamps"]
+        if not len(timestamps):
+            continue
+        speeds = np.asarray(data["speeds"], dtype=float)
+        with_speed = speeds[~np.isnan(speeds)]
+        rows.append({
+            "session": session,
+            "lap": lap,
+            "track": track,
+            "time": float(timestamps[-1] - timestamps[0]),
+            "complete": lap != max(laps),
+            "samples": len(timestamps),
+            "average_speed": float(with_speed.mean()) if len(with_speed) else None,
+            "max_speed": float(with_speed.max()) if len(with_speed) else None,
+            "weather": None,
+            "start_offset": int(data["offsets"][0]),
+            "end_offset": end
+        })
+    rows.sort(key=lambda row: row["start_offset"])
+    for row, following in zip(rows, rows[1:]):
+        row["end_offset"] = following["start_offset"]
+    return sorted(rows, key=lambda row: row["lap"])
+
+# Function to convert an "mm:ss.fff" time (or just seconds) to seconds
+def time_seconds(text):
+    minutes, _, seconds = text.strip().replace(",", ".").rpartition(":")
+    return int(minutes or 0) * 60 + float(seconds)
+
+# Function to apply the filters of Catalog.find_laps to rows already calculated
+def filter_laps(rows, track=None, max_time=None):
+    if track is not None:
+        rows = [row for row in rows if row["track"] == track]
+    if max_time is not None:
+        rows = [row for row in rows if row["complete"] and row["time"] <= max_time]
+    return rows
+
+class Catalog:
+    """
+    SQLite catalog of the sessions and laps of a log, saved in its cache
+    folder, to list and filter sessions and laps with indexed queries
+    without reading their samples. Sessions are added when the log is
+    scanned and laps every time a session is read, with their time, number
+    of samples, average and maximum speed, weather and the bytes of the log
+    they are in. If the file cannot be opened, the catalog is only kept in
+    memory.
+    """
+    def __init__(self, path, version):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # The index can be opened in a thread and queried later from the window
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            if self.connection.execute("PRAGMA user_version").fetchone()[0] != version:
+                self.connection.executescript("DROP TABLE IF EXISTS sessions; DROP TABLE IF EXISTS laps;")
+            self.connection.executescript(SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Could not open the catalog '{path}', keeping it in memory: {e}")
+            self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+            self.connection.executescript(SCHEMA)
+        self.connection.execute(f"PRAGMA user_version = {int(version)}")
+        self.connection.row_factory = sqlite3.Row
+
+    # Function to know whether the catalog has no sessions (for example, if it was just created)
+    def empty(self):
+        return self.connection.execute("SELECT 1 FROM sessions LIMIT 1").fetchone() is None
+
+    # Function to add or update sessions: [(session, track, start offset, end offset), ...]
+    def save_sessions(self, sessions):
+        self.write(lambda: self.connection.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)", sessions))
+
+    # Function to replace the laps of a session with the ones of lap_rows
+    def save_laps(self, session, rows):
+        def write():
+            self.connection.execute("DELETE FROM laps WHERE session = ?", (session,))
+            self.connection.executemany(f"INSERT INTO laps VALUES ({', '.join('?' * len(LAP_COLUMNS))})",
+                                        [[row[column] for column in LAP_COLUMNS] for row in rows])
+        self.write(write)
+
+    # Function to make changes to the catalog in a single transaction
+    def write(self, write):
+        try:
+            with self.connection:
+                write()
+        except sqlite3.Error as e:
+            print(f"Could not save the catalog: {e}")
+
+    # Function to know whether the laps of a session have already been catalogued
+    def has_laps(self, session):
+        return self.connection.execute("SELECT 1 FROM laps WHERE session = ? LIMIT 1", (session,)).fetchone() is not None
+
+    # Function to get the tracks with any session
+    def find_tracks(self):
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT track FROM sessions WHERE track IS NOT NULL ORDER BY track")]
+
+    # Function to get [(session, track), ...] from the most recent to the oldest
+    def find_sessions(self, track=None):
+        if track is None:
+            query = self.connection.execute("SELECT session, track FROM sessions ORDER BY session DESC")
+        else:
+            query = self.connection.execute("SELECT session, track FROM sessions WHERE track = ? ORDER BY session DESC", (track,))
+        return [tuple(row) for row in query]
+
+    # Function to find catalogued laps
+    def find_laps(self, session=None, track=None, max_time=None):
+        """
+        Returns a dictionary per lap with the columns of LAP_COLUMNS: the ones
+        of a session by lap number or, without a session, the ones of every
+        session from the fastest to the slowest. With max_time (seconds)
+        only the complete laps that do not exceed it are returned.
+        """
+        conditions = []
+        parameters = []
+        if session is not None:
+            conditions.append("session = ?")
+            parameters.append(session)
+        if track is not None:
+            conditions.append("track = ?")
+            parameters.append(track)
+        if max_time is not None:
+            conditions.append("complete AND time <= ?")
+            parameters.append(max_time)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "lap" if session is not None else "time"
+        return [dict(row) for row in self.connection.execute(f"SELECT * FROM laps {where} ORDER BY {order}", parameters)]
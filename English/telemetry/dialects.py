@@ -0,0 +1,56 @@
+import os
+
+# Log formats depending on the language of the mod that wrote them
+# Each dialect has its session and sample markers, the keys of the sample
+# header and the name of each data field, mapped to the lap channel it is
+# stored in (only the channels this package reads)
+DIALECTS = {
+    "en": {
+        "session": "=== Telemetry started ",
+        "sample": "Telemetry | ",
+        "date": "Date",
+        "track": "Track",
+        "lap": "Lap",
+        "fields": {
+            "Speed": "speeds",
+            "Brake": "brakes",
+            "RPM": "rpms",
+            "Gear": "gears",
+            "Position": "positions",
+        },
+    },
+    "es": {
+        "session": "=== Telemetría iniciada ",
+        "sample": "Telemetría | ",
+        "date": "Fecha",
+        "track": "Circuito",
+        "lap": "Vuelta",
+        "fields": {
+            "Velocidad": "speeds",
+            "Freno": "brakes",
+            "RPM": "rpms",
+            "Marcha": "gears",
+            "Posición": "positions",
+        },
+    },
+}
+
+# Session marker of each dialect (in bytes) -> dialect name
+SESSION_MARKERS = {dialect["session"].encode("utf-8"): name for name, dialect in DIALECTS.items()}
+
+# Sample markers of every dialect (in bytes)
+SAMPLE_MARKERS = tuple(dialect["sample"].encode("utf-8") for dialect in DIALECTS.values())
+
+# Common start of every session marker, which is what is searched for in the log
+SESSION_PREFIX = os.path.commonprefix(list(SESSION_MARKERS))
+
+# Function to recognise the session marker that starts at `position`
+def session_marker(data, position=0):
+    """
+    Returns (marker, dialect) if the session header of some dialect starts
+    at that position of `data` (bytes), or (None, None) otherwise.
+    """
+    for marker, name in SESSION_MARKERS.items():
+        if data.startswith(marker, position):
+            return marker, name
+    return None, None
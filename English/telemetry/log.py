@@ -0,0 +1,382 @@
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+import os
+import threading
+import numpy as np
+from .archive import ArchiveIndex
+from .cache import SessionIndex, read_lines
+from .dialects import DIALECTS, SESSION_PREFIX, session_marker
+
+# Name of the cache the scripts share next to the log
+CACHE_NAME = "telemetry"
+
+# Maximum number of samples of each chunk when the log is walked in parts
+CHUNK_SIZE = 4096
+
+# End of the session headers, the same in every dialect
+SESSION_END = b" ==="
+
+# Function to convert a decimal with a comma to float
+def decimal_value(value):
+    return float(value.replace(b",", b"."))
+
+# Function to decode a text value of the log
+def text_value(value):
+    return value.decode("utf-8", errors="replace").strip()
+
+# Function to create a converter that requires and removes the unit at the end of a value
+def suffixed_value(suffix):
+    suffix = suffix.encode("utf-8")
+    def convert(value):
+        if not value.endswith(suffix):
+            raise ValueError(value)
+        return value[:-len(suffix)]
+    return convert
+
+# Function to check a "(x, y, z)" value and keep "x, y, z"
+def vector_value(value):
+    value = value.strip(b"()")
+    if value.count(b", ") != 2:
+        raise ValueError(value)
+    return value
+
+# Channel -> converter of its values when the line is read (None: the bytes are kept as they are)
+# Decimals are only trimmed here; they are all converted at once when the read finishes
+converters = {
+    "speeds": suffixed_value(" km/h"),
+    "brakes": suffixed_value("%"),
+    "rpms": None,
+    "gears": None,
+    "positions": vector_value,
+}
+
+# Channel -> (NumPy type, columns) its values are converted to in bulk
+# Every channel has one value per sample, aligned with the timestamps, and NaN
+# in the samples that lack the field (which is why gears are decimals)
+bulk_channels = {
+    "speeds": (np.float64, None),
+    "brakes": (np.float64, None),
+    "rpms": (np.float64, None),
+    "gears": (np.float64, None),
+    "positions": (np.float64, 3),
+}
+
+# Function to prepare the table of a dialect: the sample marker, the keys of
+# its header and every field with its channel and converter, all in bytes
+def compile_dialect(dialect):
+    return (
+        dialect["sample"].encode("utf-8"),
+        dialect["date"].encode("utf-8"),
+        dialect["track"].encode("utf-8"),
+        dialect["lap"].encode("utf-8"),
+        {key.encode("utf-8"): (channel, converters[channel]) for key, channel in dialect["fields"].items()},
+    )
+
+# Tables of every dialect, prepared only once when the module is imported
+dialect_tables = {name: compile_dialect(dialect) for name, dialect in DIALECTS.items()}
+
+# Function to create the data lists of a new lap
+def new_lap():
+    return {
+        "timestamps": [],
+        "offsets": [],  # Byte of the log where every sample starts
+        "speeds": [],
+        "brakes": [],
+        "rpms": [],
+        "gears": [],
+        "durations": [],
+        "positions": []
+    }
+
+# Function to create the sample (row) of every value of the channels of a lap being read
+def new_rows():
+    return {channel: [] for channel in bulk_channels}
+
+# Function to convert a list of values in bytes to a NumPy array in one go
+def bulk_values(values, dtype, columns=None):
+    """
+    Replaces the decimal commas of every value in a single pass and lets
+    NumPy parse the whole text, instead of converting each value on its
+    own line. Returns (array, discarded), where discarded are the positions
+    of the values that are not numbers.
+    """
+    text = b" ".join(values)
+    if columns:
+        text = text.replace(b", ", b" ")
+    parts = text.replace(b",", b".").split()
+    if len(parts) == len(values) * (columns or 1):
+        try:
+            array = np.array(parts, dtype=dtype)
+            return (array.reshape(-1, columns) if columns else array), []
+        except ValueError:
+            pass
+
+    # Some value is not a number: convert them one by one and drop the wrong ones
+    rows = []
+    discarded = []
+    for index, value in enumerate(values):
+        try:
+            if columns:
+                rows.append([decimal_value(part) for part in value.split(b", ")])
+            elif np.issubdtype(dtype, np.integer):
+                rows.append(int(value))
+            else:
+                rows.append(decimal_value(value))
+        except ValueError:
+            discarded.append(index)
+    shape = (len(rows), columns) if columns else (len(rows),)
+    return np.array(rows, dtype=dtype).reshape(shape), discarded
+
+# Function to convert the channels of a lap read as bytes into NumPy arrays (without durations)
+def finish_lap(data, rows):
+    """
+    Every value goes to the row of the sample it came from, so all the
+    arrays have one row per timestamp, with NaN in the samples without it.
+    """
+    arrays = {"timestamps": np.asarray(data["timestamps"], dtype=np.float64), "offsets": np.asarray(data["offsets"], dtype=np.int64)}
+    samples = len(arrays["timestamps"])
+    for channel, (dtype, columns) in bulk_channels.items():
+        values, discarded = bulk_values(data[channel], dtype, columns)
+        channel_rows = np.delete(rows[channel], discarded) if discarded else rows[channel]
+        arrays[channel] = np.full((samples, columns) if columns else samples, np.nan, dtype=dtype)
+        arrays[channel][channel_rows] = values
+    return arrays
+
+# Function to join the chunks of a lap into lists and calculate its durations
+def join_chunks(chunks):
+    data = new_lap()
+    for channel in chunks[0]:
+        array = np.concatenate([chunk[channel] for chunk in chunks]) if len(chunks) > 1 else chunks[0][channel]
+        data[channel] = list(map(tuple, array.tolist())) if array.ndim > 1 else array.tolist()
+    calculate_durations(data)
+    return data
+
+# Function to get the seconds since 1970 of the start of a "dd/mm/yyyy" day
+@lru_cache(maxsize=None)
+def day_seconds(day):
+    d, m, y = day.split("/")
+    return (date(int(y), int(m), int(d)) - date(1970, 1, 1)).days * 86400.0
+
+# Function to convert a "dd/mm/yyyy hh:mm:ss.fff" timestamp to seconds since 1970
+def timestamp_seconds(timestamp):
+    # The fields are always at the same position; the date only changes once a day
+    return day_seconds(timestamp[:10]) + int(timestamp[11:13]) * 3600 + int(timestamp[14:16]) * 60 + float(timestamp[17:])
+
+# Function to calculate the duration of each data point relative to the start of the lap
+def calculate_durations(data):
+    if data["timestamps"]:
+        timestamps = np.asarray(data["timestamps"])
+        data["durations"] = (timestamps - timestamps[0]).tolist()
+
+# Chunk of a lap: consecutive samples of the lap as a channel -> array dictionary
+Chunk = namedtuple("Chunk", ["session", "track", "lap", "data"])
+
+class LogReader:
+    """
+    Walks the log going through every line only once and yields, one by
+    one, chunks of at most `size` consecutive samples of a lap (no limit if
+    it is None) with the session, track and lap they belong to. The data
+    of each chunk are NumPy arrays with one row per sample (positions as an
+    (N, 3) array), without durations, and nothing else is kept, so summaries of the whole log can
+    be computed with the memory of a single chunk.
+    Reads from state["offset"] (or from byte `start`) up to byte `end` (or
+    the end of the file); when it finishes, `state` is the point where it
+    stopped so reading can be continued from there.
+    A session header with no samples after it (the one the game leaves at
+    the end of the log) yields no chunk. The dialect (the language of the
+    mod that wrote the log) is recognised in every session header, so the
+    same log can mix both.
+    """
+    def __init__(self, file_path, state=None, start=0, end=None, size=CHUNK_SIZE):
+        self.file_path = file_path
+        self.state = state or {"offset": start, "dialect": None, "current_session": None, "session_track": None, "current_lap": None, "current_timestamp": None}
+        self.end = end
+        self.size = size
+
+    def __iter__(self):
+        offset = self.state["offset"]
+        dialect = self.state["dialect"]
+        current_session = self.state["current_session"]
+        session_track = self.state["session_track"]
+        current_lap = self.state["current_lap"]
+        current_timestamp = self.state["current_timestamp"]
+
+        # Field table of the dialect of the current session
+        if dialect is not None:
+            sample_start, date_key, track_key, lap_key, fields = dialect_tables[dialect]
+
+        # Continue in the lap where the previous read stopped
+        lap = None
+        if current_session is not None and current_lap is not None:
+            lap = new_lap()
+            rows = new_rows()
+        row_open = False  # Whether there is a sample row to add data to
+
+        for line in read_lines(self.file_path, offset, self.end):
+            line_start = offset
+            offset += len(line) + 1
+            line = line.strip()
+
+            # Search for session start (in any dialect)
+            if line.startswith(SESSION_PREFIX) and line.endswith(SESSION_END):
+                marker, name = session_marker(line)
+                if marker is None:
+                    continue
+                header = line[len(marker):-len(SESSION_END)].decode("utf-8", errors="replace").split(" ", 2)
+                if len(header) < 3:
+                    continue
+                if lap is not None:
+                    yield Chunk(current_session, session_track, current_lap, finish_lap(lap, rows))
+                    lap = None
+                dialect = name
+                sample_start, date_key, track_key, lap_key, fields = dialect_tables[dialect]
+                session_date, session_time, track = header
+                current_session = f"{session_date} {session_time}"  # Combine date and time
+                session_track = track.strip()
+                current_lap = None
+                continue
+
+            # If we're not in any session, skip
+            if current_session is None:
+                continue
+
+            # Sample header: "Telemetry | Date: ... | Track: ... | Lap: N"
+            if line.startswith(sample_start):
+                lap_number = current_lap
+                for field in line.split(b" | ")[1:]:
+                    key, _, value = field.partition(b": ")
+                    if key == date_key:
+                        current_timestamp = value.decode("ascii", errors="replace")
+                    elif key == track_key:
+                        session_track = text_value(value)
+                    elif key == lap_key and value.isdigit():
+                        lap_number = int(value)
+
+                # Start a new chunk when the lap changes or the current one is full
+                if lap is None or lap_number != current_lap or (self.size and len(lap["timestamps"]) >= self.size):
+                    if lap is not None:
+                        yield Chunk(current_session, session_track, current_lap, finish_lap(lap, rows))
+                    lap = new_lap() if lap_number is not None else None
+                    rows = new_rows()
+                    current_lap = lap_number
+
+                # Every sample takes a row, placed by its timestamp
+                row_open = lap is not None and bool(current_timestamp)
+                if row_open:
+                    lap["timestamps"].append(timestamp_seconds(current_timestamp))
+                    lap["offsets"].append(line_start)
+                continue
+
+            # Data line: "Key: value"
+            key, _, value = line.partition(b": ")
+            field = fields.get(key)
+            # Data before the first lap of the session is skipped
+            if field is None or lap is None:
+                continue
+
+            channel, convert = field
+            if convert is not None:
+                try:
+                    value = convert(value)
+                except ValueError:
+                    continue
+
+            if not row_open:
+                # End of a sample the previous read left half written: it goes in another row with its same timestamp
+                if not current_timestamp:
+                    continue
+                lap["timestamps"].append(timestamp_seconds(current_timestamp))
+                lap["offsets"].append(line_start)
+                row_open = True
+            lap[channel].append(value)
+            rows[channel].append(len(lap["timestamps"]) - 1)
+
+        if lap is not None:
+            yield Chunk(current_session, session_track, current_lap, finish_lap(lap, rows))
+
+        self.state = {
+            "offset": offset,
+            "dialect": dialect,
+            "current_session": current_session,
+            "session_track": session_track,
+            "current_lap": current_lap,
+            "current_timestamp": current_timestamp
+        }
+
+# Function to read and process the log
+def read_log(file_path, state=None, start=0, end=None):
+    """
+    Reads the log from state["offset"] (or from byte `start`) up to byte
+    `end` (or the end of the file) and returns
+    (sessions, track_per_session, state), where state is the point where
+    reading stopped so it can be continued from there.
+    It joins the chunks of LogReader by lap, so a session is only added
+    when its first sample arrives and a "=== Telemetry started" header with
+    no data after it is ignored without modifying the file.
+    Every channel of a lap has one value per sample, aligned with timestamps,
+    durations and offsets (the byte of the log where each sample starts),
+    with NaN in the samples that lack that field.
+    """
+    reader = LogReader(file_path, state, start, end, size=None)
+    chunks = {}
+    track_per_session = {}
+    for chunk in reader:
+        chunks.setdefault(chunk.session, {}).setdefault(chunk.lap, []).append(chunk.data)
+        track_per_session[chunk.session] = chunk.track
+
+    # Turn every lap into a single dictionary of lists
+    sessions = {}
+    for session, laps in chunks.items():
+        sessions[session] = {lap: join_chunks(data) for lap, data in laps.items()}
+    return sessions, track_per_session, reader.state
+
+# Function to open a telemetry log
+def load(file_path, name=CACHE_NAME, capacity=8, progress=None):
+    """
+    Returns the session index of the log: a
+    session -> {lap: {channel: list}} dictionary that reads every session
+    when it is requested and saves it to the `name` cache next to the log.
+    Its tracks are in the `tracks` attribute.
+    The log can be compressed (.gz, .bz2 or .xz) or be a folder of rotated
+    logs, which are read as a single one in chronological order.
+    `progress` (optional) receives the fraction of the log already indexed.
+    """
+    if os.path.isdir(file_path):
+        return ArchiveIndex(file_path, name, read_log, calculate_durations, as_lists=True, capacity=capacity, progress=progress)
+    return SessionIndex(file_path, name, read_log, calculate_durations, as_lists=True, capacity=capacity, progress=progress)
+
+class BackgroundLoad:
+    """
+    Opens a log with load() in a thread, so the windows are shown in the
+    meantime, and leaves its most recent session read, which is the one
+    shown when they open. `progress` is the fraction of the log already
+    indexed; when it finishes, `sessions` has the index or `error` the
+    exception. Tk cannot be used from another thread, so the window checks
+    done() periodically with after().
+    """
+    def __init__(self, file_path, name=CACHE_NAME, capacity=8):
+        self.progress = 0.0
+        self.sessions = None
+        self.error = None
+        self.thread = threading.Thread(target=self.index, args=(file_path, name, capacity), daemon=True)
+        self.thread.start()
+
+    # Function run in the thread
+    def index(self, file_path, name, capacity):
+        try:
+            sessions = load(file_path, name, capacity, self.note_progress)
+            recent = sessions.find_sessions()
+            if recent:
+                sessions[recent[0][0]]
+            self.sessions = sessions
+        except Exception as e:
+            self.error = e
+
+    # Function to save the indexed fraction, which the window reads when it refreshes
+    def note_progress(self, fraction):
+        self.progress = fraction
+
+    # Function to know whether it has finished (successfully or with an error)
+    def done(self):
+        return not self.thread.is_alive()
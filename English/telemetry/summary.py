@@ -0,0 +1,69 @@
+import argparse
+import time
+import numpy as np
+from .log import LogReader
+
+# Function to calculate the average speed of every lap of the log
+def average_speeds(file_path):
+    """
+    Returns {(session, lap): average speed}, like the one in chart.py,
+    walking the log in chunks without keeping the samples.
+    """
+    sums = {}  # (session, lap) -> [sum of the speeds, number of speeds]
+    for chunk in LogReader(file_path):
+        speeds = chunk.data["speeds"]
+        total = sums.setdefault((chunk.session, chunk.lap), [0.0, 0])
+        # Samples without speed are NaN
+        total[0] += float(np.nansum(speeds, dtype=np.float64))
+        total[1] += int(np.count_nonzero(~np.isnan(speeds)))
+    return {lap: total / count for lap, (total, count) in sums.items() if count}
+
+# Function to find the fastest lap of every track
+def best_laps(file_path):
+    """
+    Returns {track: (time, session, lap)} with the fastest lap of every
+    track in the whole log, walking it in chunks. The time of a lap is, as
+    in chart.py, the time from its first to its last sample. Only complete
+    laps count, that is, laps followed by another lap in the same session
+    (the last one is usually left unfinished).
+    """
+    laps = {}  # (session, lap) -> [track, first timestamp, last timestamp]
+    last_lap = {}  # session -> number of its last lap
+    for chunk in LogReader(file_path):
+        last_lap[chunk.session] = max(last_lap.get(chunk.session, chunk.lap), chunk.lap)
+        timestamps = chunk.data["timestamps"]
+        if not len(timestamps):
+            continue
+        key = (chunk.session, chunk.lap)
+        if key in laps:
+            laps[key][0] = chunk.track
+            laps[key][2] = timestamps[-1]
+        else:
+            laps[key] = [chunk.track, timestamps[0], timestamps[-1]]
+
+    best = {}
+    for (session, lap), (track, first, last) in laps.items():
+        if lap == last_lap[session]:
+            continue
+        lap_time = float(last - first)
+        if track not in best or lap_time < best[track][0]:
+            best[track] = (lap_time, session, lap)
+    return best
+
+# Show the summaries of the whole log without loading it into memory
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m telemetry.summary", description="Shows the best lap of every track and the average speed of every lap of the log")
+    parser.add_argument("log", help="Path of the telemetry log")
+    arguments = parser.parse_args()
+
+    read_start = time.perf_counter()
+    best = best_laps(arguments.log)
+    averages = average_speeds(arguments.log)
+
+    print("Best lap per track:")
+    for track, (lap_time, session, lap) in sorted(best.items()):
+        print(f"  {track}: {int(lap_time // 60):02d}:{lap_time % 60:06.3f} (session {session}, lap {lap})")
+    print("Average speed per lap:")
+    for (session, lap), average in averages.items():
+        print(f"  {session} lap {lap}: {average:.1f} km/h")
+    print(f"Log summarised in {time.perf_counter() - read_start:.2f} s")
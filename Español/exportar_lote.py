@@ -0,0 +1,81 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import matplotlib
+# Sin ventana: las gráficas se dibujan con Agg, que no necesita pantalla
+matplotlib.use("Agg")
+import grafica
+from telemetria import cargar
+
+# Sesiones del registro abiertas en este proceso (las abre iniciar_proceso)
+sesiones = None
+
+# Función para abrir el registro y crear la figura una sola vez en cada proceso
+def iniciar_proceso(ruta_archivo):
+    global sesiones
+    sesiones = cargar(ruta_archivo)
+    grafica.crear_figura()
+
+# Función para obtener el nombre de la imagen de una sesión, como los de "Exportar Gráficas"
+def nombre_imagen(sesion, circuito):
+    """
+    Devuelve "{circuito}_{fecha}.png" con la fecha de la sesión en lugar de
+    la de la exportación, para que cada sesión tenga siempre el mismo nombre.
+    """
+    try:
+        fecha = datetime.strptime(sesion, "%d/%m/%Y %H:%M:%S.%f").strftime("%d-%m-%Y_%H-%M-%S")
+    except ValueError:
+        fecha = sesion.replace("/", "-").replace(":", "-").replace(" ", "_")
+    return f"{circuito}_{fecha}.png"
+
+# Función para dibujar todas las vueltas de una sesión y guardarlas como imagen
+def exportar_sesion(sesion, carpeta, ppp):
+    circuito = sesiones.circuitos.get(sesion) or "Circuito Desconocido"
+    vueltas = sesiones[sesion]
+    grafica.dibujar_vueltas(sesion, circuito, vueltas, sorted(vueltas))
+    ruta = os.path.join(carpeta, nombre_imagen(sesion, circuito))
+    grafica.fig.savefig(ruta, dpi=ppp, bbox_inches='tight', transparent=True)
+    return ruta
+
+# Exportar las gráficas de varias sesiones sin abrir la ventana
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(description="Exporta sin ventana las gráficas de todas las sesiones del registro (o de las elegidas), repartiéndolas entre varios procesos")
+    analizador.add_argument("registro", help="Ruta del registro de telemetría")
+    analizador.add_argument("-o", "--carpeta", default=grafica.ruta_exportaciones, help="Carpeta en la que se guardan las imágenes")
+    analizador.add_argument("-c", "--circuito", default=None, help="Exportar solo las sesiones de este circuito")
+    analizador.add_argument("-s", "--sesion", action="append", default=None, help="Exportar solo esta sesión (se puede repetir)")
+    analizador.add_argument("-p", "--procesos", type=int, default=None, help="Número de procesos (por defecto uno por núcleo; 1 = sin procesos)")
+    analizador.add_argument("--ppp", type=int, default=300, help="Resolución de las imágenes en puntos por pulgada")
+    argumentos = analizador.parse_args()
+
+    inicio_exportacion = time.perf_counter()
+
+    # Leer antes las sesiones que no están en la caché, para que cada proceso solo tenga que cargarlas de ella
+    iniciar_proceso(argumentos.registro)
+    sesiones.precargar(argumentos.procesos)
+    elegidas = [sesion for sesion, _ in sesiones.buscar_sesiones(argumentos.circuito)
+                if argumentos.sesion is None or sesion in argumentos.sesion]
+    os.makedirs(argumentos.carpeta, exist_ok=True)
+
+    exportadas = 0
+    if argumentos.procesos == 1 or len(elegidas) < 2:
+        for sesion in elegidas:
+            try:
+                print(f"¡Gráfico exportado como '{exportar_sesion(sesion, argumentos.carpeta, argumentos.ppp)}'!")
+                exportadas += 1
+            except Exception as e:
+                print(f"No se pudo exportar la sesión {sesion}: {e}")
+    else:
+        # Cada proceso abre el registro una vez y reutiliza su figura para todas las sesiones que le tocan
+        with ProcessPoolExecutor(max_workers=argumentos.procesos, initializer=iniciar_proceso, initargs=(argumentos.registro,)) as pool:
+            futuros = {pool.submit(exportar_sesion, sesion, argumentos.carpeta, argumentos.ppp): sesion for sesion in elegidas}
+            for futuro in as_completed(futuros):
+                try:
+                    print(f"¡Gráfico exportado como '{futuro.result()}'!")
+                    exportadas += 1
+                except Exception as e:
+                    print(f"No se pudo exportar la sesión {futuros[futuro]}: {e}")
+
+    print(f"{exportadas} de {len(elegidas)} sesiones exportadas en {time.perf_counter() - inicio_exportacion:.2f} s")
@@ -0,0 +1,221 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+# Circuitos del registro sintético: nombre, radios del trazado (x, y) en metros, centro y duración media de una vuelta en segundos
+CIRCUITOS = [
+    ("Nurburgring GP", 900, 600, (-1200, 3400), 95),
+    ("Spa", 1400, 800, (2100, -800), 140),
+    ("Monza 1966", 1100, 500, (300, 5200), 110),
+    ("Fujimi_Kaido", 700, 900, (-2600, -1500), 100),
+]
+
+# Climas de GTA 5 tal como los escribe el mod (World.Weather)
+CLIMAS = ["ExtraSunny", "Clear", "Clouds", "Overcast", "Raining", "ThunderStorm", "Foggy", "Clearing"]
+
+# Líneas de cada muestra según el dialecto, en el orden en que las escribe el mod. La fecha y la
+# hora del juego van aparte porque su punto no cambia con el separador decimal
+MUESTRA = {
+    "es": ("Telemetría | Fecha: {fecha} | Circuito: {circuito} | Vuelta: {vuelta}\r\n"
+           "  Hora del juego: {hora_juego}\r\n",
+           "  Clima: {clima}\r\n"
+           "  Velocidad: {velocidad:.1f} km/h\r\n"
+           "  Velocidad de las ruedas: {velocidad_ruedas:.1f} km/h\r\n"
+           "  Velocidad vectores: X={vx:.1f} Y={vy:.1f} Z={vz:.1f} m/s\r\n"
+           "  Pedal Acelerador: {pedal_acelerador:.0f}%\r\n"
+           "  Acelerador: {acelerador:.0f}%\r\n"
+           "  RPM: {rpm:.0f}\r\n"
+           "  Freno: {freno:.0f}%\r\n"
+           "  Embrague: {embrague:g}\r\n"
+           "  Marcha: {marcha}\r\n"
+           "  Ángulo de giro: {angulo_giro:.1f}º\r\n"
+           "  Turbo: {turbo:.0f}%\r\n"
+           "  Nivel de combustible: {combustible:.1f}L\r\n"
+           "  Nivel de aceite: {aceite:.1f}L\r\n"
+           "  Temperatura del motor: {temperatura:.1f}ºC\r\n"
+           "  Posición: ({x:.2f}, {y:.2f}, {z:.2f})\r\n"
+           "  Dirección: ({dx:.2f}, {dy:.2f}, {dz:.2f})\r\n"
+           "  4 ruedas en el suelo: {en_suelo}\r\n"
+           "  Nivel de suciedad: {suciedad:.0f}%\r\n"
+           "  Luces: {luces}\r\n"
+           "  Luces Largas: {luces_largas}\r\n"),
+    "en": ("Telemetry | Date: {fecha} | Track: {circuito} | Lap: {vuelta}\r\n",
+           "  Speed: {velocidad:.1f} km/h\r\n"
+           "  RPM: {rpm:.0f}\r\n"
+           "  Gear: {marcha}\r\n"
+           "  Brake: {freno:.0f}%\r\n"
+           "  Fuel level: {combustible:.1f}%\r\n"
+           "  Position: ({x:.2f}, {y:.2f}, {z:.2f})\r\n"
+           "  Direction: ({dx:.2f}, {dy:.2f}, {dz:.2f})\r\n"
+           "  4 wheels on ground: {en_suelo}\r\n"),
+}
+
+# Cabecera de sesión de cada dialecto (WriteLine("\n=== ...") deja una línea en blanco antes)
+CABECERA = {
+    "es": "\n=== Telemetría iniciada {fecha} {circuito} ===\r\n",
+    "en": "\n=== Telemetry started {fecha} {circuito} ===\r\n",
+}
+
+# Función para convertir un tamaño como "10MB" o "2GB" en bytes
+def tamano_bytes(texto):
+    texto = texto.strip().upper().rstrip("B")
+    for sufijo, factor in (("K", 1024), ("M", 1024 ** 2), ("G", 1024 ** 3)):
+        if texto.endswith(sufijo):
+            return int(float(texto[:-1]) * factor)
+    return int(texto)
+
+# Función para escribir una fecha como el mod (dd/MM/yyyy HH:mm:ss.fff)
+def formatear_fecha(fecha):
+    return fecha.strftime("%d/%m/%Y %H:%M:%S.") + f"{fecha.microsecond // 1000:03d}"
+
+# Función para calcular las muestras de una vuelta al circuito
+def muestras_vuelta(circuito, duracion, frecuencia, aleatorio):
+    """
+    Devuelve un diccionario de arrays con una fila por muestra: el coche da
+    una vuelta al trazado del circuito en `duracion` segundos, más despacio
+    en las curvas, y el resto de canales se deducen de su velocidad.
+    """
+    _, radio_x, radio_y, (centro_x, centro_y), _ = circuito
+    n = max(int(duracion * frecuencia), 2)
+    avance = np.arange(n) / n
+    angulo = 2 * np.pi * (avance + 0.03 * np.sin(6 * np.pi * avance)) + aleatorio.uniform(-0.01, 0.01)
+    x = centro_x + radio_x * (np.cos(angulo) + 0.15 * np.cos(3 * angulo)) + aleatorio.normal(0, 0.3, n)
+    y = centro_y + radio_y * (np.sin(angulo) + 0.10 * np.sin(2 * angulo)) + aleatorio.normal(0, 0.3, n)
+    z = 30 + 5 * np.sin(angulo) + aleatorio.normal(0, 0.05, n)
+
+    # Velocidad y dirección a partir del desplazamiento hasta la muestra siguiente (el trazado es cerrado)
+    dx, dy, dz = np.roll(x, -1) - x, np.roll(y, -1) - y, np.roll(z, -1) - z
+    distancia = np.sqrt(dx * dx + dy * dy + dz * dz)
+    velocidad = distancia * frecuencia * 3.6
+    direccion = np.stack([dx, dy, dz]) / np.maximum(distancia, 1e-9)
+    aceleracion = np.gradient(velocidad) * frecuencia
+
+    # Giro: cambio del rumbo entre muestras
+    rumbo = np.unwrap(np.arctan2(dy, dx))
+    giro = np.clip(np.gradient(rumbo) * frecuencia * 25, -40, 40)
+
+    freno = np.clip(-aceleracion * 8, 0, 100)
+    acelerador = np.where(freno > 0, 0, np.clip(60 + aceleracion * 8, 0, 100))
+    marcha = np.clip(1 + velocidad // 45, 1, 7).astype(int)
+    rpm = np.clip(2500 + (velocidad - (marcha - 1) * 45) / 45 * 5500, 900, 8500)
+    embrague = np.where(np.diff(marcha, prepend=marcha[0]) != 0, 0.2, 1)
+
+    return {
+        "n": n,
+        "velocidad": velocidad,
+        "velocidad_ruedas": velocidad * (1 + aleatorio.normal(0, 0.01, n)),
+        "vx": direccion[0] * velocidad / 3.6,
+        "vy": direccion[1] * velocidad / 3.6,
+        "vz": direccion[2] * velocidad / 3.6,
+        "pedal_acelerador": np.clip(acelerador + aleatorio.normal(0, 2, n), 0, 100),
+        "acelerador": acelerador,
+        "rpm": rpm,
+        "freno": freno,
+        "embrague": embrague,
+        "marcha": marcha,
+        "angulo_giro": giro,
+        "turbo": np.clip(acelerador * 0.9 - 5, -10, 100),
+        "temperatura": 90 + 4 * np.sin(angulo) + aleatorio.normal(0, 0.2, n),
+        "x": x, "y": y, "z": z,
+        "dx": direccion[0], "dy": direccion[1], "dz": direccion[2],
+        "en_suelo": aleatorio.random(n) > 0.002,
+    }
+
+# Función para escribir un registro sintético
+def escribir_registro(ruta, dialecto="es", sesiones=3, vueltas=10, frecuencia=10, tamano=None, semilla=1, coma=None):
+    """
+    Escribe en `ruta` un registro de telemetría como el del mod, con
+    `sesiones` sesiones de `vueltas` vueltas y `frecuencia` muestras por
+    segundo. Cada sesión es en un circuito, a una hora del juego y con un
+    clima al azar (las de noche llevan las luces encendidas y, a más de 120
+    km/h, las largas). Con `tamano` (bytes) se siguen añadiendo sesiones hasta
+    alcanzarlo. `coma` indica si los decimales llevan coma, como en Windows
+    en español (por defecto, solo en el dialecto "es").
+    Devuelve {"sesiones", "vueltas", "muestras", "bytes"}.
+    """
+    aleatorio = np.random.default_rng(semilla)
+    if coma is None:
+        coma = dialecto == "es"
+    fijo, variable = MUESTRA[dialecto]
+    resumen = {"sesiones": 0, "vueltas": 0, "muestras": 0, "bytes": 0}
+    fecha = datetime(2025, 3, 1, 20, 0, 0)
+    with open(ruta, "wb") as f:
+        while (resumen["bytes"] < tamano) if tamano else (resumen["sesiones"] < sesiones):
+            circuito = CIRCUITOS[aleatorio.integers(len(CIRCUITOS))]
+            clima = CLIMAS[aleatorio.integers(len(CLIMAS))]
+            segundo_juego = aleatorio.uniform(0, 86400)  # Un segundo real son 30 del juego
+            combustible = aleatorio.uniform(40, 65)
+            suciedad = 0.0
+
+            fecha += timedelta(hours=float(aleatorio.uniform(1, 30)))
+            texto = CABECERA[dialecto].format(fecha=formatear_fecha(fecha), circuito=circuito[0])
+            f.write(texto.encode("utf-8"))
+            resumen["bytes"] += len(texto.encode("utf-8"))
+            resumen["sesiones"] += 1
+
+            for vuelta in range(1, vueltas + 1):
+                # El clima cambia de vez en cuando entre vueltas
+                if aleatorio.random() < 0.1:
+                    clima = CLIMAS[aleatorio.integers(len(CLIMAS))]
+                datos = muestras_vuelta(circuito, circuito[4] * aleatorio.uniform(0.97, 1.05), frecuencia, aleatorio)
+                n = datos.pop("n")
+                datos = {clave: valores.tolist() for clave, valores in datos.items()}
+                consumo = np.linspace(0, 0.03 * circuito[4], n)
+                ensuciado = np.linspace(0, 12 if clima in ("Raining", "ThunderStorm") else 4, n)
+
+                partes = []
+                for i in range(n):
+                    instante = fecha + timedelta(seconds=i / frecuencia)
+                    segundos = (segundo_juego + i / frecuencia * 30) % 86400
+                    hora = int(segundos // 3600)
+                    noche = hora >= 20 or hora < 7
+                    valores = {clave: valores[i] for clave, valores in datos.items()}
+                    lineas = variable.format(
+                        clima=clima,
+                        combustible=max(combustible - consumo[i], 0),
+                        aceite=5.0,
+                        suciedad=min(suciedad + ensuciado[i], 100),
+                        luces=noche,
+                        luces_largas=noche and valores["velocidad"] > 120,
+                        **valores)
+                    if coma:
+                        lineas = lineas.replace(".", ",")
+                    partes.append(fijo.format(
+                        fecha=formatear_fecha(instante),
+                        circuito=circuito[0],
+                        vuelta=vuelta,
+                        hora_juego=f"{hora:02d}:{int(segundos // 60 % 60):02d}:{int(segundos % 60):02d}.000") + lineas)
+
+                datos_vuelta = "".join(partes).encode("utf-8")
+                f.write(datos_vuelta)
+                resumen["bytes"] += len(datos_vuelta)
+                resumen["vueltas"] += 1
+                resumen["muestras"] += n
+                fecha += timedelta(seconds=n / frecuencia)
+                segundo_juego += n / frecuencia * 30
+                combustible = max(combustible - consumo[-1], 0)
+                suciedad = min(suciedad + ensuciado[-1], 100)
+                if tamano and resumen["bytes"] >= tamano:
+                    break
+    return resumen
+
+# Generar un registro sintético para probar y medir los scripts sin jugar
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(description="Genera un registro de telemetría sintético, en el formato del mod en español o en inglés")
+    analizador.add_argument("registro", help="Ruta del registro que se crea")
+    analizador.add_argument("-d", "--dialecto", choices=sorted(MUESTRA), default="es", help="Idioma del mod que lo escribe")
+    analizador.add_argument("-s", "--sesiones", type=int, default=3, help="Número de sesiones")
+    analizador.add_argument("-v", "--vueltas", type=int, default=10, help="Vueltas por sesión")
+    analizador.add_argument("-f", "--frecuencia", type=float, default=10, help="Muestras por segundo")
+    analizador.add_argument("-t", "--tamano", default=None, help="Tamaño aproximado (por ejemplo 10MB o 2GB); se añaden sesiones hasta alcanzarlo")
+    analizador.add_argument("--semilla", type=int, default=1, help="Semilla del generador aleatorio, para repetir el mismo registro")
+    analizador.add_argument("--punto", action="store_true", help="Escribir los decimales con punto aunque el dialecto sea español")
+    argumentos = analizador.parse_args()
+
+    inicio = time.perf_counter()
+    resumen = escribir_registro(argumentos.registro, argumentos.dialecto, argumentos.sesiones, argumentos.vueltas,
+                                argumentos.frecuencia, tamano_bytes(argumentos.tamano) if argumentos.tamano else None,
+                                argumentos.semilla, False if argumentos.punto else None)
+    print(f"{resumen['sesiones']} sesiones, {resumen['vueltas']} vueltas y {resumen['muestras']} muestras "
+          f"({resumen['bytes'] / 1024 ** 2:.1f} MB) escritas en '{argumentos.registro}' en {time.perf_counter() - inicio:.2f} s")
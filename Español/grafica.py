@@ -1,19 +1,16 @@
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.gridspec as gridspec
-from matplotlib.ticker import FuncFormatter
+import time
+inicio_arranque = time.perf_counter()  # Para medir cuánto tarda en verse la ventana
 import tkinter as tk
 from tkinter import ttk
-import re
 from datetime import datetime
-import mplcursors
 import numpy as np
 import os
-from matplotlib.patches import Patch
-from matplotlib.lines import Line2D
+import sys
+from telemetria import CargaEnSegundoPlano, segundos_tiempo
+# Matplotlib, mplcursors y la vista 3D se importan al usarlos por primera vez, con la ventana ya a la vista
 
-# Ruta del archivo
-ruta_archivo = r"F:\Logs\telemetriagta5.log"
+# Ruta del archivo (se puede pasar otra como argumento)
+ruta_archivo = sys.argv[1] if len(sys.argv) > 1 else r"F:\Logs\telemetriagta5.log"
 ruta_exportaciones = r"F:\Logs\Exportaciones"
 
 # Listas para almacenar datos
@@ -31,221 +28,34 @@ animacion_timer = None
 tiempo_animacion = 0
 velocidad_animacion = 1.0  # 1.0 = tiempo real
 puntos_animacion = []  # Para almacenar los puntos de animación por cada línea
+fondo_mapa = None  # (imagen, límites) del mapa sin los puntos ni los conos, para repintar solo lo que se mueve
+tramos_animacion = None  # Muestras de todas las vueltas animadas juntas, que prepara preparar_tramos_animacion()
+
+# Variables para el modo directo
+directo_timer = None
+intervalo_directo = 200  # ms entre lecturas del registro (como máximo 5 refrescos por segundo)
+sesion_graficada = None  # Sesión dibujada por la última actualización completa
+vueltas_graficadas = []  # Vueltas dibujadas por la última actualización completa
+datos_graficados = {}  # vuelta -> datos de las vueltas dibujadas, para los tooltips
+
+# Variables para la vista 3D, que comparte las sesiones leídas con la gráfica
+ventana_mapa3D = None
+vista_mapa3D = None
+
+# Carga del registro en segundo plano (None cuando ya ha terminado)
+carga_registro = None
+
+# Figura con todas las gráficas, que crea crear_figura()
+fig = None
+lineas_vuelta = {}  # (eje, vuelta, marcador) -> línea de esa vuelta, que se reutiliza al cambiar la selección
+marcas_suciedad = []  # Separadores de vueltas en la gráfica de suciedad
+cursores = []  # Tooltips de la última actualización
 
 # Diccionario para almacenar sesiones
 sesiones = {}
 sesion_actual = None
 circuito_por_sesion = {}  # Almacenar circuito por sesión
 
-# Expresiones regulares para extraer datos
-patron_tiempo = re.compile(r"Fecha: (\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}\.\d{3})")
-patron_velocidad = re.compile(r"Velocidad: ([\d,]+) km/h")
-patron_velocidad_ruedas = re.compile(r"Velocidad de las ruedas: ([\d,]+) km/h")
-patron_freno = re.compile(r"Freno: ([\d,]+)%")
-patron_rpm = re.compile(r"RPM: ([\d,]+)")
-patron_marcha = re.compile(r"Marcha: (\d+)")
-patron_vuelta = re.compile(r"Vuelta: (\d+)")
-patron_circuito = re.compile(r"Circuito: (.+?) \| Vuelta:")
-patron_posicion = re.compile(r"Posición: \(([\d,-]+), ([\d,-]+), ([\d,-]+)\)")
-patron_inicio_sesion = re.compile(r"=== Telemetría iniciada (.+?) (.+?) (.+?) ===")
-patron_clima = re.compile(r"Clima: (.+)")
-patron_hora_juego = re.compile(r"Hora del juego: (\d{2}):(\d{2}):(\d{2})\.(\d{3})")
-patron_embrague = re.compile(r"Embrague: (\d+)")
-patron_angulo_giro = re.compile(r"Ángulo de giro: ([\d,-]+)º")
-patron_turbo = re.compile(r"Turbo: ([\d,-]+)%")
-patron_pedal_acelerador = re.compile(r"Pedal Acelerador: ([\d,]+)%")
-patron_temperatura_motor = re.compile(r"Temperatura del motor: ([\d,]+)ºC")
-patron_acelerador = re.compile(r"Acelerador: ([\d,]+)%")
-patron_suciedad = re.compile(r"Nivel de suciedad: ([\d,]+)%")
-patron_luces = re.compile(r"Luces: (True|False)")
-patron_luces_largas = re.compile(r"Luces Largas: (True|False)")
-patron_direccion = re.compile(r"Dirección: \(([\d,-]+), ([\d,-]+), ([\d,-]+)\)")
-
-# Función para limpiar la última línea si es un registro de inicio
-def limpiar_ultima_linea_si_registro(ruta_archivo, inicio_registro):
-    if os.path.exists(ruta_archivo) and os.path.getsize(ruta_archivo) > 0:
-        with open(ruta_archivo, "r", encoding="utf-8") as f:
-            lineas = f.readlines()
-        if lineas and lineas[-1].startswith(inicio_registro):
-            lineas.pop()
-            # Si la nueva última línea está en blanco, eliminarla también
-            if lineas and lineas[-1].strip() == "":
-                lineas.pop()
-            with open(ruta_archivo, "w", encoding="utf-8") as f:
-                f.writelines(lineas)
-
-# Limpiar archivos si es necesario
-limpiar_ultima_linea_si_registro(ruta_archivo, "=== Telemetría iniciada")
-
-# Leer y procesar el archivo
-with open(ruta_archivo, "r", encoding="utf-8") as archivo:
-    for linea in archivo:
-        # Buscar inicio de sesión
-        coincidencia_sesion = patron_inicio_sesion.search(linea)
-        if coincidencia_sesion:
-            fecha_sesion = coincidencia_sesion.group(1).strip()  # Fecha
-            hora_sesion = coincidencia_sesion.group(2).strip()  # Hora
-            circuito = coincidencia_sesion.group(3).strip()      # Circuito
-            sesion_actual = f"{fecha_sesion} {hora_sesion}"  # Combina fecha y hora
-            if sesion_actual not in sesiones:
-                sesiones[sesion_actual] = {}
-                circuito_por_sesion[sesion_actual] = circuito
-            continue
-
-        # Si no estamos en ninguna sesión, saltar
-        if sesion_actual is None:
-            continue
-
-        # Buscar el nombre del circuito
-        coincidencia_circuito = patron_circuito.search(linea)
-        if coincidencia_circuito:
-            circuito_por_sesion[sesion_actual] = coincidencia_circuito.group(1).strip()
-
-        coincidencia_tiempo = patron_tiempo.search(linea)
-        coincidencia_velocidad = patron_velocidad.search(linea)
-        coincidencia_freno = patron_freno.search(linea)
-        coincidencia_rpm = patron_rpm.search(linea)
-        coincidencia_marcha = patron_marcha.search(linea)
-        coincidencia_vuelta = patron_vuelta.search(linea)
-        coincidencia_posicion = patron_posicion.search(linea)
-        coincidencia_clima = patron_clima.search(linea)
-        coincidencia_hora_juego = patron_hora_juego.search(linea)
-        coincidencia_velocidad_ruedas = patron_velocidad_ruedas.search(linea)
-        coincidencia_acelerador = patron_acelerador.search(linea)
-        coincidencia_embrague = patron_embrague.search(linea)
-        coincidencia_angulo_giro = patron_angulo_giro.search(linea)
-        coincidencia_turbo = patron_turbo.search(linea)
-        coincidencia_pedal_acelerador = patron_pedal_acelerador.search(linea)
-        coincidencia_temperatura_motor = patron_temperatura_motor.search(linea)
-        coincidencia_suciedad = patron_suciedad.search(linea)
-        coincidencia_luces = patron_luces.search(linea)
-        coincidencia_luces_largas = patron_luces_largas.search(linea)
-        coincidencia_direccion = patron_direccion.search(linea)
-
-        if coincidencia_tiempo:
-            marca_tiempo_actual = coincidencia_tiempo.group(1)
-
-        if coincidencia_vuelta:
-            numero_vuelta = int(coincidencia_vuelta.group(1))
-            if numero_vuelta not in sesiones[sesion_actual]:
-                sesiones[sesion_actual][numero_vuelta] = {
-                    "marcas_tiempo": [],
-                    "velocidades": [],
-                    "velocidades_ruedas": [],
-                    "frenos": [],
-                    "rpms": [],
-                    "marchas": [],
-                    "duraciones": [],
-                    "posiciones": [],
-                    "climas": [],
-                    "horas_juego": [],
-                    "embragues": [],
-                    "angulos_giro": [],
-                    "turbos": [],
-                    "pedales_acelerador": [],
-                    "temperaturas_motor": [],
-                    "aceleradores": [],
-                    "luces": [],
-                    "luces_largas": [],
-                    "direcciones": []
-                }
-            vuelta_actual = numero_vuelta
-
-        if coincidencia_velocidad and marca_tiempo_actual:
-            velocidad = float(coincidencia_velocidad.group(1).replace(",", "."))
-            objeto_tiempo = datetime.strptime(marca_tiempo_actual, "%d/%m/%Y %H:%M:%S.%f")
-            sesiones[sesion_actual][vuelta_actual]["marcas_tiempo"].append(objeto_tiempo)
-            sesiones[sesion_actual][vuelta_actual]["velocidades"].append(velocidad)
-
-        if coincidencia_freno:
-            freno = float(coincidencia_freno.group(1).replace(",", "."))
-            sesiones[sesion_actual][vuelta_actual]["frenos"].append(freno)
-
-        if coincidencia_rpm:
-            rpm = float(coincidencia_rpm.group(1).replace(",", "."))
-            sesiones[sesion_actual][vuelta_actual]["rpms"].append(rpm)
-
-        if coincidencia_marcha:
-            marcha = int(coincidencia_marcha.group(1))
-            sesiones[sesion_actual][vuelta_actual]["marchas"].append(marcha)
-        
-        if coincidencia_posicion:
-            x = float(coincidencia_posicion.group(1).replace(",", "."))
-            y = float(coincidencia_posicion.group(2).replace(",", "."))
-            z = float(coincidencia_posicion.group(3).replace(",", "."))
-            
-            if vuelta_actual in sesiones[sesion_actual]:
-                if "posiciones" not in sesiones[sesion_actual][vuelta_actual]:
-                    sesiones[sesion_actual][vuelta_actual]["posiciones"] = []
-                sesiones[sesion_actual][vuelta_actual]["posiciones"].append((x, y, z))
-
-        if coincidencia_clima and vuelta_actual in sesiones[sesion_actual]:
-            clima = coincidencia_clima.group(1).strip()
-            sesiones[sesion_actual][vuelta_actual]["climas"].append(clima)
-
-        if coincidencia_hora_juego and vuelta_actual in sesiones[sesion_actual]:
-            hora = int(coincidencia_hora_juego.group(1))
-            minuto = int(coincidencia_hora_juego.group(2))
-            segundo = int(coincidencia_hora_juego.group(3))
-            milisegundo = int(coincidencia_hora_juego.group(4))
-            hora_juego_str = f"{hora:02d}:{minuto:02d}:{segundo:02d}.{milisegundo:04d}"
-            sesiones[sesion_actual][vuelta_actual]["horas_juego"].append(hora_juego_str)
-
-        if coincidencia_velocidad_ruedas and vuelta_actual in sesiones[sesion_actual]:
-            velocidad_ruedas = float(coincidencia_velocidad_ruedas.group(1).replace(",", "."))
-            sesiones[sesion_actual][vuelta_actual]["velocidades_ruedas"].append(velocidad_ruedas)
-
-        if coincidencia_acelerador and vuelta_actual in sesiones[sesion_actual]:
-            acelerador = float(coincidencia_acelerador.group(1).replace(",", "."))
-            sesiones[sesion_actual][vuelta_actual]["aceleradores"].append(acelerador)
-
-        if coincidencia_embrague and vuelta_actual in sesiones[sesion_actual]:
-            embrague = int(coincidencia_embrague.group(1))
-            sesiones[sesion_actual][vuelta_actual]["embragues"].append(embrague)
-
-        if coincidencia_angulo_giro and vuelta_actual in sesiones[sesion_actual]:
-            angulo_giro = float(coincidencia_angulo_giro.group(1).replace(",", "."))
-            sesiones[sesion_actual][vuelta_actual]["angulos_giro"].append(angulo_giro)
-
-        if coincidencia_turbo and vuelta_actual in sesiones[sesion_actual]:
-            turbo = float(coincidencia_turbo.group(1).replace(",", "."))
-            sesiones[sesion_actual][vuelta_actual]["turbos"].append(turbo)
-
-        if coincidencia_pedal_acelerador and vuelta_actual in sesiones[sesion_actual]:
-            pedal_acelerador = float(coincidencia_pedal_acelerador.group(1).replace(",", "."))
-            sesiones[sesion_actual][vuelta_actual]["pedales_acelerador"].append(pedal_acelerador)
-
-        if coincidencia_temperatura_motor and vuelta_actual in sesiones[sesion_actual]:
-            temperatura_motor = float(coincidencia_temperatura_motor.group(1).replace(",", "."))
-            sesiones[sesion_actual][vuelta_actual]["temperaturas_motor"].append(temperatura_motor)
-
-        if coincidencia_suciedad and vuelta_actual in sesiones[sesion_actual]:
-            suciedad = float(coincidencia_suciedad.group(1).replace(",", "."))
-            if "suciedades" not in sesiones[sesion_actual][vuelta_actual]:
-                sesiones[sesion_actual][vuelta_actual]["suciedades"] = []
-            sesiones[sesion_actual][vuelta_actual]["suciedades"].append(suciedad)
-
-        if coincidencia_luces and vuelta_actual in sesiones[sesion_actual]:
-            luces = coincidencia_luces.group(1) == "True"
-            if "luces" not in sesiones[sesion_actual][vuelta_actual]:
-                sesiones[sesion_actual][vuelta_actual]["luces"] = []
-            sesiones[sesion_actual][vuelta_actual]["luces"].append(luces)
-
-        if coincidencia_luces_largas and vuelta_actual in sesiones[sesion_actual]:
-            luces_largas = coincidencia_luces_largas.group(1) == "True"
-            if "luces_largas" not in sesiones[sesion_actual][vuelta_actual]:
-                sesiones[sesion_actual][vuelta_actual]["luces_largas"] = []
-            sesiones[sesion_actual][vuelta_actual]["luces_largas"].append(luces_largas)
-
-        if coincidencia_direccion and vuelta_actual in sesiones[sesion_actual]:
-            dx = float(coincidencia_direccion.group(1).replace(",", "."))
-            dy = float(coincidencia_direccion.group(2).replace(",", "."))
-            dz = float(coincidencia_direccion.group(3).replace(",", "."))
-            
-            if "direcciones" not in sesiones[sesion_actual][vuelta_actual]:
-                sesiones[sesion_actual][vuelta_actual]["direcciones"] = []
-            sesiones[sesion_actual][vuelta_actual]["direcciones"].append((dx, dy, dz))
-
 # Función para formatear segundos a mm:ss.ms
 def segundos_a_minutos(segundos, pos=None):
     # Formatea segundos a mm:ss.ms
@@ -264,100 +74,190 @@ def segundos_a_minutos(segundos, pos=None):
         milisegundos = int((segundos_restantes - segundos_enteros) * 1000)
         return f"{minutos:02d}:{segundos_enteros:02d}.{milisegundos:03d}"
 
-# Calcular la duración de cada punto de datos en relación al inicio de la vuelta
-for sesion, datos_vuelta in sesiones.items():
-    for numero_vuelta, datos in datos_vuelta.items():
-        if datos["marcas_tiempo"]:
-            t0 = datos["marcas_tiempo"][0]
-            datos["duraciones"] = [(t - t0).total_seconds() for t in datos["marcas_tiempo"]]
-
-# Crear las figuras usando GridSpec con 17 filas:
-fig = plt.figure(figsize=(18, 40))
-
-# GridSpec con 17 filas (una para cada gráfica + espacios)
-# Orden:
-# 0: Tiempos por vuelta
-# 1: Espacio
-# 2: Delta
-# 3: Velocidad media
-# 4: Velocidad
-# 5: Velocidad de las ruedas
-# 6: Acelerador
-# 7: Freno
-# 8: RPM
-# 9: Pedal Acelerador
-# 10: Embrague
-# 11: Marcha
-# 12: Turbo
-# 13: Ángulo de giro
-# 14: Fuerza G
-# 15: Temperatura del motor
-# 16: Espacio
-# 17: Suciedad
-# 18: Espacio
-# 19: Mapa 2D
-# 20: Espacio final
-gs = gridspec.GridSpec(21, 1, height_ratios=[1, 0.2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0.3, 1, 0.4, 4, 1])
-plt.subplots_adjust(left=0.07, right=0.98, top=0.97, bottom=0, hspace=0.02)
-
-# Definir cada eje (omitimos las filas en blanco)
-ax0  = fig.add_subplot(gs[0])   # Tiempos por vuelta
-ax1  = fig.add_subplot(gs[2])   # Delta
-ax8  = fig.add_subplot(gs[3])   # Velocidad media
-ax2  = fig.add_subplot(gs[4])   # Velocidad
-ax9  = fig.add_subplot(gs[5])   # Velocidad de las ruedas
-ax10 = fig.add_subplot(gs[6])   # Acelerador
-ax3  = fig.add_subplot(gs[7])   # Freno
-ax4  = fig.add_subplot(gs[8])   # RPM
-ax11 = fig.add_subplot(gs[9])   # Pedal Acelerador
-ax12 = fig.add_subplot(gs[10])  # Embrague
-ax5  = fig.add_subplot(gs[11])  # Marcha
-ax13 = fig.add_subplot(gs[12])  # Turbo
-ax14 = fig.add_subplot(gs[13])  # Ángulo de giro
-ax7  = fig.add_subplot(gs[14])  # Fuerza G
-ax15 = fig.add_subplot(gs[15])  # Temperatura del motor
-ax16 = fig.add_subplot(gs[17])  # Suciedad
-ax6  = fig.add_subplot(gs[19])  # Mapa 2D
+# Función para crear la figura y sus ejes (importa Matplotlib la primera vez)
+def crear_figura():
+    global fig, gs, ax0, ax1, ax2, ax3, ax4, ax5, ax6, ax7, ax8, ax9, ax10, ax11, ax12, ax13, ax14, ax15, ax16, canales_directo
+    global linea_tiempos, linea_suciedad, lineas_vuelta, fondo_mapa
+    import matplotlib.pyplot as plt
+    import matplotlib.gridspec as gridspec
+    from matplotlib.ticker import FuncFormatter
+
+    # Crear las figuras usando GridSpec con 17 filas:
+    fig = plt.figure(figsize=(18, 40))
+
+    # GridSpec con 17 filas (una para cada gráfica + espacios)
+    # Orden:
+    # 0: Tiempos por vuelta
+    # 1: Espacio
+    # 2: Delta
+    # 3: Velocidad media
+    # 4: Velocidad
+    # 5: Velocidad de las ruedas
+    # 6: Acelerador
+    # 7: Freno
+    # 8: RPM
+    # 9: Pedal Acelerador
+    # 10: Embrague
+    # 11: Marcha
+    # 12: Turbo
+    # 13: Ángulo de giro
+    # 14: Fuerza G
+    # 15: Temperatura del motor
+    # 16: Espacio
+    # 17: Suciedad
+    # 18: Espacio
+    # 19: Mapa 2D
+    # 20: Espacio final
+    gs = gridspec.GridSpec(21, 1, height_ratios=[1, 0.2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0.3, 1, 0.4, 4, 1])
+    plt.subplots_adjust(left=0.07, right=0.98, top=0.97, bottom=0, hspace=0.02)
+
+    # Definir cada eje (omitimos las filas en blanco)
+    ax0  = fig.add_subplot(gs[0])   # Tiempos por vuelta
+    ax1  = fig.add_subplot(gs[2])   # Delta
+    ax8  = fig.add_subplot(gs[3])   # Velocidad media
+    ax2  = fig.add_subplot(gs[4])   # Velocidad
+    ax9  = fig.add_subplot(gs[5])   # Velocidad de las ruedas
+    ax10 = fig.add_subplot(gs[6])   # Acelerador
+    ax3  = fig.add_subplot(gs[7])   # Freno
+    ax4  = fig.add_subplot(gs[8])   # RPM
+    ax11 = fig.add_subplot(gs[9])   # Pedal Acelerador
+    ax12 = fig.add_subplot(gs[10])  # Embrague
+    ax5  = fig.add_subplot(gs[11])  # Marcha
+    ax13 = fig.add_subplot(gs[12])  # Turbo
+    ax14 = fig.add_subplot(gs[13])  # Ángulo de giro
+    ax7  = fig.add_subplot(gs[14])  # Fuerza G
+    ax15 = fig.add_subplot(gs[15])  # Temperatura del motor
+    ax16 = fig.add_subplot(gs[17])  # Suciedad
+    ax6  = fig.add_subplot(gs[19])  # Mapa 2D
+
+    # Canal que dibuja cada gráfica temporal, para actualizar sus líneas en modo directo
+    canales_directo = {
+        ax2: "velocidades",
+        ax3: "frenos",
+        ax4: "rpms",
+        ax5: "marchas",
+        ax9: "velocidades_ruedas",
+        ax10: "aceleradores",
+        ax11: "pedales_acelerador",
+        ax12: "embragues",
+        ax13: "turbos",
+        ax14: "angulos_giro",
+        ax15: "temperaturas_motor"
+    }
+    lineas_vuelta = {}
+
+    # Etiquetas, rejillas y formatos de los ejes, que no cambian al cambiar de vueltas:
+    # las actualizaciones solo cambian los datos de las líneas y los límites
+    linea_tiempos, = ax0.plot([], [], marker='o', linestyle='none', color='tab:orange', label="Tiempo por vuelta")
+    ax0.yaxis.set_major_formatter(FuncFormatter(segundos_a_minutos))
+    ax0.xaxis.set_major_locator(plt.MaxNLocator(integer=True))
+    ax0.set_xlabel("Vuelta")
+    ax0.set_ylabel("Tiempo (mm:ss.ms)")
+    ax0.grid()
+    ax0.legend()
 
-def actualizar_grafica():
-    global sesion_seleccionada, animacion_activa, animacion_timer
-    
-    # Detener animación si está activa
-    if animacion_activa:
-        toggle_animacion()
+    ax1.set_ylabel("Delta (s)")
+    ax1.grid(axis="y")
+    ax1.set_xticks([])
 
-    print("Actualizando gráfica...")
-    selecciones_vueltas = listbox_vueltas.curselection()
-    
-    print(f"Sesión seleccionada: {sesion_seleccionada}")
-    print(f"Vueltas seleccionadas: {selecciones_vueltas}")
-    
-    if not sesion_seleccionada or not selecciones_vueltas:
-        print("No se han seleccionado sesión o vueltas.")
-        return
-    
-    circuito_actual = circuito_por_sesion.get(sesion_seleccionada, "Circuito Desconocido")
-    datos_vuelta_sesion = sesiones[sesion_seleccionada]
+    ax8.set_ylabel("Velocidad Media (km/h)")
+    ax8.grid(axis="y")
+    ax8.set_xticks([])
 
-    print(f"Sesión actual: {sesion_seleccionada}")
-    print(f"Circuito actual: {circuito_actual}")
-    print(f"Datos de la sesión: {datos_vuelta_sesion.keys()}")
-    
-    # Limpiar TODOS los ejes
-    for ax in [ax0, ax1, ax2, ax3, ax4, ax5, ax6, ax7, ax8, ax9, ax10, ax11, ax12, ax13, ax14, ax15, ax16]:
-        ax.cla()
+    # Gráficas temporales, con las etiquetas X solo en la de abajo
+    etiquetas = {
+        ax2: "Velocidad (km/h)",
+        ax3: "Freno (%)",
+        ax4: "RPM",
+        ax5: "Marcha",
+        ax7: "Fuerza G",
+        ax9: "Vel. Ruedas (km/h)",
+        ax10: "Acelerador (%)",
+        ax11: "Pedal Acel. (%)",
+        ax12: "Embrague",
+        ax13: "Turbo (%)",
+        ax14: "Ángulo (º)",
+        ax15: "Temp. Motor (ºC)"
+    }
+    for ax, etiqueta in etiquetas.items():
+        ax.xaxis.set_major_formatter(FuncFormatter(segundos_a_minutos))
+        ax.set_ylabel(etiqueta)
+        ax.grid()
+        if ax is not ax15:
+            ax.set_xticks([])
+    ax15.set_xlabel("Tiempo (mm:ss.ms)")
+
+    # Suciedad: una línea continua de toda la sesión, con un tramo de color por vuelta encima
+    linea_suciedad, = ax16.plot([], [], color='gray', linewidth=1, alpha=0.3)
+    ax16.set_ylabel("Suciedad (%)")
+    ax16.set_xlabel("Tiempo acumulado de sesión (s)")
+    ax16.grid(True, alpha=0.3)
+
+    # Mapa 2D
+    ax6.set_aspect('equal')
+    ax6.set_facecolor('none')
+    ax6.grid(False)
+    ax6.set_xticks([])
+    ax6.set_yticks([])
+    ax6.set_title("Trazadas")
+    for spine in ax6.spines.values():
+        spine.set_visible(False)
+
+    # Cada vez que se dibuja la figura entera se guarda el fondo del mapa para la animación
+    fondo_mapa = None
+    fig.canvas.mpl_connect("draw_event", guardar_fondo_mapa)
+
+# Función para obtener la línea de una vuelta en un eje, que se crea la primera vez que se dibuja esa vuelta
+def linea_vuelta(ax, numero_vuelta, marcador=None, **estilo):
+    """
+    Sin marcador es la línea de los datos de la vuelta; con marcador ('o' o
+    's'), el punto de inicio o de fin de su trazada, que no sale en la
+    leyenda.
+    """
+    clave = (ax, numero_vuelta, marcador)
+    if clave not in lineas_vuelta:
+        if marcador is None:
+            lineas_vuelta[clave], = ax.plot([], [], label=f"Vuelta {numero_vuelta}", **estilo)
+        else:
+            lineas_vuelta[clave], = ax.plot([], [], marker=marcador, markersize=7, markeredgecolor='black',
+                                            linestyle='none', zorder=3, label=f"_Vuelta {numero_vuelta}")
+    return lineas_vuelta[clave]
+
+# Función para poner los datos y el color de una vuelta en su línea y mostrarla
+def mostrar_linea(ax, numero_vuelta, x, y, color, marcador=None, **estilo):
+    linea = linea_vuelta(ax, numero_vuelta, marcador, **estilo)
+    linea.set_data(x, y)
+    linea.set_color(color)
+    linea.set_visible(True)
+    return linea
+
+# Función para dibujar en la figura las vueltas de una sesión, sin usar la ventana (también la usa exportar_lote.py)
+def dibujar_vueltas(sesion, circuito_actual, datos_vuelta_sesion, vueltas_seleccionadas):
+    """
+    Las vueltas reutilizan sus líneas de la actualización anterior (solo se
+    cambian sus datos, su color y si se ven) y los ejes conservan sus
+    etiquetas y rejillas. Devuelve los límites de cada vuelta en la gráfica
+    de suciedad, que usan sus tooltips.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.lines import Line2D
+    from matplotlib.patches import Patch
+
+    # Ocultar las líneas de todas las vueltas; las de las elegidas se vuelven a mostrar con sus datos
+    for linea in lineas_vuelta.values():
+        linea.set_visible(False)
+    for ax in [ax1, ax8]:
+        for barras in ax.containers[:]:
+            barras.remove()
+    for marca in marcas_suciedad:
+        marca.remove()
+    marcas_suciedad.clear()
     
     colores = plt.rcParams['axes.prop_cycle'].by_key()['color']
 
     # Calcular el inicio y fin común para las gráficas de velocidad, freno, RPM y marcha
-    vueltas_seleccionadas = []
-    for idx in selecciones_vueltas:
-        texto_vuelta = listbox_vueltas.get(idx)
-        numero_vuelta = int(texto_vuelta.split()[1])
-        vueltas_seleccionadas.append(numero_vuelta)
-
-    inicio = min([datos_vuelta_sesion[numero_vuelta]["duraciones"][0] for numero_vuelta in vueltas_seleccionadas if numero_vuelta in datos_vuelta_sesion and datos_vuelta_sesion[numero_vuelta]["duraciones"]], default=0)
-    fin = max([datos_vuelta_sesion[numero_vuelta]["duraciones"][-1] for numero_vuelta in vueltas_seleccionadas if numero_vuelta in datos_vuelta_sesion and datos_vuelta_sesion[numero_vuelta]["duraciones"]], default=1)
+    inicio = min([datos_vuelta_sesion[numero_vuelta]["duraciones"][0] for numero_vuelta in vueltas_seleccionadas if numero_vuelta in datos_vuelta_sesion and len(datos_vuelta_sesion[numero_vuelta]["duraciones"])], default=0)
+    fin = max([datos_vuelta_sesion[numero_vuelta]["duraciones"][-1] for numero_vuelta in vueltas_seleccionadas if numero_vuelta in datos_vuelta_sesion and len(datos_vuelta_sesion[numero_vuelta]["duraciones"])], default=1)
     
     print(f"Inicio: {inicio}, Fin: {fin}")
     
@@ -368,6 +268,7 @@ def actualizar_grafica():
     tiempos_vuelta = []
     numeros_vuelta_velocidad = []
     velocidades_medias = []
+    marchas_minima, marchas_maxima = np.inf, -np.inf
 
     for idx, numero_vuelta in enumerate(vueltas_seleccionadas):
         if numero_vuelta not in datos_vuelta_sesion:
@@ -376,70 +277,24 @@ def actualizar_grafica():
         color = colores[idx % len(colores)]
         
         # Obtener las duraciones como referencia para todas las gráficas
-        duraciones = datos_vuelta_sesion[numero_vuelta]["duraciones"]
-        duracion_len = len(duraciones)
+        datos_vuelta = datos_vuelta_sesion[numero_vuelta]
+        duraciones = datos_vuelta["duraciones"]
+        print(f"Longitud de duraciones para la vuelta {numero_vuelta}: {len(duraciones)}")
         
-        # Graficar en TODAS las gráficas asegurando que los datos tengan la misma longitud
-        try:
-            print(f"Longitud de duraciones para la vuelta {numero_vuelta}: {duracion_len}")
-            
-            # Velocidad (ax2) - ya sabemos que existe
-            velocidades = datos_vuelta_sesion[numero_vuelta]["velocidades"][:duracion_len]
-            ax2.plot(duraciones, velocidades, color=color, alpha=0.7, label=f"Vuelta {numero_vuelta}")
-            
-            # Freno (ax3)
-            frenos = datos_vuelta_sesion[numero_vuelta]["frenos"][:duracion_len] if len(datos_vuelta_sesion[numero_vuelta]["frenos"]) >= duracion_len else [0] * duracion_len
-            ax3.plot(duraciones, frenos, color=color, alpha=0.7, label=f"Vuelta {numero_vuelta}")
-            
-            # RPM (ax4)
-            rpms = datos_vuelta_sesion[numero_vuelta]["rpms"][:duracion_len] if len(datos_vuelta_sesion[numero_vuelta]["rpms"]) >= duracion_len else [0] * duracion_len
-            ax4.plot(duraciones, rpms, color=color, alpha=0.7, label=f"Vuelta {numero_vuelta}")
-            
-            # Marcha (ax5)
-            marchas = datos_vuelta_sesion[numero_vuelta]["marchas"][:duracion_len] if len(datos_vuelta_sesion[numero_vuelta]["marchas"]) >= duracion_len else [0] * duracion_len
-            ax5.plot(duraciones, marchas, color=color, alpha=0.7, label=f"Vuelta {numero_vuelta}")
-            
-            # Velocidad de las ruedas (ax9)
-            velocidades_ruedas = datos_vuelta_sesion[numero_vuelta]["velocidades_ruedas"][:duracion_len] if len(datos_vuelta_sesion[numero_vuelta]["velocidades_ruedas"]) >= duracion_len else [0] * duracion_len
-            ax9.plot(duraciones, velocidades_ruedas, color=color, alpha=0.7, label=f"Vuelta {numero_vuelta}")
-            
-            # Acelerador (ax10)
-            aceleradores = datos_vuelta_sesion[numero_vuelta]["aceleradores"][:duracion_len] if len(datos_vuelta_sesion[numero_vuelta]["aceleradores"]) >= duracion_len else [0] * duracion_len
-            ax10.plot(duraciones, aceleradores, color=color, alpha=0.7, label=f"Vuelta {numero_vuelta}")
-            
-            # Pedal Acelerador (ax11)
-            pedales_acelerador = datos_vuelta_sesion[numero_vuelta]["pedales_acelerador"][:duracion_len] if len(datos_vuelta_sesion[numero_vuelta]["pedales_acelerador"]) >= duracion_len else [0] * duracion_len
-            ax11.plot(duraciones, pedales_acelerador, color=color, alpha=0.7, label=f"Vuelta {numero_vuelta}")
-            
-            # Embrague (ax12)
-            embragues = datos_vuelta_sesion[numero_vuelta]["embragues"][:duracion_len] if len(datos_vuelta_sesion[numero_vuelta]["embragues"]) >= duracion_len else [0] * duracion_len
-            ax12.plot(duraciones, embragues, color=color, alpha=0.7, label=f"Vuelta {numero_vuelta}")
-            
-            # Turbo (ax13)
-            turbos = datos_vuelta_sesion[numero_vuelta]["turbos"][:duracion_len] if len(datos_vuelta_sesion[numero_vuelta]["turbos"]) >= duracion_len else [0] * duracion_len
-            ax13.plot(duraciones, turbos, color=color, alpha=0.7, label=f"Vuelta {numero_vuelta}")
-            
-            # Ángulo de giro (ax14)
-            angulos_giro = datos_vuelta_sesion[numero_vuelta]["angulos_giro"][:duracion_len] if len(datos_vuelta_sesion[numero_vuelta]["angulos_giro"]) >= duracion_len else [0] * duracion_len
-            ax14.plot(duraciones, angulos_giro, color=color, alpha=0.7, label=f"Vuelta {numero_vuelta}")
-            
-            # Temperatura del motor (ax15)
-            temperaturas_motor = datos_vuelta_sesion[numero_vuelta]["temperaturas_motor"][:duracion_len] if len(datos_vuelta_sesion[numero_vuelta]["temperaturas_motor"]) >= duracion_len else [0] * duracion_len
-            ax15.plot(duraciones, temperaturas_motor, color=color, alpha=0.7, label=f"Vuelta {numero_vuelta}")
-            
-        except Exception as e:
-            print(f"Error al graficar la vuelta {numero_vuelta}: {e}")
-            import traceback
-            traceback.print_exc()
+        # Todas las listas tienen una fila por muestra (NaN donde falta el dato), así que se grafican tal cual
+        for ax, lista in canales_directo.items():
+            mostrar_linea(ax, numero_vuelta, duraciones, datos_vuelta[lista], color, alpha=0.7)
+        velocidades = datos_vuelta["velocidades"]
+        marchas = datos_vuelta["marchas"]
         
-        # Configurar ticks de marchas
-        if marchas and any(m != 0 for m in marchas):
-            marchas_filtradas = [m for m in marchas if m != 0]
-            if marchas_filtradas:
-                ax5.set_yticks(range(int(min(marchas_filtradas)), int(max(marchas_filtradas)) + 1))
+        # Rango de marchas para los ticks
+        marchas_filtradas = marchas[np.isfinite(marchas) & (marchas != 0)]
+        if len(marchas_filtradas):
+            marchas_minima = min(marchas_minima, marchas_filtradas.min())
+            marchas_maxima = max(marchas_maxima, marchas_filtradas.max())
         
         # Recoger datos para la gráfica de tiempos por vuelta y de deltas
-        if duraciones:
+        if len(duraciones):
             tiempo_total = duraciones[-1]
             numeros_vuelta_linea.append(numero_vuelta)
             tiempos_totales.append(tiempo_total)
@@ -447,127 +302,60 @@ def actualizar_grafica():
             tiempos_vuelta.append(tiempo_total)
 
         # Calcular velocidad media para esta vuelta
-        if numero_vuelta in datos_vuelta_sesion and velocidades:
-            velocidad_media = np.mean(velocidades)
+        if not np.isnan(velocidades).all():
+            velocidad_media = np.nanmean(velocidades)
             numeros_vuelta_velocidad.append(numero_vuelta)
             velocidades_medias.append(velocidad_media)
 
+    # Configurar ticks de marchas
+    if np.isfinite(marchas_minima):
+        ax5.set_yticks(range(int(marchas_minima), int(marchas_maxima) + 1))
+    else:
+        ax5.yaxis.set_major_locator(plt.AutoLocator())
+
     # Gráfica de tiempos por vuelta (ax0)
-    if numeros_vuelta_linea:
-        ax0.plot(numeros_vuelta_linea, tiempos_totales, marker='o', linestyle='none',
-                color='tab:orange', label="Tiempo por vuelta")
-        
-        ax0.yaxis.set_major_formatter(FuncFormatter(segundos_a_minutos))
-        ax0.xaxis.set_major_locator(plt.MaxNLocator(integer=True))
-    
-    ax0.set_xlabel("Vuelta")
-    ax0.set_ylabel("Tiempo (mm:ss.ms)")
-    ax0.grid()
-    ax0.legend()
+    linea_tiempos.set_data(numeros_vuelta_linea, tiempos_totales)
 
     # Gráfica de deltas (ax1)
     if tiempos_vuelta:
         mejor_tiempo = min(tiempos_vuelta)
         deltas = [t - mejor_tiempo for t in tiempos_vuelta]
         ax1.bar(numeros_vuelta_delta, deltas, color='tab:red')
-    ax1.set_ylabel("Delta (s)")
-    ax1.grid(axis="y")
-    ax1.set_xticks([])
-
-    # Configurar límites y formato para todas las gráficas temporales
-    for ax in [ax2, ax3, ax4, ax5, ax7, ax9, ax10, ax11, ax12, ax13, ax14, ax15]:
-        ax.set_xlim(inicio, fin)
-        ax.xaxis.set_major_formatter(FuncFormatter(segundos_a_minutos))
-    
-    # Ocultar etiquetas X en las gráficas superiores
-    for ax in [ax2, ax3, ax4, ax5, ax9, ax10, ax11, ax12, ax13, ax14]:
-        ax.set_xticks([])
-
-    ax2.set_ylabel("Velocidad (km/h)")
-    ax2.grid()
-
-    ax3.set_ylabel("Freno (%)")
-    ax3.grid()
-
-    ax4.set_ylabel("RPM")
-    ax4.grid()
-
-    ax5.set_ylabel("Marcha")
-    ax5.grid()
 
     # Gráfica de velocidad media por vuelta (ax8)
     if numeros_vuelta_velocidad:
-        bars = ax8.bar(numeros_vuelta_velocidad, velocidades_medias, color=colores[:len(numeros_vuelta_velocidad)])
-        
-        # Añadir etiquetas con los valores
-        for bar in bars:
-            bar.get_height()
-    
-    ax8.set_ylabel("Velocidad Media (km/h)")
-    ax8.grid(axis="y")
-    ax8.set_xticks([])
+        ax8.bar(numeros_vuelta_velocidad, velocidades_medias, color=colores[:len(numeros_vuelta_velocidad)])
 
     # Fuerza G (ax7)
     for idx, numero_vuelta in enumerate(vueltas_seleccionadas):
         if numero_vuelta not in datos_vuelta_sesion:
             continue
         color = colores[idx % len(colores)]
-        lista_velocidades = datos_vuelta_sesion[numero_vuelta]["velocidades"]
-        lista_duraciones = datos_vuelta_sesion[numero_vuelta]["duraciones"]
-        
-        # Asegurar que tengan la misma longitud
-        min_len = min(len(lista_velocidades), len(lista_duraciones))
-        lista_velocidades = lista_velocidades[:min_len]
-        lista_duraciones = lista_duraciones[:min_len]
+        # Solo las muestras con velocidad (las demás están a NaN)
+        velocidades = datos_vuelta_sesion[numero_vuelta]["velocidades"]
+        con_velocidad = ~np.isnan(velocidades)
         
-        if min_len >= 2:
-            velocidades_mps = np.array(lista_velocidades) * 1000/3600
-            duraciones = np.array(lista_duraciones)
+        if np.count_nonzero(con_velocidad) >= 2:
+            velocidades_mps = velocidades[con_velocidad] * 1000/3600
+            duraciones = datos_vuelta_sesion[numero_vuelta]["duraciones"][con_velocidad]
             aceleracion = np.diff(velocidades_mps) / np.diff(duraciones)
             tiempos_medios = (duraciones[:-1] + duraciones[1:]) / 2
             fuerza_g = aceleracion / 9.81
-            ax7.plot(tiempos_medios, fuerza_g, color=color, alpha=0.7, label=f"Vuelta {numero_vuelta}")
-    
-    ax7.set_ylabel("Fuerza G")
-    ax7.grid()
-    ax7.set_xticks([])
+            mostrar_linea(ax7, numero_vuelta, tiempos_medios, fuerza_g, color, alpha=0.7)
 
-    # Velocidad de las ruedas (ax9)
-    ax9.set_ylabel("Vel. Ruedas (km/h)")
-    ax9.grid()
-    
-    # Acelerador (ax10)
-    ax10.set_ylabel("Acelerador (%)")
-    ax10.grid()
-    
-    # Pedal Acelerador (ax11)
-    ax11.set_ylabel("Pedal Acel. (%)")
-    ax11.grid()
-    
-    # Embrague (ax12)
-    ax12.set_ylabel("Embrague")
-    ax12.grid()
-    
-    # Turbo (ax13)
-    ax13.set_ylabel("Turbo (%)")
-    ax13.grid()
-    
-    # Ángulo de giro (ax14)
-    ax14.set_ylabel("Ángulo (º)")
-    ax14.grid()
-    
-    # Temperatura del motor (ax15)
-    ax15.set_xlim(inicio, fin)
-    ax15.xaxis.set_major_formatter(FuncFormatter(segundos_a_minutos))
-    ax15.set_ylabel("Temp. Motor (ºC)")
-    ax15.set_xlabel("Tiempo (mm:ss.ms)")
-    ax15.grid()
+    # Límites de las gráficas por vuelta y de las temporales (el eje Y se ajusta a las líneas que se ven)
+    for ax in [ax0, ax1, ax8]:
+        ax.relim(visible_only=True)
+        ax.autoscale_view()
+    for ax in [ax2, ax3, ax4, ax5, ax7, ax9, ax10, ax11, ax12, ax13, ax14, ax15]:
+        ax.set_xlim(inicio, fin)
+        ax.relim(visible_only=True)
+        ax.autoscale_view(scalex=False)
 
     # Suciedad (ax16)
     tiempo_acumulado = 0
-    todas_x = []
-    todas_y = []
-    colores_segmentos = []
+    segmentos_x = []
+    segmentos_y = []
     limites_vueltas = []  # Para almacenar los límites de cada vuelta
     
     for idx, numero_vuelta in enumerate(vueltas_seleccionadas):
@@ -576,132 +364,96 @@ def actualizar_grafica():
         
         color = colores[idx % len(colores)]
         
-        # Obtener datos de suciedad y duraciones para esta vuelta
-        if "suciedades" in datos_vuelta_sesion[numero_vuelta] and datos_vuelta_sesion[numero_vuelta]["suciedades"]:
-            suciedades = datos_vuelta_sesion[numero_vuelta]["suciedades"]
+        # Obtener datos de suciedad y duraciones para esta vuelta (alineadas por muestra)
+        suciedades = datos_vuelta_sesion[numero_vuelta]["suciedades"]
+        if not np.isnan(suciedades).all():
             duraciones_vuelta = datos_vuelta_sesion[numero_vuelta]["duraciones"]
             
-            # Asegurar que tengan la misma longitud
-            min_len = min(len(suciedades), len(duraciones_vuelta))
-            if min_len == 0:
-                continue
-                
-            suciedades = suciedades[:min_len]
-            duraciones_vuelta = duraciones_vuelta[:min_len]
-            
             # Ajustar las duraciones para que sean continuas
-            duraciones_ajustadas = [t + tiempo_acumulado for t in duraciones_vuelta]
+            duraciones_ajustadas = duraciones_vuelta + tiempo_acumulado
             
             # Almacenar los datos ajustados
-            todas_x.extend(duraciones_ajustadas)
-            todas_y.extend(suciedades)
-            
-            # Almacenar el color para este segmento
-            colores_segmentos.extend([color] * min_len)
+            segmentos_x.append(duraciones_ajustadas)
+            segmentos_y.append(suciedades)
             
             # Almacenar el límite de esta vuelta
             limites_vueltas.append({
                 'numero': numero_vuelta,
                 'color': color,
                 'inicio': tiempo_acumulado,
-                'fin': tiempo_acumulado + duraciones_vuelta[-1] if duraciones_vuelta else tiempo_acumulado,
-                'suciedad_inicio': suciedades[0] if suciedades else 0,
-                'suciedad_fin': suciedades[-1] if suciedades else 0
+                'fin': tiempo_acumulado + duraciones_vuelta[-1],
+                'suciedad_inicio': suciedades[0],
+                'suciedad_fin': suciedades[-1]
             })
             
-            # Actualizar tiempo acumulado para la siguiente vuelta
-            tiempo_acumulado += duraciones_vuelta[-1] if duraciones_vuelta else 0
-    
-    # Graficar la línea continua de suciedad
-    if todas_x and todas_y:
-        # Crear la línea principal
-        ax16.plot(todas_x, todas_y, color='gray', linewidth=1, alpha=0.3)
-        
-        # Superponer segmentos coloreados por vuelta
-        # Para esto necesitamos dividir la línea en segmentos por vuelta
-        for limite in limites_vueltas:
-            # Encontrar los índices de los puntos que pertenecen a esta vuelta
-            puntos_vuelta = []
-            tiempos_vuelta = []
+            # Tramo coloreado de esta vuelta sobre la línea continua
+            mostrar_linea(ax16, numero_vuelta, duraciones_ajustadas, suciedades, color, linewidth=2)
             
-            for i in range(len(todas_x)):
-                if limite['inicio'] <= todas_x[i] <= limite['fin']:
-                    puntos_vuelta.append(todas_y[i])
-                    tiempos_vuelta.append(todas_x[i])
-            
-            if tiempos_vuelta and puntos_vuelta:
-                ax16.plot(tiempos_vuelta, puntos_vuelta, 
-                         color=limite['color'], 
-                         linewidth=2, 
-                         label=f"Vuelta {limite['numero']}")
+            # Actualizar tiempo acumulado para la siguiente vuelta
+            tiempo_acumulado += duraciones_vuelta[-1]
+    
+    todas_x = np.concatenate(segmentos_x) if segmentos_x else np.empty(0)
+    todas_y = np.concatenate(segmentos_y) if segmentos_y else np.empty(0)
+    
+    # Línea continua de suciedad de todas las vueltas
+    linea_suciedad.set_data(todas_x, todas_y)
+    
+    # Añadir marcadores en los límites entre vueltas
+    for limite_actual in limites_vueltas[1:]:
+        # Dibujar una línea vertical punteada en el límite
+        marcas_suciedad.append(ax16.axvline(x=limite_actual['inicio'], 
+                                            color='black', 
+                                            linestyle='--', 
+                                            alpha=0.5, 
+                                            linewidth=0.5))
         
-        # Añadir marcadores en los límites entre vueltas
-        for i in range(1, len(limites_vueltas)):
-            limite_anterior = limites_vueltas[i-1]
-            limite_actual = limites_vueltas[i]
-            
-            # Dibujar una línea vertical punteada en el límite
-            ax16.axvline(x=limite_actual['inicio'], 
-                        color='black', 
-                        linestyle='--', 
-                        alpha=0.5, 
-                        linewidth=0.5)
-            
-            # Añadir etiqueta del número de vuelta
-            ax16.text(limite_actual['inicio'], 
-                     ax16.get_ylim()[1] * 0.95,  # Cerca del borde superior
-                     f"V{limite_actual['numero']}", 
-                     ha='center', 
-                     va='top',
-                     fontsize=8,
-                     bbox=dict(boxstyle="round,pad=0.3", 
-                              facecolor=limite_actual['color'], 
-                              alpha=0.7))
+        # Añadir etiqueta del número de vuelta, cerca del borde superior
+        marcas_suciedad.append(ax16.text(limite_actual['inicio'], 
+                                         0.95,
+                                         f"V{limite_actual['numero']}", 
+                                         transform=ax16.get_xaxis_transform(),
+                                         ha='center', 
+                                         va='top',
+                                         fontsize=8,
+                                         bbox=dict(boxstyle="round,pad=0.3", 
+                                                  facecolor=limite_actual['color'], 
+                                                  alpha=0.7)))
     
     # Configurar la gráfica de suciedad
-    if todas_x:
-        ax16.set_xlim(min(todas_x), max(todas_x))
+    ax16.relim(visible_only=True)
+    ax16.autoscale_view(scalex=False)
+    if len(todas_x):
+        ax16.set_xlim(todas_x.min(), todas_x.max())
     else:
         ax16.set_xlim(inicio, fin)
     
-    ax16.set_ylabel("Suciedad (%)")
-    ax16.set_xlabel("Tiempo acumulado de sesión (s)")
-    ax16.grid(True, alpha=0.3)
-
-    # Dibujar el mapa 2D (ax6)
-    ax6.set_aspect('equal')
-    ax6.set_facecolor('none')
-    ax6.grid(False)
-    ax6.set_xticks([])
-    ax6.set_yticks([])
-    ax6.set_title("Trazadas")
-    for spine in ax6.spines.values():
-        spine.set_visible(False)
-    
-    # Dibujar trayectorias en el mapa
+    # Dibujar trayectorias en el mapa (ax6)
+    trazadas = []
     for idx, numero_vuelta in enumerate(vueltas_seleccionadas):
         if numero_vuelta not in datos_vuelta_sesion:
             continue
         color = colores[idx % len(colores)]
-        if "posiciones" in datos_vuelta_sesion[numero_vuelta]:
-            posiciones = datos_vuelta_sesion[numero_vuelta]["posiciones"]
-            x = [p[0] for p in posiciones]
-            y = [p[1] for p in posiciones]
-            ax6.plot(x, y, color=color, alpha=0.7, linewidth=2, label=f"Vuelta {numero_vuelta}")
-            if x and y:
-                ax6.scatter(x[0], y[0], color=color, marker='o', s=50,
-                           edgecolor='black', zorder=3)
-                ax6.scatter(x[-1], y[-1], color=color, marker='s', s=50,
-                           edgecolor='black', zorder=3)
+        posiciones = datos_vuelta_sesion[numero_vuelta]["posiciones"]
+        # Las muestras sin posición (NaN) cortan la línea; inicio y fin son las primeras y últimas con ella
+        con_posicion = np.flatnonzero(~np.isnan(posiciones[:, 0]))
+        if len(con_posicion):
+            x = posiciones[:, 0]
+            y = posiciones[:, 1]
+            trazadas.append(mostrar_linea(ax6, numero_vuelta, x, y, color, alpha=0.7, linewidth=2))
+            mostrar_linea(ax6, numero_vuelta, x[con_posicion[:1]], y[con_posicion[:1]], color, marcador='o')
+            mostrar_linea(ax6, numero_vuelta, x[con_posicion[-1:]], y[con_posicion[-1:]], color, marcador='s')
     
     # Ajustar límites del mapa con un margen del 1%
-    todas_x_pos = [p[0] for numero_vuelta in vueltas_seleccionadas if numero_vuelta in datos_vuelta_sesion and "posiciones" in datos_vuelta_sesion[numero_vuelta] for p in datos_vuelta_sesion[numero_vuelta]["posiciones"]]
-    todas_y_pos = [p[1] for numero_vuelta in vueltas_seleccionadas if numero_vuelta in datos_vuelta_sesion and "posiciones" in datos_vuelta_sesion[numero_vuelta] for p in datos_vuelta_sesion[numero_vuelta]["posiciones"]]
-    if todas_x_pos and todas_y_pos:
-        margen_x = (max(todas_x_pos) - min(todas_x_pos)) * 0.01
-        margen_y = (max(todas_y_pos) - min(todas_y_pos)) * 0.01
-        ax6.set_xlim(min(todas_x_pos) - margen_x, max(todas_x_pos) + margen_x)
-        ax6.set_ylim(min(todas_y_pos) - margen_y, max(todas_y_pos) + margen_y)
+    posiciones_seleccionadas = [datos_vuelta_sesion[numero_vuelta]["posiciones"] for numero_vuelta in vueltas_seleccionadas if numero_vuelta in datos_vuelta_sesion]
+    todas_pos = np.concatenate(posiciones_seleccionadas) if posiciones_seleccionadas else np.empty((0, 3))
+    todas_pos = todas_pos[~np.isnan(todas_pos).any(axis=1)]
+    if len(todas_pos):
+        minimo_x, minimo_y = todas_pos[:, 0].min(), todas_pos[:, 1].min()
+        maximo_x, maximo_y = todas_pos[:, 0].max(), todas_pos[:, 1].max()
+        margen_x = (maximo_x - minimo_x) * 0.01
+        margen_y = (maximo_y - minimo_y) * 0.01
+        ax6.set_xlim(minimo_x - margen_x, maximo_x + margen_x)
+        ax6.set_ylim(minimo_y - margen_y, maximo_y + margen_y)
 
     leyenda_elementos = []
     leyenda_elementos.append(Line2D([0], [0], color='gray', lw=2, label='Trayectoria'))
@@ -712,10 +464,66 @@ def actualizar_grafica():
     leyenda_elementos.append(Patch(facecolor='#FFFF00', alpha=0.15, label='Luces normales'))
     leyenda_elementos.append(Patch(facecolor='#FFFF00', alpha=0.2, label='Luces largas'))
     
-    ax6.legend(loc='upper center', bbox_to_anchor=(0.5, -0.1), ncol=7, frameon=True, framealpha=0.8)
+    # La leyenda solo lleva las trazadas que se ven, en el orden de la selección
+    ax6.legend(handles=trazadas, loc='upper center', bbox_to_anchor=(0.5, -0.1), ncol=7, frameon=True, framealpha=0.8)
     
-    # Preparar datos para animación - FUERA del bucle anterior
-    global puntos_animacion
+    fig.suptitle(f"Sesión: {sesion} | Circuito: {circuito_actual}", 
+                 fontsize=14, fontweight="bold")
+
+    return limites_vueltas
+
+def actualizar_grafica():
+    # Detener animación si está activa
+    if animacion_activa:
+        toggle_animacion()
+
+    print("Actualizando gráfica...")
+    selecciones_vueltas = listbox_vueltas.curselection()
+    
+    print(f"Sesión seleccionada: {sesion_seleccionada}")
+    print(f"Vueltas seleccionadas: {selecciones_vueltas}")
+    
+    if not sesion_seleccionada or not selecciones_vueltas:
+        print("No se han seleccionado sesión o vueltas.")
+        return
+    
+    circuito_actual = circuito_por_sesion.get(sesion_seleccionada, "Circuito Desconocido")
+
+    print(f"Sesión actual: {sesion_seleccionada}")
+    print(f"Circuito actual: {circuito_actual}")
+    
+    # Números de las vueltas seleccionadas
+    vueltas_seleccionadas = []
+    for idx in selecciones_vueltas:
+        texto_vuelta = listbox_vueltas.get(idx)
+        numero_vuelta = int(texto_vuelta.split()[1])
+        vueltas_seleccionadas.append(numero_vuelta)
+
+    graficar_vueltas(vueltas_seleccionadas)
+
+# Función para dibujar las vueltas elegidas de la sesión seleccionada y preparar sus tooltips y su animación (también la usa medir_rendimiento.py)
+def graficar_vueltas(vueltas_seleccionadas):
+    global sesion_graficada, vueltas_graficadas, datos_graficados, puntos_animacion
+    import matplotlib.pyplot as plt
+    import mplcursors
+
+    circuito_actual = circuito_por_sesion.get(sesion_seleccionada, "Circuito Desconocido")
+
+    # Solo se cargan las muestras de las vueltas que se van a dibujar
+    datos_vuelta_sesion = sesiones.vueltas(sesion_seleccionada, vueltas_seleccionadas)
+    print(f"Datos de la sesión: {datos_vuelta_sesion.keys()}")
+
+    # Los ejes ya no se limpian, así que hay que quitar los puntos y conos de la animación anterior
+    for punto in puntos_animacion:
+        for elemento in [punto['punto_animacion'], *(punto.get('cono_luces') or [])]:
+            if elemento:
+                elemento.remove()
+
+    limites_vueltas = dibujar_vueltas(sesion_seleccionada, circuito_actual, datos_vuelta_sesion, vueltas_seleccionadas)
+
+    colores = plt.rcParams['axes.prop_cycle'].by_key()['color']
+
+    # Preparar datos para animación
     puntos_animacion = []
     
     for idx, numero_vuelta in enumerate(vueltas_seleccionadas):
@@ -723,31 +531,30 @@ def actualizar_grafica():
             continue
         
         color = colores[idx % len(colores)]
-        if "posiciones" in datos_vuelta_sesion[numero_vuelta]:
-            posiciones = datos_vuelta_sesion[numero_vuelta]["posiciones"]
-            duraciones = datos_vuelta_sesion[numero_vuelta]["duraciones"]
-            
-            if posiciones and duraciones and len(posiciones) > 0 and len(duraciones) > 0:
-                # Crear puntos para animación
-                puntos_animacion.append({
-                    'vuelta': numero_vuelta,
-                    'color': color,
-                    'posiciones': posiciones,
-                    'duraciones': duraciones,
-                    'luces': datos_vuelta_sesion[numero_vuelta].get("luces", []),
-                    'luces_largas': datos_vuelta_sesion[numero_vuelta].get("luces_largas", []),
-                    'direcciones': datos_vuelta_sesion[numero_vuelta].get("direcciones", []),
-                    'indice_actual': 0,
-                    'tiempo_acumulado': 0,
-                    'punto_animacion': None,
-                    'cono_luces': None,
-                    'linea_completada': False
-                })
-    
-    fig.suptitle(f"Sesión: {sesion_actual} | Circuito: {circuito_actual}", 
-                 fontsize=14, fontweight="bold")
+        posiciones = datos_vuelta_sesion[numero_vuelta]["posiciones"]
+        duraciones = datos_vuelta_sesion[numero_vuelta]["duraciones"]
+        
+        if len(posiciones) > 0 and len(duraciones) > 0:
+            # Crear puntos para animación
+            puntos_animacion.append({
+                'vuelta': numero_vuelta,
+                'color': color,
+                'posiciones': posiciones,
+                'duraciones': duraciones,
+                'luces': datos_vuelta_sesion[numero_vuelta]["luces"],
+                'luces_largas': datos_vuelta_sesion[numero_vuelta]["luces_largas"],
+                'direcciones': datos_vuelta_sesion[numero_vuelta]["direcciones"],
+                'indice_actual': 0,
+                'tiempo_acumulado': 0,
+                'punto_animacion': None,
+                'cono_luces': None,
+                'linea_completada': False
+            })
+    preparar_tramos_animacion()
     
-    # Configurar tooltips (con mplcursors) para algunas gráficas
+    # Configurar tooltips (con mplcursors) para algunas gráficas, sustituyendo los de la actualización anterior
+    for cursor in cursores:
+        cursor.remove()
     cursor0 = mplcursors.cursor(ax0, hover=True)
     cursor0.connect("add", lambda sel: sel.annotation.set_text(
         f"Vuelta: {sel.target[0]:.0f}\nTiempo: {segundos_a_minutos(sel.target[1], None)}"))
@@ -908,23 +715,28 @@ def actualizar_grafica():
                 sel.target[1]   # Suciedad
             )
         ))
+    cursores[:] = [cursor0, cursor1, cursor2, cursor3, cursor4, cursor5, cursor6, cursor7, cursor8,
+                   cursor9, cursor10, cursor11, cursor12, cursor13, cursor14, cursor15, cursor16]
     
+    sesion_graficada = sesion_seleccionada
+    vueltas_graficadas = vueltas_seleccionadas
+    datos_graficados = datos_vuelta_sesion
     canvas_fig.draw()
+    mostrar_mapa3D()
 
 def obtener_info_clima_hora(sesion, numero_vuelta, tiempo_relativo):
     # Obtiene información de clima y hora del juego formateada
-    datos_vuelta = sesiones[sesion][numero_vuelta]
+    datos_vuelta = datos_graficados[numero_vuelta]
     
-    if not datos_vuelta["duraciones"]:
+    if not len(datos_vuelta["duraciones"]):
         return ""
     
     # Buscar el índice más cercano
-    duraciones = np.array(datos_vuelta["duraciones"])
-    idx = (np.abs(duraciones - tiempo_relativo)).argmin()
+    idx = (np.abs(datos_vuelta["duraciones"] - tiempo_relativo)).argmin()
     
-    # Obtener datos
-    clima = datos_vuelta["climas"][idx] if idx < len(datos_vuelta["climas"]) else "Desconocido"
-    hora_juego = datos_vuelta["horas_juego"][idx] if idx < len(datos_vuelta["horas_juego"]) else "Desconocida"
+    # Obtener datos (vacíos si la muestra no los tiene)
+    clima = datos_vuelta["climas"][idx] or "Desconocido"
+    hora_juego = datos_vuelta["horas_juego"][idx] or "Desconocida"
     
     return f"Clima: {clima}\nHora juego: {hora_juego}"
 
@@ -935,28 +747,21 @@ def obtener_tooltip_completo(sesion, numero_vuelta, tiempo_relativo, texto_base)
 
 def obtener_tooltip_trazada(sesion, numero_vuelta, coord_x, coord_y):
     # Obtiene información para mostrar en tooltips de las trazadas
-    datos_vuelta = sesiones[sesion][numero_vuelta]
-    
-    if not datos_vuelta.get("posiciones"):
-        return f"Vuelta {numero_vuelta}\nSin datos de posición"
-    
-    # Buscar el punto más cercano en las posiciones
+    datos_vuelta = datos_graficados[numero_vuelta]
     posiciones = datos_vuelta["posiciones"]
-    distancias = []
     
-    for i, (x, y, z) in enumerate(posiciones):
-        distancia = np.sqrt((x - coord_x)**2 + (y - coord_y)**2)
-        distancias.append((i, distancia))
+    if np.isnan(posiciones[:, 0]).all():
+        return f"Vuelta {numero_vuelta}\nSin datos de posición"
     
-    # Ordenar por distancia y tomar el más cercano
-    distancias.sort(key=lambda x: x[1])
-    idx_cercano = distancias[0][0] if distancias else 0
+    # Buscar el punto más cercano en las posiciones (las muestras sin posición no cuentan)
+    distancias = np.hypot(posiciones[:, 0] - coord_x, posiciones[:, 1] - coord_y)
+    idx_cercano = np.nanargmin(distancias)
     
-    # Obtener datos en ese punto
-    velocidad = datos_vuelta["velocidades"][idx_cercano] if idx_cercano < len(datos_vuelta["velocidades"]) else 0
-    tiempo_transcurrido = datos_vuelta["duraciones"][idx_cercano] if idx_cercano < len(datos_vuelta["duraciones"]) else 0
-    clima = datos_vuelta["climas"][idx_cercano] if idx_cercano < len(datos_vuelta["climas"]) else "Desconocido"
-    hora_juego = datos_vuelta["horas_juego"][idx_cercano] if idx_cercano < len(datos_vuelta["horas_juego"]) else "Desconocida"
+    # Obtener datos en ese punto (la misma fila en todas las listas)
+    velocidad = datos_vuelta["velocidades"][idx_cercano]
+    tiempo_transcurrido = datos_vuelta["duraciones"][idx_cercano]
+    clima = datos_vuelta["climas"][idx_cercano] or "Desconocido"
+    hora_juego = datos_vuelta["horas_juego"][idx_cercano] or "Desconocida"
     
     # Formatear el tiempo transcurrido
     tiempo_formateado = segundos_a_minutos(tiempo_transcurrido, None)
@@ -1016,60 +821,39 @@ def reiniciar_puntos_animacion():
             punto['punto_animacion'].remove()
             punto['punto_animacion'] = None
         
-        # Limpiar cono de luces
-        if punto.get('cono_luces'):
-            for elemento in punto['cono_luces']:
-                if elemento:
-                    elemento.remove()
-            punto['cono_luces'] = []
+        # Ocultar el cono de luces, que se vuelve a usar al arrancar
+        for elemento in punto.get('cono_luces') or []:
+            elemento.set_visible(False)
     
-    canvas_fig.draw()
+    dibujar_animacion()
 
-def calcular_direccion(punto, indice):
+def calcular_rumbos(posiciones, direcciones):
     """
-    Calcula la dirección del vehículo en un punto específico.
-    Primero intenta usar datos de dirección si están disponibles,
-    de lo contrario calcula a partir de la trayectoria.
+    Calcula el rumbo del vehículo (ángulo en radianes en el plano XY) en
+    cada muestra de una vuelta, de una vez para toda la vuelta.
+    Donde la muestra tiene dirección se usa esa; si no, se calcula a partir
+    de la trayectoria, promediando el tramo anterior y el siguiente
+    (diferencia central; en la primera y la última muestra, el único tramo
+    que tienen). Sin ninguna de las dos, el rumbo es 0 (hacia +X).
     """
-    # Si hay datos de dirección disponibles
-    if 'direcciones' in punto and indice < len(punto['direcciones']):
-        dx, dy, dz = punto['direcciones'][indice]
-        # Normalizar el vector
-        magnitud = np.sqrt(dx*dx + dy*dy)
-        if magnitud > 0:
-            return dx/magnitud, dy/magnitud
-    
-    # Si no hay datos de dirección, calcular a partir de la trayectoria
-    posiciones = punto['posiciones']
-    
-    # Si es el primer punto
-    if indice == 0:
-        if len(posiciones) > 1:
-            dx = posiciones[1][0] - posiciones[0][0]
-            dy = posiciones[1][1] - posiciones[0][1]
-        else:
-            return 1, 0  # Dirección por defecto
-    # Si es el último punto
-    elif indice == len(posiciones) - 1:
-        dx = posiciones[indice][0] - posiciones[indice-1][0]
-        dy = posiciones[indice][1] - posiciones[indice-1][1]
-    # Puntos intermedios
-    else:
-        # Promediar dirección hacia adelante y hacia atrás para suavizar
-        dx_forward = posiciones[indice+1][0] - posiciones[indice][0]
-        dy_forward = posiciones[indice+1][1] - posiciones[indice][1]
-        dx_back = posiciones[indice][0] - posiciones[indice-1][0]
-        dy_back = posiciones[indice][1] - posiciones[indice-1][1]
-        
-        dx = (dx_forward + dx_back) / 2
-        dy = (dy_forward + dy_back) / 2
-    
-    # Normalizar
-    magnitud = np.sqrt(dx*dx + dy*dy)
-    if magnitud > 0:
-        return dx/magnitud, dy/magnitud
-    else:
-        return 1, 0  # Dirección por defecto si no hay movimiento
+    posiciones = np.asarray(posiciones, dtype=float).reshape(-1, 3)
+    direcciones = np.asarray(direcciones, dtype=float).reshape(-1, 3)
+    rumbos = np.zeros(len(posiciones))
+    if len(posiciones) < 2:
+        return rumbos
+    
+    # A partir de la trayectoria
+    tramos = np.gradient(posiciones[:, :2], axis=0)
+    with np.errstate(invalid='ignore'):
+        con_movimiento = np.hypot(tramos[:, 0], tramos[:, 1]) > 0
+    rumbos[con_movimiento] = np.arctan2(tramos[con_movimiento, 1], tramos[con_movimiento, 0])
+    
+    # Con los datos de dirección, donde los hay
+    if len(direcciones) == len(posiciones):
+        with np.errstate(invalid='ignore'):
+            con_direccion = np.hypot(direcciones[:, 0], direcciones[:, 1]) > 0
+        rumbos[con_direccion] = np.arctan2(direcciones[con_direccion, 1], direcciones[con_direccion, 0])
+    return rumbos
 
 def dibujar_cono_luces(ax, posicion, direccion, tipo_luces, color_vuelta, cono_anterior=None):
     """
@@ -1081,20 +865,26 @@ def dibujar_cono_luces(ax, posicion, direccion, tipo_luces, color_vuelta, cono_a
         direccion: (dx, dy) vector dirección normalizado
         tipo_luces: 0 = apagadas, 1 = luces normales, 2 = luces largas
         color_vuelta: Color base de la vuelta
-        cono_anterior: Lista de elementos gráficos del cono anterior a limpiar
+        cono_anterior: Lista de elementos gráficos del cono anterior, que se reutilizan
     
     Returns:
-        Lista de elementos gráficos creados
+        Lista de elementos gráficos del cono (el polígono, la línea central y
+        el borde), que se crean la primera vez y después solo se mueven
     """
     
-    # Limpiar cono anterior si existe
-    if cono_anterior:
-        for elemento in cono_anterior:
-            if elemento:
-                elemento.remove()
+    # Crear el cono la primera vez, sin datos (se mueve en cada fotograma)
+    if not cono_anterior:
+        color = '#FFFF00'
+        poligono = ax.fill([0, 0, 0], [0, 0, 0], color=color, alpha=0.15, zorder=1, edgecolor='none', animated=True)[0]
+        linea_central = ax.plot([], [], color=color, alpha=0.3, linewidth=1, zorder=2, animated=True)[0]
+        borde = ax.plot([], [], color=color, alpha=0.1, linewidth=0.5, zorder=2, animated=True)[0]
+        cono_anterior = [poligono, linea_central, borde]
+    poligono, linea_central, borde = cono_anterior
     
     if tipo_luces == 0:  # Apagadas
-        return []
+        for elemento in cono_anterior:
+            elemento.set_visible(False)
+        return cono_anterior
     
     x, y = posicion
     dx, dy = direccion
@@ -1103,12 +893,10 @@ def dibujar_cono_luces(ax, posicion, direccion, tipo_luces, color_vuelta, cono_a
     if tipo_luces == 1:  # Luces normales
         longitud = 50
         angulo = np.radians(60)
-        color = '#FFFF00'
         alpha = 0.15
     else:  # Luces largas
         longitud = 100
         angulo = np.radians(40)
-        color = '#FFFF00'
         alpha = 0.2
     
     # Calcular ángulo actual
@@ -1123,118 +911,181 @@ def dibujar_cono_luces(ax, posicion, direccion, tipo_luces, color_vuelta, cono_a
         py = y + np.sin(ang) * longitud
         vertices.append((px, py))
     
-    # Crear polígono del cono
-    poligono = ax.fill([v[0] for v in vertices], [v[1] for v in vertices], 
-                      color=color, alpha=alpha, zorder=1, edgecolor='none')[0]
+    # Mover el polígono del cono
+    poligono.set_xy(vertices)
+    poligono.set_alpha(alpha)
     
-    # Crear línea central del cono
-    linea_central = ax.plot([x, x + np.cos(angulo_actual) * longitud * 0.7],
-                           [y, y + np.sin(angulo_actual) * longitud * 0.7],
-                           color=color, alpha=0.3, linewidth=1, zorder=2)[0]
+    # Mover la línea central del cono
+    linea_central.set_data([x, x + np.cos(angulo_actual) * longitud * 0.7],
+                           [y, y + np.sin(angulo_actual) * longitud * 0.7])
     
-    # Añadir borde al cono (opcional)
-    borde = ax.plot([vertices[1][0], vertices[2][0]], 
-                    [vertices[1][1], vertices[2][1]],
-                    color=color, alpha=0.1, linewidth=0.5, zorder=2)[0]
+    # Mover el borde del cono
+    borde.set_data([vertices[1][0], vertices[2][0]], 
+                   [vertices[1][1], vertices[2][1]])
     
-    return [poligono, linea_central, borde]
+    for elemento in cono_anterior:
+        elemento.set_visible(True)
+    return cono_anterior
+
+# Función para juntar en arrays las muestras de todas las vueltas animadas, una vez por actualización de la gráfica
+def preparar_tramos_animacion():
+    """
+    Las duraciones de cada vuelta se desplazan `separacion` segundos más que
+    las de la anterior, para que las de todas queden ordenadas en un solo
+    array de claves: así un único np.searchsorted encuentra a la vez el
+    tramo de cada vuelta, y el coste de un fotograma no depende de lo larga
+    que sea la vuelta. También se calculan aquí el rumbo y el tipo de luces
+    de cada muestra, para que cada fotograma solo tenga que buscarlos.
+    """
+    global tramos_animacion
+    duraciones = [np.asarray(punto['duraciones'], dtype=float) for punto in puntos_animacion]
+    separacion = max((d[-1] for d in duraciones if len(d)), default=0) + 1
+    longitudes = np.array([len(d) for d in duraciones], dtype=int)
+    inicios = np.concatenate([[0], np.cumsum(longitudes)[:-1]]).astype(int)
+    tramos_animacion = {
+        'separacion': separacion,
+        'claves': np.concatenate([d + idx * separacion for idx, d in enumerate(duraciones)] or [np.empty(0)]),
+        'duraciones': np.concatenate(duraciones or [np.empty(0)]),
+        'posiciones': np.concatenate([np.asarray(punto['posiciones'], dtype=float)[:, :2] for punto in puntos_animacion] or [np.empty((0, 2))]),
+        'rumbos': np.concatenate([calcular_rumbos(punto['posiciones'], punto['direcciones']) for punto in puntos_animacion] or [np.empty(0)]),
+        'luces': np.concatenate([np.where(np.asarray(punto['luces_largas'], dtype=bool), 2, np.where(np.asarray(punto['luces'], dtype=bool), 1, 0))
+                                 for punto in puntos_animacion] or [np.empty(0, dtype=int)]),
+        'inicios': inicios,
+        'finales': inicios + longitudes - 1
+    }
 
 def iniciar_animacion():
-    global animacion_timer, tiempo_animacion, animacion_activa
+    global animacion_timer, animacion_activa
     
     if not animacion_activa:
         return
     
+    # Continuar animación si hay puntos activos
+    if avanzar_animacion():
+        animacion_timer = root.after(50, iniciar_animacion)
+    else:
+        animacion_activa = False
+        boton_animacion.config(text="▶ Play")
+
+# Función para mover los puntos de la animación 50 ms (por la velocidad elegida) y redibujar (también la usa medir_rendimiento.py)
+def avanzar_animacion():
+    """
+    Devuelve si queda alguna vuelta por terminar.
+    """
+    global tiempo_animacion
+
     tiempo_animacion += 0.05 * velocidad_animacion
     puntos_activos = 0
-    
-    for punto in puntos_animacion:
-        if punto['linea_completada']:
-            continue
+    if tramos_animacion is None:
+        preparar_tramos_animacion()
+
+    # Vueltas que siguen en marcha (las de menos de dos muestras no se animan) y su tiempo dentro de la vuelta
+    pendientes = np.array([idx for idx, punto in enumerate(puntos_animacion)
+                           if not punto['linea_completada'] and len(punto['duraciones']) >= 2 and len(punto['posiciones']) >= 2], dtype=int)
+    tiempos = tiempo_animacion - np.array([puntos_animacion[idx]['tiempo_acumulado'] for idx in pendientes], dtype=float)
+    inicios = tramos_animacion['inicios'][pendientes]
+    finales = tramos_animacion['finales'][pendientes]
+    duraciones = tramos_animacion['duraciones']
+    terminadas = tiempos >= duraciones[finales]
+
+    # Tramo de cada vuelta en marcha (la última muestra que no pasa de su tiempo), con una sola búsqueda para todas
+    en_marcha = ~terminadas
+    indices = np.searchsorted(tramos_animacion['claves'],
+                              pendientes[en_marcha] * tramos_animacion['separacion'] + tiempos[en_marcha], side='right') - 1
+    # Antes de la primera muestra la vuelta todavía no tiene tramo
+    con_tramo = indices >= inicios[en_marcha]
+    vueltas_tramo = pendientes[en_marcha][con_tramo]
+    indices = indices[con_tramo]
+
+    # Interpolar la posición de todos los puntos a la vez
+    fracciones = (tiempos[en_marcha][con_tramo] - duraciones[indices]) / (duraciones[indices + 1] - duraciones[indices])
+    posiciones_tramo = tramos_animacion['posiciones']
+    puntos_xy = posiciones_tramo[indices] + fracciones[:, None] * (posiciones_tramo[indices + 1] - posiciones_tramo[indices])
+
+    # Rumbo interpolado por el camino más corto (para que los conos giren suavemente) y luces de cada tramo
+    rumbos = tramos_animacion['rumbos']
+    giros = (rumbos[indices + 1] - rumbos[indices] + np.pi) % (2 * np.pi) - np.pi
+    rumbos_tramo = rumbos[indices] + fracciones * giros
+    luces_tramo = tramos_animacion['luces'][indices]
+
+    for idx, (x, y), rumbo, tipo_luces in zip(vueltas_tramo, puntos_xy, rumbos_tramo, luces_tramo):
+        punto = puntos_animacion[idx]
         
-        duraciones = punto['duraciones']
-        posiciones = punto['posiciones']
+        # Dirección del rumbo interpolado (tipo_luces: 0 = apagadas, 1 = normales, 2 = largas)
+        direccion = (np.cos(rumbo), np.sin(rumbo))
         
-        if len(duraciones) < 2 or len(posiciones) < 2:
-            continue
+        # Actualizar punto - SIN cambio de color
+        if punto['punto_animacion']:
+            punto['punto_animacion'].set_offsets([[x, y]])
+        else:
+            punto['punto_animacion'] = ax6.scatter([x], [y], 
+                                                  color=punto['color'],
+                                                  s=150,
+                                                  edgecolor='white',
+                                                  linewidth=2,
+                                                  zorder=10,
+                                                  alpha=0.9,
+                                                  animated=True)
         
-        tiempo_relativo_vuelta = tiempo_animacion - punto['tiempo_acumulado']
+        # Mover el cono de luces (se oculta si las luces están apagadas)
+        punto['cono_luces'] = dibujar_cono_luces(ax6, (x, y), direccion, 
+                                                 tipo_luces, punto['color'], 
+                                                 punto.get('cono_luces'))
         
-        if tiempo_relativo_vuelta < duraciones[-1]:
-            for i in range(len(duraciones) - 1):
-                if duraciones[i] <= tiempo_relativo_vuelta < duraciones[i + 1]:
-                    t = (tiempo_relativo_vuelta - duraciones[i]) / (duraciones[i + 1] - duraciones[i])
-                    x = posiciones[i][0] + t * (posiciones[i + 1][0] - posiciones[i][0])
-                    y = posiciones[i][1] + t * (posiciones[i + 1][1] - posiciones[i][1])
-                    
-                    # Calcular dirección
-                    direccion = calcular_direccion(punto, i)
-                    
-                    # Determinar tipo de luces
-                    tipo_luces = 0  # Apagadas
-                    luces = punto.get('luces', [])
-                    luces_largas = punto.get('luces_largas', [])
-                    
-                    if i < len(luces_largas) and luces_largas[i]:
-                        tipo_luces = 2  # Luces largas
-                    elif i < len(luces) and luces[i]:
-                        tipo_luces = 1  # Luces normales
-                    
-                    # Actualizar punto - SIN cambio de color
-                    if punto['punto_animacion']:
-                        punto['punto_animacion'].set_offsets([[x, y]])
-                    else:
-                        punto['punto_animacion'] = ax6.scatter([x], [y], 
-                                                              color=punto['color'],
-                                                              s=150,
-                                                              edgecolor='white',
-                                                              linewidth=2,
-                                                              zorder=10,
-                                                              alpha=0.9)
-                    
-                    # Dibujar cono de luces (limpiando el anterior)
-                    cono_anterior = punto.get('cono_luces', [])
-                    if tipo_luces > 0:
-                        cono_nuevo = dibujar_cono_luces(ax6, (x, y), direccion, 
-                                                       tipo_luces, punto['color'], 
-                                                       cono_anterior)
-                        punto['cono_luces'] = cono_nuevo
-                    else:
-                        # Si las luces están apagadas, limpiar cualquier cono anterior
-                        if cono_anterior:
-                            for elemento in cono_anterior:
-                                if elemento:
-                                    elemento.remove()
-                            punto['cono_luces'] = []
-                    
-                    puntos_activos += 1
-                    break
-        else:
-            # Vuelta completada
-            punto['linea_completada'] = True
-            punto['tiempo_acumulado'] += duraciones[-1]
-            
-            # Actualizar posición final del punto
-            if punto['punto_animacion']:
-                punto['punto_animacion'].set_offsets([[posiciones[-1][0], posiciones[-1][1]]])
-            
-            # Limpiar cono al finalizar
-            cono_actual = punto.get('cono_luces', [])
-            if cono_actual:
-                for elemento in cono_actual:
-                    if elemento:
-                        elemento.remove()
-                punto['cono_luces'] = []
-    
-    # Actualizar canvas
-    canvas_fig.draw()
+        puntos_activos += 1
+
+    for idx in pendientes[terminadas]:
+        # Vuelta completada
+        punto = puntos_animacion[idx]
+        posiciones = punto['posiciones']
+        punto['linea_completada'] = True
+        punto['tiempo_acumulado'] += punto['duraciones'][-1]
+        
+        # Actualizar posición final del punto
+        if punto['punto_animacion']:
+            punto['punto_animacion'].set_offsets([[posiciones[-1][0], posiciones[-1][1]]])
+        
+        # Ocultar el cono al finalizar
+        for elemento in punto.get('cono_luces') or []:
+            elemento.set_visible(False)
     
-    # Continuar animación si hay puntos activos
-    if puntos_activos > 0 or any(not p['linea_completada'] for p in puntos_animacion):
-        animacion_timer = root.after(50, iniciar_animacion)
-    else:
-        animacion_activa = False
-        boton_animacion.config(text="▶ Play")
+    # Repintar solo el mapa
+    dibujar_animacion()
+
+    return puntos_activos > 0 or any(not p['linea_completada'] for p in puntos_animacion)
+
+# Función para obtener los puntos y conos de la animación, que no se dibujan con el resto de la figura
+def artistas_animados():
+    for punto in puntos_animacion:
+        for elemento in [*(punto.get('cono_luces') or []), punto['punto_animacion']]:
+            if elemento:
+                yield elemento
+
+# Función para guardar el fondo del mapa cada vez que se dibuja la figura entera, y pintar encima lo animado
+def guardar_fondo_mapa(event):
+    global fondo_mapa
+    # Al exportar se dibuja a otra resolución: ese fondo no sirve para la ventana
+    if event.canvas.is_saving() or not hasattr(event.canvas, "copy_from_bbox"):
+        return
+    fondo_mapa = (event.canvas.copy_from_bbox(ax6.bbox), ax6.bbox.bounds)
+    for elemento in artistas_animados():
+        ax6.draw_artist(elemento)
+
+# Función para repintar solo el mapa con la animación (blitting) en vez de la figura entera
+def dibujar_animacion():
+    """
+    Restaura el fondo del mapa guardado en el último dibujo completo, pinta
+    encima los puntos y conos y copia a la ventana solo esa zona. Si todavía
+    no hay fondo o el mapa ha cambiado de tamaño, dibuja la figura entera
+    (que vuelve a guardarlo).
+    """
+    if fondo_mapa is None or fondo_mapa[1] != ax6.bbox.bounds:
+        canvas_fig.draw()
+        return
+    canvas_fig.restore_region(fondo_mapa[0])
+    for elemento in artistas_animados():
+        ax6.draw_artist(elemento)
+    canvas_fig.blit(ax6.bbox)
 
 def actualizar_velocidad_animacion(valor):
     global velocidad_animacion
@@ -1265,90 +1116,226 @@ def cargar_vueltas(event=None):
     sesion_seleccionada = sesion_actual
     
     # Actualizar listbox de vueltas
+    llenar_vueltas()
+
+# Función para obtener el circuito elegido en el filtro (None si son todos)
+def circuito_elegido():
+    circuito = combo_circuitos.get()
+    return None if circuito in ("", "Todos") else circuito
+
+# Función para obtener el tiempo máximo de vuelta escrito en el filtro (None si no hay ninguno válido)
+def tiempo_maximo_elegido():
+    try:
+        return segundos_tiempo(entrada_tiempo_maximo.get()) if entrada_tiempo_maximo.get().strip() else None
+    except ValueError:
+        return None
+
+# Función para obtener los números de las vueltas seleccionadas
+def numeros_vueltas_seleccionadas():
+    return [int(listbox_vueltas.get(idx).split()[1]) for idx in listbox_vueltas.curselection()]
+
+# Función para rellenar la lista de sesiones con las del catálogo que pasan el filtro
+def llenar_sesiones():
+    global sesiones_disponibles
+    combo_circuitos["values"] = ["Todos"] + sesiones.buscar_circuitos()
+    filas = sesiones.buscar_sesiones(circuito_elegido())  # De más reciente a más antigua
+    sesiones_disponibles = [sesion for sesion, _ in filas]
+    listbox_sesiones.delete(0, tk.END)
+    for sesion, circuito in filas:
+        listbox_sesiones.insert(tk.END, f"{sesion} - {circuito or 'Circuito Desconocido'}")
+    if sesion_seleccionada in sesiones_disponibles:
+        listbox_sesiones.select_set(sesiones_disponibles.index(sesion_seleccionada))
+
+# Función para rellenar la lista de vueltas de la sesión con las del catálogo que pasan el filtro
+def llenar_vueltas(seleccionadas=()):
     listbox_vueltas.delete(0, tk.END)
-    vueltas = sorted(sesiones[sesion_actual].keys())
-    for vuelta in vueltas:
-        listbox_vueltas.insert(tk.END, f"Vuelta {vuelta}")
-
-# Crear la interfaz gráfica
-root = tk.Tk()
-sesion_seleccionada = None
-root.title("Gráficas de Telemetría")
-root.geometry("1800x900")
-ancho_pantalla = root.winfo_screenwidth()
-alto_pantalla = root.winfo_screenheight()
-x = (ancho_pantalla - 1800) // 2
-y = (alto_pantalla - 900) // 2
-root.geometry(f"+{x}+{y}")
-
-marco_control = tk.Frame(root)
-marco_control.pack(side=tk.TOP, fill=tk.X)
-
-# Añadir ListBox para sesiones
-tk.Label(marco_control, text="Sesiones:").pack(side=tk.LEFT, padx=1, pady=1)
-listbox_sesiones = tk.Listbox(marco_control, selectmode=tk.SINGLE, width=40)
-sesiones_disponibles = sorted(sesiones.keys(), reverse=True)  # Ordenar de más reciente a más antigua
-for sesion in sesiones_disponibles:
-    circuito = circuito_por_sesion.get(sesion, "Circuito Desconocido")
-    listbox_sesiones.insert(tk.END, f"{sesion} - {circuito}")
-listbox_sesiones.pack(side=tk.LEFT, padx=1, pady=1)
-
-listbox_sesiones.bind("<<ListboxSelect>>", cargar_vueltas)
-
-# ListBox para vueltas
-tk.Label(marco_control, text="Vueltas:").pack(side=tk.LEFT, padx=1, pady=1)
-listbox_vueltas = tk.Listbox(marco_control, selectmode=tk.MULTIPLE)
-listbox_vueltas.pack(side=tk.LEFT, padx=1, pady=1)
-tk.Button(marco_control, text="Actualizar", command=actualizar_grafica).pack(side=tk.LEFT, padx=0, pady=0)
-
-boton_exportar = tk.Button(marco_control, text="Exportar Gráficas", command=lambda: exportar_grafico(fig, circuito_por_sesion.get(sesion_seleccionada.split(" - ")[0])))
-boton_exportar.pack(side=tk.RIGHT, padx=5)
-
-# Frame para controles de animación
-frame_animacion = tk.Frame(marco_control)
-frame_animacion.pack(side=tk.RIGHT, padx=10)
-
-# Botón de play/pause
-boton_animacion = tk.Button(frame_animacion, text="▶ Play", command=toggle_animacion, 
-                           font=("Arial", 10, "bold"), bg="#4CAF50", fg="white")
-boton_animacion.pack(side=tk.LEFT, padx=2)
-
-# Botón de reinicio
-boton_reiniciar = tk.Button(frame_animacion, text="↺ Reiniciar", command=reiniciar_puntos_animacion,
-                           font=("Arial", 10))
-boton_reiniciar.pack(side=tk.LEFT, padx=2)
-
-# Control de velocidad
-tk.Label(frame_animacion, text="Vel:").pack(side=tk.LEFT, padx=(5, 0))
-velocidad_slider = tk.Scale(frame_animacion, from_=0.1, to=10.0, resolution=0.1, 
-                           orient=tk.HORIZONTAL, length=100,
-                           command=actualizar_velocidad_animacion)
-velocidad_slider.set(1.0)
-velocidad_slider.pack(side=tk.LEFT, padx=2)
-
-etiqueta_velocidad = tk.Label(frame_animacion, text="Velocidad: 1.0x")
-etiqueta_velocidad.pack(side=tk.LEFT, padx=2)
-
-canvas = tk.Canvas(root)
-canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL, command=canvas.yview)
-scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-canvas.configure(yscrollcommand=scrollbar.set)
-canvas.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-
-marco = ttk.Frame(canvas)
-canvas.create_window((0, 0), window=marco, anchor="nw")
-canvas_fig = FigureCanvasTkAgg(fig, master=marco)
-canvas_fig.draw()
-canvas_fig.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-# Seleccionar última sesión por defecto si existe y seleccionar todas las vueltas
-if sesiones_disponibles:
-    listbox_sesiones.select_set(0)
-    cargar_vueltas()
-    for i in range(listbox_vueltas.size()):
-        listbox_vueltas.select_set(i)
-    actualizar_grafica()
+    for fila in sesiones.buscar_vueltas(sesion_actual, tiempo_maximo=tiempo_maximo_elegido()):
+        texto = f"Vuelta {fila['vuelta']}"
+        if fila["completa"]:
+            texto += f" - {segundos_a_minutos(fila['tiempo'])}"
+        listbox_vueltas.insert(tk.END, texto)
+        if fila["vuelta"] in seleccionadas:
+            listbox_vueltas.select_set(tk.END)
+
+# Función para volver a filtrar las listas al cambiar el circuito o el tiempo máximo
+def filtrar_listas(event=None):
+    if carga_registro is not None:
+        return
+    seleccionadas = numeros_vueltas_seleccionadas()
+    llenar_sesiones()
+    if sesion_actual is not None:
+        llenar_vueltas(seleccionadas)
+
+# Función para activar o desactivar el modo directo
+def alternar_directo():
+    global directo_timer
+    if modo_directo.get():
+        seguir_registro()
+    elif directo_timer:
+        root.after_cancel(directo_timer)
+        directo_timer = None
+
+# Función para leer lo que el juego ha añadido al registro y mostrarlo
+def seguir_registro():
+    global directo_timer
+    directo_timer = None
+    if not modo_directo.get():
+        return
+
+    # Mientras se indexa el registro todavía no hay nada que seguir
+    if carga_registro is not None:
+        directo_timer = root.after(intervalo_directo, seguir_registro)
+        return
+
+    sesion_en_directo = sesiones.ultima_sesion()
+    nuevas = sesiones.actualizar()
+    if nuevas:
+        refrescar_directo(nuevas, sesion_seleccionada in (None, sesion_en_directo))
+
+    # Las lecturas se agrupan por intervalo, no por muestra, para limitar los refrescos
+    directo_timer = root.after(intervalo_directo, seguir_registro)
+
+# Función para mostrar las muestras nuevas redibujando solo lo necesario
+def refrescar_directo(nuevas, siguiendo):
+    global datos_graficados
+
+    # Añadir las sesiones nuevas a la lista sin perder la selección
+    if [sesion for sesion, _ in sesiones.buscar_sesiones(circuito_elegido())] != sesiones_disponibles:
+        selecciones_vueltas = listbox_vueltas.curselection()
+        llenar_sesiones()
+        for idx in selecciones_vueltas:
+            listbox_vueltas.select_set(idx)
+
+    # Si se estaba viendo la sesión en directo y el juego ha empezado otra (que pasa el filtro), pasar a ella
+    sesion_en_directo = sesiones.ultima_sesion()
+    if siguiendo and sesion_en_directo in sesiones_disponibles and sesion_en_directo != sesion_seleccionada:
+        listbox_sesiones.selection_clear(0, tk.END)
+        listbox_sesiones.select_set(sesiones_disponibles.index(sesion_en_directo))
+        cargar_vueltas()
+        listbox_vueltas.select_set(0, tk.END)
+        actualizar_grafica()
+        return
+
+    if sesion_seleccionada not in nuevas:
+        return
+
+    # Vueltas nuevas en la sesión seleccionada (o que ya pasan el filtro): añadirlas y redibujar todo
+    vueltas_listadas = [int(listbox_vueltas.get(idx).split()[1]) for idx in range(listbox_vueltas.size())]
+    vueltas_catalogo = [fila["vuelta"] for fila in sesiones.buscar_vueltas(sesion_seleccionada, tiempo_maximo=tiempo_maximo_elegido())]
+    if vueltas_catalogo != vueltas_listadas:
+        llenar_vueltas(numeros_vueltas_seleccionadas() + [vuelta for vuelta in vueltas_catalogo if vuelta not in vueltas_listadas])
+        actualizar_grafica()
+        return
+
+    if sesion_seleccionada != sesion_graficada:
+        return
+
+    # Solo han crecido vueltas ya dibujadas: actualizar los datos de sus líneas
+    datos_vuelta_sesion = sesiones[sesion_seleccionada]
+    datos_graficados = datos_vuelta_sesion
+    fin = ax2.get_xlim()[1]
+    for ax, lista in canales_directo.items():
+        for numero_vuelta in nuevas[sesion_seleccionada]:
+            linea = lineas_vuelta.get((ax, numero_vuelta, None))
+            if linea is None or not linea.get_visible():
+                continue
+            duraciones = datos_vuelta_sesion[numero_vuelta]["duraciones"]
+            # Cada lista tiene una fila por muestra, aunque la muestra esté a medio escribir
+            linea.set_data(duraciones, datos_vuelta_sesion[numero_vuelta][lista])
+            if len(duraciones):
+                fin = max(fin, duraciones[-1])
+        ax.relim(visible_only=True)
+        ax.autoscale_view(scalex=False)
+
+    for ax in [ax2, ax3, ax4, ax5, ax7, ax9, ax10, ax11, ax12, ax13, ax14, ax15]:
+        ax.set_xlim(ax.get_xlim()[0], fin)
+
+    # Trazada en el mapa, ampliando los límites si el coche sale de ellos
+    for numero_vuelta in nuevas[sesion_seleccionada]:
+        linea = lineas_vuelta.get((ax6, numero_vuelta, None))
+        if linea is None or not linea.get_visible():
+            continue
+        posiciones = datos_vuelta_sesion[numero_vuelta]["posiciones"]
+        if np.isnan(posiciones[:, 0]).all():
+            continue
+        linea.set_data(posiciones[:, 0], posiciones[:, 1])
+        minimo_x, maximo_x = ax6.get_xlim()
+        minimo_y, maximo_y = ax6.get_ylim()
+        ax6.set_xlim(min(minimo_x, np.nanmin(posiciones[:, 0])), max(maximo_x, np.nanmax(posiciones[:, 0])))
+        ax6.set_ylim(min(minimo_y, np.nanmin(posiciones[:, 1])), max(maximo_y, np.nanmax(posiciones[:, 1])))
+
+    canvas_fig.draw_idle()
+    if vista_mapa3D is not None:
+        vista_mapa3D.refrescar(nuevas[sesion_seleccionada])
+
+# Función para abrir la vista 3D, que sigue la sesión y las vueltas de la gráfica
+def abrir_mapa3D():
+    global ventana_mapa3D, vista_mapa3D
+    if carga_registro is not None:
+        return
+    if ventana_mapa3D is not None:
+        ventana_mapa3D.lift()
+        return
+    from vista_mapa3D import VistaMapa3D
+    ventana_mapa3D = tk.Toplevel(root)
+    ventana_mapa3D.title("Visualización 3D de Telemetría")
+    ventana_mapa3D.geometry("1000x800")
+    ventana_mapa3D.protocol("WM_DELETE_WINDOW", cerrar_mapa3D)
+    vista_mapa3D = VistaMapa3D(ventana_mapa3D, sesiones, circuito_por_sesion)
+    mostrar_mapa3D()
+
+# Función para cerrar la vista 3D
+def cerrar_mapa3D():
+    global ventana_mapa3D, vista_mapa3D
+    ventana_mapa3D.destroy()
+    ventana_mapa3D = None
+    vista_mapa3D = None
+
+# Función para dibujar en la vista 3D las vueltas de la gráfica, con sus mismos colores
+def mostrar_mapa3D():
+    if vista_mapa3D is None or sesion_graficada is None:
+        return
+    import matplotlib.pyplot as plt
+    colores = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    vista_mapa3D.mostrar(sesion_graficada, vueltas_graficadas, [colores[idx % len(colores)] for idx in range(len(vueltas_graficadas))])
+
+# Función para crear la figura dentro de la ventana
+def mostrar_figura():
+    global canvas_fig
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    crear_figura()
+    canvas_fig = FigureCanvasTkAgg(fig, master=marco)
+    canvas_fig.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+# Función para mostrar el progreso de la carga del registro y, al terminar, rellenar las listas y dibujar la última sesión
+def comprobar_carga():
+    global carga_registro, sesiones, circuito_por_sesion
+    if not carga_registro.terminada():
+        barra_carga["value"] = carga_registro.progreso * 100
+        root.after(50, comprobar_carga)
+        return
+    if carga_registro.error is not None:
+        etiqueta_carga.config(text=f"No se pudo leer el registro: {carga_registro.error}")
+        barra_carga.pack_forget()
+        return
+
+    sesiones = carga_registro.sesiones
+    circuito_por_sesion = sesiones.circuitos
+    carga_registro = None
+    print(f"Índice de {len(sesiones)} sesiones listo en {time.perf_counter() - inicio_arranque:.2f} s")
+    marco_carga.pack_forget()
+    llenar_sesiones()
+
+    # Seleccionar última sesión por defecto si existe y seleccionar todas las vueltas
+    if sesiones_disponibles:
+        listbox_sesiones.select_set(0)
+        cargar_vueltas()
+        for i in range(listbox_vueltas.size()):
+            listbox_vueltas.select_set(i)
+        actualizar_grafica()
+    else:
+        canvas_fig.draw()
+    print(f"Gráfica lista en {time.perf_counter() - inicio_arranque:.2f} s")
 
 # Función para cerrar la consola
 def cerrar_programa():
@@ -1357,7 +1344,111 @@ def cerrar_programa():
     # Cerrar el intérprete de Python
     exit()
 
-# Asignar la función de cierre al evento de cierre de ventana
-root.protocol("WM_DELETE_WINDOW", cerrar_programa)
-
-root.mainloop()
\ No newline at end of file
+# Crear la interfaz gráfica (solo al ejecutar el script: exportar_lote.py importa las funciones de dibujo sin abrir ninguna ventana)
+if __name__ == "__main__":
+    root = tk.Tk()
+    sesion_seleccionada = None
+    root.title("Gráficas de Telemetría")
+    root.geometry("1800x900")
+    ancho_pantalla = root.winfo_screenwidth()
+    alto_pantalla = root.winfo_screenheight()
+    x = (ancho_pantalla - 1800) // 2
+    y = (alto_pantalla - 900) // 2
+    root.geometry(f"+{x}+{y}")
+
+    marco_control = tk.Frame(root)
+    marco_control.pack(side=tk.TOP, fill=tk.X)
+
+    # Filtro de las sesiones por circuito
+    tk.Label(marco_control, text="Circuito:").pack(side=tk.LEFT, padx=1, pady=1)
+    combo_circuitos = ttk.Combobox(marco_control, state="readonly", width=20)
+    combo_circuitos.set("Todos")
+    combo_circuitos.pack(side=tk.LEFT, padx=1, pady=1)
+    combo_circuitos.bind("<<ComboboxSelected>>", filtrar_listas)
+
+    # Añadir ListBox para sesiones (se rellena desde el catálogo, de más reciente a más antigua)
+    tk.Label(marco_control, text="Sesiones:").pack(side=tk.LEFT, padx=1, pady=1)
+    listbox_sesiones = tk.Listbox(marco_control, selectmode=tk.SINGLE, width=40)
+    listbox_sesiones.pack(side=tk.LEFT, padx=1, pady=1)
+    sesiones_disponibles = []  # Se rellena al terminar de indexar el registro
+
+    listbox_sesiones.bind("<<ListboxSelect>>", cargar_vueltas)
+
+    # ListBox para vueltas
+    tk.Label(marco_control, text="Vueltas:").pack(side=tk.LEFT, padx=1, pady=1)
+    listbox_vueltas = tk.Listbox(marco_control, selectmode=tk.MULTIPLE, width=24)
+    listbox_vueltas.pack(side=tk.LEFT, padx=1, pady=1)
+
+    # Filtro de las vueltas completas por tiempo máximo ("mm:ss.fff" o segundos)
+    tk.Label(marco_control, text="Tiempo máx.:").pack(side=tk.LEFT, padx=1, pady=1)
+    entrada_tiempo_maximo = tk.Entry(marco_control, width=9, exportselection=False)
+    entrada_tiempo_maximo.pack(side=tk.LEFT, padx=1, pady=1)
+    entrada_tiempo_maximo.bind("<Return>", filtrar_listas)
+    tk.Button(marco_control, text="Actualizar", command=actualizar_grafica).pack(side=tk.LEFT, padx=0, pady=0)
+
+    boton_exportar = tk.Button(marco_control, text="Exportar Gráficas", command=lambda: exportar_grafico(fig, circuito_por_sesion.get(sesion_seleccionada.split(" - ")[0])))
+    boton_exportar.pack(side=tk.RIGHT, padx=5)
+
+    # Botón para abrir la vista 3D de las vueltas seleccionadas
+    tk.Button(marco_control, text="Mapa 3D", command=abrir_mapa3D).pack(side=tk.RIGHT, padx=5)
+
+    # Casilla para seguir el registro mientras el juego escribe
+    modo_directo = tk.BooleanVar(value=False)
+    tk.Checkbutton(marco_control, text="Directo", variable=modo_directo, command=alternar_directo).pack(side=tk.RIGHT, padx=5)
+
+    # Frame para controles de animación
+    frame_animacion = tk.Frame(marco_control)
+    frame_animacion.pack(side=tk.RIGHT, padx=10)
+
+    # Botón de play/pause
+    boton_animacion = tk.Button(frame_animacion, text="▶ Play", command=toggle_animacion, 
+                               font=("Arial", 10, "bold"), bg="#4CAF50", fg="white")
+    boton_animacion.pack(side=tk.LEFT, padx=2)
+
+    # Botón de reinicio
+    boton_reiniciar = tk.Button(frame_animacion, text="↺ Reiniciar", command=reiniciar_puntos_animacion,
+                               font=("Arial", 10))
+    boton_reiniciar.pack(side=tk.LEFT, padx=2)
+
+    # Control de velocidad
+    tk.Label(frame_animacion, text="Vel:").pack(side=tk.LEFT, padx=(5, 0))
+    velocidad_slider = tk.Scale(frame_animacion, from_=0.1, to=10.0, resolution=0.1, 
+                               orient=tk.HORIZONTAL, length=100,
+                               command=actualizar_velocidad_animacion)
+    velocidad_slider.set(1.0)
+    velocidad_slider.pack(side=tk.LEFT, padx=2)
+
+    etiqueta_velocidad = tk.Label(frame_animacion, text="Velocidad: 1.0x")
+    etiqueta_velocidad.pack(side=tk.LEFT, padx=2)
+
+    # Progreso de la indexación del registro, que se quita al terminar
+    marco_carga = tk.Frame(root)
+    marco_carga.pack(side=tk.TOP, fill=tk.X)
+    etiqueta_carga = tk.Label(marco_carga, text="Indexando el registro...")
+    etiqueta_carga.pack(side=tk.LEFT, padx=5, pady=2)
+    barra_carga = ttk.Progressbar(marco_carga, length=300, maximum=100)
+    barra_carga.pack(side=tk.LEFT, padx=5, pady=2)
+
+    canvas = tk.Canvas(root)
+    canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL, command=canvas.yview)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    canvas.configure(yscrollcommand=scrollbar.set)
+    canvas.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+
+    marco = ttk.Frame(canvas)
+    canvas.create_window((0, 0), window=marco, anchor="nw")
+
+    # Asignar la función de cierre al evento de cierre de ventana
+    root.protocol("WM_DELETE_WINDOW", cerrar_programa)
+
+    # Mostrar ya la ventana, antes de indexar el registro y de importar Matplotlib
+    root.update()
+    print(f"Ventana visible en {time.perf_counter() - inicio_arranque:.2f} s")
+
+    # Indexar el registro en segundo plano mientras se crea la figura
+    carga_registro = CargaEnSegundoPlano(ruta_archivo)
+    mostrar_figura()
+    comprobar_carga()
+
+    root.mainloop()
\ No newline at end of file
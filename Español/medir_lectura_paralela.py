@@ -0,0 +1,30 @@
+import argparse
+import shutil
+import time
+from telemetria import cargar, ruta_cache
+
+# Nombre de la caché que se usa para medir (no toca la de los scripts)
+NOMBRE_CACHE = "medicion"
+
+# Función para medir cuánto se tarda en leer todo el registro con `procesos` procesos
+def medir(ruta_archivo, procesos):
+    shutil.rmtree(ruta_cache(ruta_archivo, NOMBRE_CACHE), ignore_errors=True)
+    inicio = time.perf_counter()
+    sesiones = cargar(ruta_archivo, NOMBRE_CACHE)
+    sesiones.precargar(procesos)
+    segundos = time.perf_counter() - inicio
+    shutil.rmtree(ruta_cache(ruta_archivo, NOMBRE_CACHE), ignore_errors=True)
+    return segundos, len(sesiones)
+
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(description="Mide la lectura en paralelo del registro con distinto número de procesos")
+    analizador.add_argument("registro", help="Ruta del registro de telemetría")
+    analizador.add_argument("-p", "--procesos", type=int, nargs="+", default=[1, 2, 4, 8], help="Números de procesos que se prueban")
+    analizador.add_argument("-r", "--repeticiones", type=int, default=3, help="Repeticiones de cada medida (se queda la mejor)")
+    argumentos = analizador.parse_args()
+
+    base = None
+    for procesos in argumentos.procesos:
+        segundos, cantidad = min(medir(argumentos.registro, procesos) for _ in range(argumentos.repeticiones))
+        base = base or segundos
+        print(f"{procesos} procesos: {segundos:.2f} s ({cantidad} sesiones, x{base / segundos:.2f})")
@@ -0,0 +1,203 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+import matplotlib
+# Sin ventana: las gráficas se dibujan con Agg, como en exportar_lote.py
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import numpy as np
+import exportar_lote
+import grafica
+from generar_registro import escribir_registro, tamano_bytes
+from telemetria import cargar, ruta_cache
+
+# Nombre de la caché que se usa para medir (no toca la de los scripts)
+NOMBRE_CACHE = "rendimiento"
+
+# Función para medir varias veces una función y resumir los tiempos
+def medir(funcion, repeticiones, veces=1):
+    """
+    Llama a funcion() `repeticiones` veces y devuelve sus tiempos en
+    segundos, con el mejor y la mediana. Si `veces` es mayor que 1, cada
+    repetición la llama `veces` veces y anota el tiempo medio de una llamada
+    (para medidas demasiado cortas). Lo que imprimen los scripts no se
+    muestra mientras tanto.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            for _ in range(veces):
+                funcion()
+            tiempos.append((time.perf_counter() - inicio) / veces)
+    return {"repeticiones": tiempos, "mejor": min(tiempos), "mediana": statistics.median(tiempos)}
+
+# Función para obtener la versión del código que se mide
+def version_codigo():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Función para elegir la sesión que ocupa más bytes del registro
+def sesion_mas_larga(sesiones):
+    rangos = getattr(sesiones, "rangos", {})
+    return max(sesiones, key=lambda sesion: sum(fin - inicio for inicio, _, fin in rangos.get(sesion, [])))
+
+# Función para medir todo con un registro
+def medir_registro(ruta_archivo, sesion, repeticiones, ppp):
+    """
+    Mide la lectura del registro (el índice y una sesión, sin caché y con
+    ella), actualizar_grafica con un cambio de selección de vueltas, el
+    redibujado de la figura, los tooltips, un fotograma de la animación y la exportación a PNG. Devuelve
+    (datos del registro, medidas).
+    """
+    medidas = {}
+
+    # Lectura: el índice y la sesión, primero sin caché y luego desde ella
+    def indexar():
+        shutil.rmtree(ruta_cache(ruta_archivo, NOMBRE_CACHE), ignore_errors=True)
+        return cargar(ruta_archivo, NOMBRE_CACHE)
+    medidas["indexar"] = medir(indexar, repeticiones)
+    sesiones = indexar()
+    sesion = sesion or sesion_mas_larga(sesiones)
+
+    def leer_sesion():
+        nuevas = indexar()
+        inicio = time.perf_counter()
+        nuevas[sesion]
+        return time.perf_counter() - inicio
+    tiempos = [leer_sesion() for _ in range(repeticiones)]
+    medidas["leer_sesion"] = {"repeticiones": tiempos, "mejor": min(tiempos), "mediana": statistics.median(tiempos)}
+    medidas["indexar_con_cache"] = medir(lambda: cargar(ruta_archivo, NOMBRE_CACHE), repeticiones)
+    medidas["cargar_sesion_cache"] = medir(lambda: cargar(ruta_archivo, NOMBRE_CACHE)[sesion], repeticiones)
+
+    sesiones = cargar(ruta_archivo, NOMBRE_CACHE)
+    vueltas = sorted(sesiones[sesion])
+    datos = {
+        "ruta": os.path.abspath(ruta_archivo),
+        "bytes": os.path.getsize(ruta_archivo) if os.path.isfile(ruta_archivo) else None,
+        "sesiones": len(sesiones),
+        "sesion": sesion,
+        "bytes_sesion": sum(fin - inicio for inicio, _, fin in getattr(sesiones, "rangos", {}).get(sesion, [])) or None,
+        "vueltas": len(vueltas),
+        "muestras": int(sum(len(sesiones[sesion][vuelta]["marcas_tiempo"]) for vuelta in vueltas)),
+    }
+
+    # La gráfica, como en la ventana pero con un lienzo sin pantalla
+    grafica.crear_figura()
+    grafica.canvas_fig = FigureCanvasAgg(grafica.fig)
+    grafica.sesiones = sesiones
+    grafica.circuito_por_sesion = sesiones.circuitos
+    grafica.sesion_seleccionada = sesion
+
+    # Cada repetición cambia la selección: todas las vueltas y solo las impares, alternando
+    selecciones = itertools.cycle([vueltas[::2], vueltas])
+    medidas["actualizar_grafica"] = medir(lambda: grafica.graficar_vueltas(next(selecciones)), repeticiones)
+    with contextlib.redirect_stdout(io.StringIO()):
+        grafica.graficar_vueltas(vueltas)
+
+    # Solo el redibujado de la figura, para separar lo que cuesta cambiar sus datos de lo que cuesta pintarla
+    medidas["dibujar_figura"] = medir(grafica.canvas_fig.draw, repeticiones)
+
+    # Tooltips: la trazada y una gráfica temporal en mitad de la primera vuelta
+    datos_vuelta = grafica.datos_graficados[vueltas[0]]
+    mitad = len(datos_vuelta["duraciones"]) // 2
+    x, y = datos_vuelta["posiciones"][mitad][:2]
+    tiempo = datos_vuelta["duraciones"][mitad]
+    def tooltip():
+        grafica.obtener_tooltip_trazada(sesion, vueltas[0], x, y)
+        grafica.obtener_tooltip_completo(sesion, vueltas[0], tiempo, f"Vuelta {vueltas[0]}")
+    medidas["tooltip"] = medir(tooltip, repeticiones, veces=100)
+
+    # Un fotograma de la animación, con los coches en mitad de la primera vuelta
+    with contextlib.redirect_stdout(io.StringIO()):
+        grafica.reiniciar_puntos_animacion()
+        grafica.tiempo_animacion = tiempo
+        grafica.avanzar_animacion()
+    medidas["fotograma_animacion"] = medir(grafica.avanzar_animacion, repeticiones)
+
+    # Exportación de la sesión entera a PNG, como exportar_lote.py
+    exportar_lote.sesiones = sesiones
+    carpeta = tempfile.mkdtemp()
+    try:
+        medidas["exportar_png"] = medir(lambda: exportar_lote.exportar_sesion(sesion, carpeta, ppp), repeticiones)
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+    shutil.rmtree(ruta_cache(ruta_archivo, NOMBRE_CACHE), ignore_errors=True)
+    return datos, medidas
+
+# Función para comparar las medianas con las de otra medición
+def comparar(medidas, ruta_anterior, umbral=0.1):
+    with open(ruta_anterior, encoding="utf-8") as f:
+        anterior = json.load(f)
+    print(f"Comparación con '{ruta_anterior}' ({anterior.get('version') or 'sin versión'}):")
+    for nombre, medida in medidas.items():
+        if nombre not in anterior["medidas"]:
+            continue
+        antes, ahora = anterior["medidas"][nombre]["mediana"], medida["mediana"]
+        relacion = ahora / antes if antes else float("inf")
+        aviso = "  <- más lento" if relacion > 1 + umbral else ""
+        print(f"  {nombre}: {antes * 1000:.2f} ms -> {ahora * 1000:.2f} ms (x{relacion:.2f}){aviso}")
+
+# Medir los scripts con un registro (o con uno sintético) y guardar los resultados en JSON
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(description="Mide la lectura del registro, la actualización de la gráfica, los tooltips, la animación y la exportación, y guarda los tiempos en JSON para compararlos entre versiones")
+    analizador.add_argument("registro", nargs="?", default=None, help="Ruta del registro de telemetría (si no se indica, se genera uno sintético)")
+    analizador.add_argument("-t", "--tamano", default="10MB", help="Tamaño del registro sintético")
+    analizador.add_argument("-s", "--sesion", default=None, help="Sesión que se mide (por defecto, la más larga)")
+    analizador.add_argument("-r", "--repeticiones", type=int, default=5, help="Repeticiones de cada medida")
+    analizador.add_argument("--ppp", type=int, default=100, help="Resolución de la exportación a PNG")
+    analizador.add_argument("-o", "--salida", default="rendimiento.json", help="Archivo JSON en el que se guardan los resultados")
+    analizador.add_argument("-c", "--comparar", default=None, help="Resultados anteriores (JSON) con los que comparar")
+    argumentos = analizador.parse_args()
+
+    carpeta_sintetica = None
+    ruta_archivo = argumentos.registro
+    if ruta_archivo is None:
+        carpeta_sintetica = tempfile.mkdtemp()
+        ruta_archivo = os.path.join(carpeta_sintetica, "telemetriagta5.log")
+        print(f"Generando un registro sintético de {argumentos.tamano}...")
+        escribir_registro(ruta_archivo, tamano=tamano_bytes(argumentos.tamano))
+
+    try:
+        registro, medidas = medir_registro(ruta_archivo, argumentos.sesion, argumentos.repeticiones, argumentos.ppp)
+    finally:
+        if carpeta_sintetica:
+            shutil.rmtree(carpeta_sintetica, ignore_errors=True)
+    registro["sintetico"] = carpeta_sintetica is not None
+
+    resultados = {
+        "version": version_codigo(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "sistema": platform.platform(),
+            "procesador": platform.processor() or platform.machine(),
+        },
+        "registro": registro,
+        "medidas": medidas,
+    }
+    with open(argumentos.salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    print(f"Sesión {registro['sesion']}: {registro['vueltas']} vueltas, {registro['muestras']} muestras")
+    for nombre, medida in medidas.items():
+        print(f"  {nombre}: {medida['mediana'] * 1000:.2f} ms (mejor {medida['mejor'] * 1000:.2f} ms)")
+    print(f"Resultados guardados en '{argumentos.salida}'")
+    if argumentos.comparar:
+        comparar(medidas, argumentos.comparar)
@@ -0,0 +1,6 @@
+# Lectura de los registros de telemetría del mod, compartida por grafica.py y mapa3D.py
+from .archivo import IndiceArchivo
+from .cache import IndiceSesiones, leer_lineas, ruta_cache
+from .catalogo import Catalogo, segundos_tiempo
+from .dialectos import DIALECTOS
+from .registro import NOMBRE_CACHE, CargaEnSegundoPlano, LecturaRegistro, Trozo, cargar, leer_registro, calcular_duraciones, segundos_marca
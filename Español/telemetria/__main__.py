@@ -0,0 +1,24 @@
+import argparse
+import time
+from .catalogo import segundos_tiempo
+from .registro import cargar
+
+# Leer de una vez todo el registro y guardarlo en la caché
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(prog="python -m telemetria", description="Lee todas las sesiones del registro en paralelo y las guarda en la caché")
+    analizador.add_argument("registro", help="Ruta del registro de telemetría")
+    analizador.add_argument("-p", "--procesos", type=int, default=None, help="Número de procesos (por defecto uno por núcleo; 1 = sin procesos)")
+    analizador.add_argument("-c", "--circuito", default=None, help="Mostrar después las vueltas de este circuito")
+    analizador.add_argument("-t", "--tiempo-maximo", type=segundos_tiempo, default=None, help="Mostrar después las vueltas completas más rápidas que este tiempo (mm:ss.fff)")
+    argumentos = analizador.parse_args()
+
+    inicio_carga = time.perf_counter()
+    sesiones = cargar(argumentos.registro)
+    leidas = sesiones.precargar(argumentos.procesos)
+    print(f"{len(leidas)} sesiones leídas en {time.perf_counter() - inicio_carga:.2f} s")
+
+    # Consultar el catálogo, que ya tiene todas las vueltas del registro
+    if argumentos.circuito is not None or argumentos.tiempo_maximo is not None:
+        for fila in sesiones.buscar_vueltas(circuito=argumentos.circuito, tiempo_maximo=argumentos.tiempo_maximo):
+            tiempo = fila["tiempo"]
+            print(f"  {fila['circuito']}: {int(tiempo // 60):02d}:{tiempo % 60:06.3f} (sesión {fila['sesion']}, vuelta {fila['vuelta']})")
@@ -0,0 +1,246 @@
+import lzma
+import os
+from collections import ChainMap
+from collections.abc import Mapping
+from datetime import datetime
+from .cache import BYTES_CABECERA, IndiceSesiones, abrir_registro, fusionar_sesiones
+from .catalogo import filas_vueltas, filtrar_vueltas
+from .dialectos import MARCAS_MUESTRA, PREFIJO_SESION
+
+# Función para saber si un archivo es un registro de telemetría, comprimido o no
+def es_registro(ruta_archivo):
+    try:
+        with abrir_registro(ruta_archivo) as f:
+            inicio = f.read(BYTES_CABECERA)
+    except (OSError, EOFError, lzma.LZMAError):
+        return False
+    return PREFIJO_SESION in inicio or any(marca in inicio for marca in MARCAS_MUESTRA)
+
+# Función para obtener la fecha en la que empieza un registro, para ordenarlos
+def fecha_registro(ruta_archivo, indice):
+    """
+    Usa la primera sesión del registro ("dd/mm/aaaa hh:mm:ss.fff") o, si no
+    tiene ninguna cabecera, la fecha de modificación del archivo.
+    """
+    for sesion in indice.rangos:
+        try:
+            return datetime.strptime(sesion, "%d/%m/%Y %H:%M:%S.%f").timestamp()
+        except ValueError:
+            break
+    return os.path.getmtime(ruta_archivo)
+
+class IndiceArchivo(Mapping):
+    """
+    Índice de las sesiones de una carpeta de registros rotados (por ejemplo
+    los meses anteriores comprimidos con gzip y el del mes actual sin
+    comprimir), que se usa igual que el IndiceSesiones de un solo registro.
+    Cada archivo tiene su propio IndiceSesiones, con su caché junto a él, y
+    los archivos se recorren en orden cronológico por su primera sesión.
+    Si la rotación ha cortado una sesión, las muestras del principio del
+    archivo siguiente (las que hay antes de su primera cabecera) se añaden
+    a esa sesión al abrirla.
+    """
+    def __init__(self, ruta_carpeta, nombre, leer, calcular=None, como_listas=False, capacidad=8, progreso=None):
+        self.ruta_carpeta = ruta_carpeta
+        self.nombre = nombre
+        self.leer = leer
+        self.calcular = calcular
+        self.como_listas = como_listas
+        self.capacidad = capacidad
+        self.indices = {}  # ruta -> IndiceSesiones, del registro más antiguo al más reciente
+        self.descartados = {}  # ruta -> fecha de modificación de los archivos que no son registros
+        self.continuadas = {}  # sesion -> (ruta del registro siguiente, fin de sus muestras sin cabecera)
+        self.unidas = {}  # sesion -> vueltas con las muestras del registro siguiente ya añadidas
+        self.circuitos = ChainMap()
+
+        self.buscar_registros(progreso)
+
+    def __getitem__(self, sesion):
+        if sesion in self.unidas:
+            return self.unidas[sesion]
+        for indice in self.indices.values():
+            if sesion in indice:
+                vueltas = indice[sesion]
+                break
+        else:
+            raise KeyError(sesion)
+        if sesion in self.continuadas:
+            vueltas = self.unir(sesion, indice, vueltas)
+        return vueltas
+
+    def __contains__(self, sesion):
+        return any(sesion in indice for indice in self.indices.values())
+
+    def __iter__(self):
+        vistas = set()
+        for indice in self.indices.values():
+            for sesion in indice:
+                if sesion not in vistas:
+                    vistas.add(sesion)
+                    yield sesion
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    # Función para obtener la última sesión con datos del registro más reciente que tenga alguna
+    def ultima_sesion(self):
+        for indice in reversed(self.indices.values()):
+            sesion = indice.ultima_sesion()
+            if sesion is not None:
+                return sesion
+        return None
+
+    # Función para buscar los registros de la carpeta y ordenarlos
+    def buscar_registros(self, progreso=None):
+        """
+        Crea el índice de los registros nuevos, olvida los que ya no están
+        (por ejemplo, el que se acaba de comprimir con otro nombre) y vuelve
+        a ordenarlos. Devuelve las rutas de los registros nuevos.
+        `progreso` (opcional) recibe la fracción de la carpeta ya indexada.
+        """
+        nuevos = []
+        rutas = set()
+        nombres = sorted(os.listdir(self.ruta_carpeta))
+        for numero, nombre in enumerate(nombres):
+            ruta = os.path.join(self.ruta_carpeta, nombre)
+            if not os.path.isfile(ruta):
+                continue  # Las carpetas de la caché, entre otras
+            rutas.add(ruta)
+            if ruta in self.indices:
+                continue
+            fecha = os.path.getmtime(ruta)
+            if self.descartados.get(ruta) == fecha:
+                continue
+            if not es_registro(ruta):
+                self.descartados[ruta] = fecha
+                continue
+            self.descartados.pop(ruta, None)
+            # Cada registro ocupa la misma parte del progreso de la carpeta
+            progreso_registro = (lambda fraccion, numero=numero: progreso((numero + fraccion) / len(nombres))) if progreso else None
+            self.indices[ruta] = IndiceSesiones(ruta, self.nombre, self.leer, self.calcular, self.como_listas, self.capacidad, progreso_registro)
+            nuevos.append(ruta)
+
+        quitados = [ruta for ruta in self.indices if ruta not in rutas]
+        for ruta in quitados:
+            del self.indices[ruta]
+        if nuevos or quitados:
+            orden = sorted(self.indices, key=lambda ruta: fecha_registro(ruta, self.indices[ruta]))
+            self.indices = {ruta: self.indices[ruta] for ruta in orden}
+            # Si una sesión aparece en varios registros, sus circuitos son los del más antiguo
+            self.circuitos.maps = [indice.circuitos for indice in self.indices.values()]
+            self.buscar_continuaciones()
+        return nuevos
+
+    # Función para buscar las sesiones que la rotación ha partido entre dos registros
+    def buscar_continuaciones(self):
+        continuadas = {}
+        rutas = list(self.indices)
+        for anterior, siguiente in zip(rutas, rutas[1:]):
+            sesion = self.indices[anterior].sesion_final()
+            if sesion is None or sesion not in self.indices[anterior]:
+                continue
+            # Las muestras sin cabecera del principio del registro siguiente
+            indice = self.indices[siguiente]
+            hasta = min((rangos[0][0] for rangos in indice.rangos.values()), default=indice.escaneado)
+            if (siguiente, hasta) == self.continuadas.get(sesion):
+                continuadas[sesion] = (siguiente, hasta)
+                continue
+            with abrir_registro(siguiente) as f:
+                inicio = f.read(min(hasta, BYTES_CABECERA))
+            # Pueden ser solo las últimas líneas de datos de una muestra
+            if inicio.strip():
+                continuadas[sesion] = (siguiente, hasta)
+
+        # Las sesiones unidas con otra parte del registro siguiente se vuelven a unir al pedirlas
+        for sesion in list(self.unidas):
+            if continuadas.get(sesion) != self.continuadas.get(sesion):
+                del self.unidas[sesion]
+        self.continuadas = continuadas
+
+    # Función para añadir a una sesión las muestras que la rotación ha dejado en el registro siguiente
+    def unir(self, sesion, indice, vueltas):
+        ruta, hasta = self.continuadas[sesion]
+        _, estado = indice.abiertas[sesion]
+        # Copiar las listas para no alargar las de la sesión guardada en el índice del registro
+        unidas = {vuelta: {lista: list(valores) if isinstance(valores, list) else valores for lista, valores in datos.items()}
+                  for vuelta, datos in vueltas.items()}
+        if estado is not None:
+            leidas, circuitos, _ = self.leer(ruta, dict(estado, desplazamiento=0), 0, hasta)
+            for datos in fusionar_sesiones({sesion: unidas}, {}, leidas, circuitos):
+                if self.calcular:
+                    self.calcular(datos)
+        self.unidas[sesion] = unidas
+        return unidas
+
+    # Función para obtener solo algunas vueltas de una sesión, como IndiceSesiones.vueltas
+    def vueltas(self, sesion, numeros):
+        if sesion in self.continuadas:
+            vueltas = self[sesion]
+            return {vuelta: vueltas[vuelta] for vuelta in numeros if vuelta in vueltas}
+        for indice in self.indices.values():
+            if sesion in indice:
+                return indice.vueltas(sesion, numeros)
+        raise KeyError(sesion)
+
+    # Función para obtener los circuitos de las sesiones de todos los catálogos
+    def buscar_circuitos(self):
+        return sorted({circuito for indice in self.indices.values() for circuito in indice.buscar_circuitos()})
+
+    # Función para obtener [(sesion, circuito), ...] de todos los catálogos, de la más reciente a la más antigua
+    def buscar_sesiones(self, circuito=None):
+        sesiones = {}
+        for indice in self.indices.values():
+            for sesion, circuito_sesion in indice.buscar_sesiones(circuito):
+                sesiones.setdefault(sesion, circuito_sesion)
+        return sorted(sesiones.items(), reverse=True)
+
+    # Función para buscar vueltas en los catálogos de todos los registros, como IndiceSesiones.buscar_vueltas
+    def buscar_vueltas(self, sesion=None, circuito=None, tiempo_maximo=None):
+        """
+        Una sesión partida por la rotación se resume a partir de sus vueltas
+        ya unidas, porque el catálogo de cada registro solo tiene su parte
+        (los bytes de cada vuelta son los del registro en el que empieza).
+        """
+        if sesion in self.continuadas:
+            fin = next(indice.rangos[sesion][-1][2] for indice in self.indices.values() if sesion in indice)
+            filas = filas_vueltas(sesion, self.circuitos.get(sesion), self[sesion], fin)
+            return filtrar_vueltas(filas, circuito, tiempo_maximo)
+        filas = []
+        for indice in self.indices.values():
+            if sesion is None or sesion in indice:
+                filas.extend(indice.buscar_vueltas(sesion, circuito, tiempo_maximo))
+                if sesion is not None:
+                    break
+        if sesion is None:
+            filas.sort(key=lambda fila: fila["tiempo"])
+        return filas
+
+    # Función para leer de una vez todas las sesiones que no están en la caché
+    def precargar(self, procesos=None):
+        """
+        Precarga cada registro de la carpeta, del más antiguo al más reciente,
+        como IndiceSesiones.precargar. Devuelve las sesiones leídas.
+        """
+        leidas = []
+        for indice in self.indices.values():
+            leidas.extend(indice.precargar(procesos))
+        return leidas
+
+    # Función para incorporar lo que se ha añadido a la carpeta
+    def actualizar(self):
+        """
+        Actualiza cada registro y añade los registros nuevos de la carpeta.
+        Devuelve {sesion: {vuelta: datos nuevos}} como IndiceSesiones.actualizar;
+        las sesiones de los registros nuevos aparecen sin vueltas.
+        """
+        cambios = {}
+        for ruta in self.buscar_registros():
+            cambios.update((sesion, {}) for sesion in self.indices[ruta])
+        for ruta, indice in self.indices.items():
+            if os.path.exists(ruta):
+                cambios.update(indice.actualizar())
+        if cambios:
+            for sesion in cambios:
+                self.unidas.pop(sesion, None)
+            self.buscar_continuaciones()
+        return cambios
@@ -0,0 +1,634 @@
+import bz2
+import gzip
+import hashlib
+import json
+import lzma
+import mmap
+import os
+import zipfile
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .catalogo import Catalogo, filas_vueltas
+from .dialectos import MARCAS_MUESTRA, PREFIJO_SESION, marca_sesion
+
+# Versión del formato de la caché (cambiarla invalida las cachés existentes)
+VERSION_CACHE = 8
+
+# Bytes del inicio del registro que se usan para detectar si se ha sustituido
+BYTES_CABECERA = 64 * 1024
+
+# Bytes anteriores a la parte ya procesada que se usan para detectar si se ha reescrito
+BYTES_FINAL = 4 * 1024
+
+# Tamaño de los bloques en los que se recorre el registro al buscar las sesiones
+TAMANO_BLOQUE = 1024 * 1024
+
+# Extensión de los registros comprimidos -> función para abrirlos descomprimiendo al leer
+DESCOMPRESORES = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+# Registro comprimido leído por última vez, que se deja abierto para continuar
+# donde se quedó: [ruta, (tamaño, fecha de modificación), archivo]
+comprimido_abierto = [None, None, None]
+
+# Función para saber si un registro está comprimido
+def comprimido(ruta_archivo):
+    return os.path.splitext(ruta_archivo)[1].lower() in DESCOMPRESORES
+
+# Función para abrir un registro en binario, descomprimiéndolo al leer si está comprimido
+def abrir_registro(ruta_archivo):
+    abrir = DESCOMPRESORES.get(os.path.splitext(ruta_archivo)[1].lower(), open)
+    return abrir(ruta_archivo, "rb")
+
+# Función para obtener la carpeta de la caché junto al registro
+def ruta_cache(ruta_archivo, nombre):
+    return f"{ruta_archivo}.{nombre}"
+
+# Función para obtener la firma de los primeros `tamano` bytes del registro
+def firma_registro(ruta_archivo, tamano):
+    # Un registro comprimido no crece: se firma el archivo comprimido entero, sin descomprimirlo
+    if comprimido(ruta_archivo):
+        tamano = os.path.getsize(ruta_archivo)
+    with open(ruta_archivo, "rb") as f:
+        cabecera = f.read(min(tamano, BYTES_CABECERA))
+        f.seek(max(tamano - BYTES_FINAL, 0))
+        final = f.read(min(tamano, BYTES_FINAL))
+    return {
+        "tamano": tamano,
+        "hash_cabecera": hashlib.sha1(cabecera).hexdigest(),
+        "hash_final": hashlib.sha1(final).hexdigest()
+    }
+
+# Función para obtener hasta qué byte llegan las líneas completas del registro
+def fin_lineas_completas(ruta_archivo):
+    if comprimido(ruta_archivo):
+        # Sin acceso directo al final: recorrer todo el registro descomprimido
+        fin = 0
+        ultimo_salto = 0
+        with abrir_registro(ruta_archivo) as f:
+            while True:
+                bloque = f.read(TAMANO_BLOQUE)
+                if not bloque:
+                    return ultimo_salto
+                salto = bloque.rfind(b"\n")
+                if salto != -1:
+                    ultimo_salto = fin + salto + 1
+                fin += len(bloque)
+    with open(ruta_archivo, "rb") as f:
+        fin = f.seek(0, os.SEEK_END)
+        while fin > 0:
+            inicio = max(fin - BYTES_FINAL, 0)
+            f.seek(inicio)
+            salto = f.read(fin - inicio).rfind(b"\n")
+            if salto != -1:
+                return inicio + salto + 1
+            fin = inicio
+    return 0
+
+# Función para recorrer las líneas completas del registro a partir del byte `desde`
+def leer_lineas(ruta_archivo, desde, hasta=None):
+    """
+    Devuelve una a una, en bytes y sin el salto de línea, las líneas que
+    empiezan entre `desde` y `hasta` (o el final), sin la última si todavía
+    se está escribiendo. El registro se proyecta en memoria con mmap y se
+    parte en bloques, así que las líneas salen directamente de la caché de
+    páginas del sistema, sin búfer de lectura ni decodificarlas.
+    En un registro comprimido las posiciones son las del registro
+    descomprimido (ver leer_lineas_comprimido).
+    """
+    if comprimido(ruta_archivo):
+        yield from leer_lineas_comprimido(ruta_archivo, desde, hasta)
+        return
+    with open(ruta_archivo, "rb") as archivo:
+        fin = os.fstat(archivo.fileno()).st_size
+        if hasta is not None:
+            fin = min(fin, hasta)
+        if desde >= fin:
+            return
+        with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            while desde < fin:
+                # El bloque acaba en el último salto de línea antes de `fin`
+                corte = datos.rfind(b"\n", desde, min(desde + TAMANO_BLOQUE, fin))
+                if corte == -1:
+                    # Ninguna línea termina en el bloque: buscar el final de la que empieza en `desde`
+                    corte = datos.find(b"\n", min(desde + TAMANO_BLOQUE, fin))
+                    if corte == -1:
+                        # Una línea sin salto final todavía se está escribiendo
+                        return
+                yield from datos[desde:corte].split(b"\n")
+                desde = corte + 1
+
+# Función para recorrer las líneas de un registro comprimido a partir del byte `desde`
+def leer_lineas_comprimido(ruta_archivo, desde, hasta=None):
+    """
+    Como leer_lineas, pero descomprimiendo el registro por bloques. Para
+    llegar a `desde` hay que descomprimir todo lo anterior, así que el
+    archivo se queda abierto al terminar y nunca se lee más allá de `hasta`:
+    leer las sesiones en el orden del registro lo descomprime una sola vez
+    en lugar de empezar desde el principio en cada una.
+    """
+    estado_archivo = os.stat(ruta_archivo)
+    firma = (estado_archivo.st_size, estado_archivo.st_mtime_ns)
+    ruta, firma_abierto, archivo = comprimido_abierto
+    if ruta != ruta_archivo or firma_abierto != firma:
+        if archivo is not None:
+            archivo.close()
+        archivo = abrir_registro(ruta_archivo)
+        comprimido_abierto[:] = [ruta_archivo, firma, archivo]
+
+    posicion = desde  # Byte del registro descomprimido hasta el que se ha leído
+    resto = b""  # Principio de la línea que continúa en el siguiente bloque
+    while hasta is None or posicion < hasta:
+        # Otra lectura del mismo archivo puede haberlo movido entre dos bloques
+        if archivo.tell() != posicion:
+            archivo.seek(posicion)  # Hacia atrás vuelve a descomprimir desde el principio
+        bloque = archivo.read(TAMANO_BLOQUE if hasta is None else min(TAMANO_BLOQUE, hasta - posicion))
+        if not bloque:
+            # Una línea sin salto final todavía se está escribiendo
+            return
+        posicion += len(bloque)
+        lineas = (resto + bloque).split(b"\n")
+        resto = lineas.pop()
+        yield from lineas
+
+    # La última línea empieza antes de `hasta`: se devuelve entera
+    while resto:
+        if archivo.tell() != posicion:
+            archivo.seek(posicion)
+        bloque = archivo.read(TAMANO_BLOQUE)
+        if not bloque:
+            return
+        posicion += len(bloque)
+        salto = bloque.find(b"\n")
+        if salto != -1:
+            yield resto + bloque[:salto]
+            return
+        resto += bloque
+
+# Función para buscar las cabeceras de sesión entre dos bytes del registro
+def buscar_cabeceras(ruta_archivo, desde, hasta, progreso=None):
+    """
+    Devuelve [(inicio, fin_cabecera, sesion, circuito)] con cada línea
+    "=== Telemetría iniciada <fecha> <hora> <circuito> ===" completa entre
+    `desde` y `hasta`, en cualquiera de los dialectos del registro. Solo se
+    busca la marca en bloques grandes, sin separar el registro en líneas ni
+    decodificarlo. `progreso` (opcional) recibe tras cada bloque la
+    fracción del rango ya recorrida.
+    """
+    cabeceras = []
+    with abrir_registro(ruta_archivo) as f:
+        # Leer también el byte anterior para saber si `desde` es principio de línea
+        base = max(desde - 1, 0)
+        f.seek(base)
+        datos = b""
+        minimo = desde - base  # Las marcas anteriores a esta posición de `datos` ya se han tratado
+        while base + len(datos) < hasta:
+            bloque = f.read(min(TAMANO_BLOQUE, hasta - base - len(datos)))
+            if not bloque:
+                break
+            datos += bloque
+            if progreso:
+                progreso((base + len(datos) - desde) / max(hasta - desde, 1))
+            posicion = datos.find(PREFIJO_SESION, minimo)
+            while posicion != -1:
+                # La marca solo cuenta al principio de una línea
+                if base + posicion == 0 or datos[posicion - 1] == 0x0A:
+                    fin_linea = datos.find(b"\n", posicion)
+                    if fin_linea == -1:
+                        break
+                    marca, _ = marca_sesion(datos, posicion)
+                    if marca:
+                        linea = datos[posicion + len(marca):fin_linea].decode("utf-8", errors="replace").strip()
+                        partes = linea[:-3].strip().split(" ", 2) if linea.endswith("===") else []
+                        if len(partes) == 3:
+                            cabeceras.append((base + posicion, base + fin_linea + 1, f"{partes[0]} {partes[1]}", partes[2].strip()))
+                posicion = datos.find(PREFIJO_SESION, posicion + 1)
+
+            # Conservar el final del bloque por si una cabecera queda partida entre dos bloques
+            if posicion != -1:
+                corte = max(posicion - 1, 0)
+            else:
+                corte = max(len(datos) - len(PREFIJO_SESION), 0)
+            if corte:
+                base += corte
+                datos = datos[corte:]
+                minimo = 1
+    return cabeceras
+
+# Función para saber si los datos nuevos empiezan con el resto de la última muestra de una vuelta
+def muestra_partida(anteriores, datos):
+    """
+    Si la lectura anterior terminó a mitad de una muestra, la siguiente pone
+    el resto de sus líneas en otra fila con la misma marca de tiempo (la
+    fila anterior conserva su marca y el byte en el que empieza la muestra).
+    """
+    marcas = anteriores.get("marcas_tiempo")
+    nuevas = datos.get("marcas_tiempo")
+    return marcas is not None and nuevas is not None and len(marcas) > 0 and len(nuevas) > 0 and marcas[-1] == nuevas[0]
+
+# Función para juntar los campos de las dos partes de una muestra partida
+def unir_fila(anterior, nueva):
+    """
+    Cada campo está solo en una de las dos partes y en la otra es un hueco
+    (NaN, "" o False), así que se toma el de la parte nueva si lo tiene.
+    """
+    nueva_array = np.asarray(nueva)
+    if nueva_array.dtype.kind == "f":
+        hueco = np.isnan(nueva_array)
+    else:
+        hueco = nueva_array == nueva_array.dtype.type()
+    fila = np.where(hueco, np.asarray(anterior), nueva_array)
+    if isinstance(nueva, (list, tuple)):
+        return type(nueva)(fila.tolist())
+    return fila.tolist() if fila.ndim == 0 else fila
+
+# Función para añadir a las sesiones las leídas de la parte nueva del registro
+def fusionar_sesiones(sesiones, circuito_por_sesion, nuevas, nuevos_circuitos):
+    """
+    Añade al final de cada vuelta los datos nuevos y crea las sesiones y
+    vueltas que no existían. Devuelve los diccionarios de las vueltas que ya
+    existían y se han ampliado, para recalcular sus datos derivados.
+    """
+    ampliadas = []
+    for sesion, vueltas in nuevas.items():
+        vueltas_sesion = sesiones.setdefault(sesion, {})
+        for vuelta, datos in vueltas.items():
+            if vuelta not in vueltas_sesion:
+                vueltas_sesion[vuelta] = datos
+                continue
+            anteriores = vueltas_sesion[vuelta]
+            partida = muestra_partida(anteriores, datos)
+            for lista, valores in datos.items():
+                if lista not in anteriores:
+                    anteriores[lista] = valores
+                    continue
+                if partida:
+                    # La primera fila nueva completa la última fila de la vuelta
+                    if lista not in ("marcas_tiempo", "desplazamientos"):
+                        fila = unir_fila(anteriores[lista][-1], valores[0])
+                        if isinstance(anteriores[lista], list):
+                            anteriores[lista][-1] = fila
+                        else:
+                            anteriores[lista] = np.concatenate([anteriores[lista][:-1], [fila]])
+                    valores = valores[1:]
+                if isinstance(anteriores[lista], list):
+                    anteriores[lista].extend(valores)
+                elif len(valores):
+                    anteriores[lista] = np.concatenate([anteriores[lista], valores])
+            ampliadas.append(anteriores)
+    circuito_por_sesion.update(nuevos_circuitos)
+    return ampliadas
+
+# Función para leer los rangos de una sesión que aún no se han procesado
+def leer_sesion(ruta_archivo, leer, calcular, sesion, rangos, vueltas=None, estado=None):
+    """
+    Lee los rangos de la sesión desde el byte en el que terminó `estado`
+    y añade los datos a `vueltas`. Devuelve (vueltas, nuevas, circuitos,
+    estado), donde nuevas son las vueltas que han recibido datos.
+    No usa el índice, así que también se puede ejecutar en otro proceso.
+    """
+    vueltas = {} if vueltas is None else vueltas
+    nuevas = {}
+    circuitos = {}
+    for inicio, fin_cabecera, fin in rangos:
+        leido = estado["desplazamiento"] if estado else 0
+        if fin <= leido:
+            continue
+        # Continuar el rango a medio leer o empezar otro desde su cabecera
+        continuar = estado if inicio < leido else None
+        leidas, circuitos_leidos, estado = leer(ruta_archivo, continuar, inicio, fin)
+        for datos in fusionar_sesiones({sesion: vueltas}, circuitos, leidas, circuitos_leidos):
+            if calcular:
+                calcular(datos)
+        nuevas.update(leidas.get(sesion, {}))
+    return vueltas, nuevas, circuitos, estado
+
+class IndiceSesiones(Mapping):
+    """
+    Índice de las sesiones del registro con el rango de bytes de cada una.
+    Se usa como un diccionario sesion -> vueltas, pero al abrirlo solo se
+    buscan las cabeceras de sesión: las muestras de una sesión se leen la
+    primera vez que se pide y se conservan las `capacidad` últimas usadas.
+    Cada sesión leída se guarda en la caché junto al registro, con el estado
+    del lector, para no volver a leerla en los siguientes arranques, y sus
+    vueltas se resumen en el catálogo (`catalogo`), que permite listar y
+    filtrar sesiones y vueltas sin leer sus muestras.
+
+    leer(ruta_archivo, estado, desde, hasta) devuelve
+    (sesiones, circuito_por_sesion, estado) como leer_registro, y calcular
+    (opcional) recibe cada vuelta ampliada para recalcular sus datos derivados.
+    progreso (opcional) recibe la fracción del registro recorrida al indexarlo.
+    """
+    def __init__(self, ruta_archivo, nombre, leer, calcular=None, como_listas=False, capacidad=8, progreso=None):
+        self.ruta_archivo = ruta_archivo
+        self.ruta = ruta_cache(ruta_archivo, nombre)
+        self.leer = leer
+        self.calcular = calcular
+        self.como_listas = como_listas
+        self.capacidad = capacidad
+        self.rangos = {}  # sesion -> [[inicio, fin_cabecera, fin], ...] en orden del registro
+        self.circuitos = {}
+        self.con_datos = set()
+        self.escaneado = 0
+        self.abiertas = OrderedDict()  # sesion -> (vueltas, estado), de la menos a la más usada
+
+        self.cargar_indice()
+        self.catalogo = Catalogo(os.path.join(self.ruta, "catalogo.sqlite"), VERSION_CACHE)
+        if self.catalogo.vacio():
+            self.catalogar_sesiones(self)
+        if self.escanear(progreso):
+            self.guardar_indice()
+
+    def __getitem__(self, sesion):
+        if sesion not in self.con_datos:
+            raise KeyError(sesion)
+        if sesion in self.abiertas:
+            self.abiertas.move_to_end(sesion)
+            return self.abiertas[sesion][0]
+        return self.abrir(sesion)
+
+    def __contains__(self, sesion):
+        return sesion in self.con_datos
+
+    def __iter__(self):
+        return (sesion for sesion in self.rangos if sesion in self.con_datos)
+
+    def __len__(self):
+        return len(self.con_datos)
+
+    # Función para obtener la sesión cuyo rango llega al final del registro
+    def sesion_final(self):
+        if not self.rangos:
+            return None
+        return max(self.rangos, key=lambda sesion: self.rangos[sesion][-1][0])
+
+    # Función para obtener la sesión que el juego está escribiendo, si tiene datos
+    def ultima_sesion(self):
+        sesion = self.sesion_final()
+        return sesion if sesion in self.con_datos else None
+
+    # Función para ampliar el índice con lo escrito desde el último escaneo
+    def escanear(self, progreso=None):
+        """
+        Busca las cabeceras nuevas y alarga el rango de la última sesión.
+        Devuelve las sesiones con datos cuyo rango ha cambiado.
+        """
+        # Un registro comprimido es un archivo cerrado: basta con escanearlo una vez
+        if self.escaneado and comprimido(self.ruta_archivo):
+            return []
+        hasta = fin_lineas_completas(self.ruta_archivo)
+        if hasta <= self.escaneado:
+            return []
+
+        ultima = self.sesion_final()
+        cambiadas = [ultima] if ultima is not None else []
+        for inicio, fin_cabecera, sesion, circuito in buscar_cabeceras(self.ruta_archivo, self.escaneado, hasta, progreso):
+            if ultima is not None:
+                self.rangos[ultima][-1][2] = inicio
+            self.rangos.setdefault(sesion, []).append([inicio, fin_cabecera, hasta])
+            self.circuitos.setdefault(sesion, circuito)
+            ultima = sesion
+            cambiadas.append(sesion)
+        if ultima is not None:
+            self.rangos[ultima][-1][2] = hasta
+        self.escaneado = hasta
+
+        # Una sesión solo aparece cuando hay alguna muestra detrás de su cabecera
+        with abrir_registro(self.ruta_archivo) as f:
+            for sesion in cambiadas:
+                if sesion in self.con_datos:
+                    continue
+                for inicio, fin_cabecera, fin in self.rangos[sesion]:
+                    f.seek(fin_cabecera)
+                    bloque = f.read(min(fin - fin_cabecera, BYTES_FINAL))
+                    if any(marca in bloque for marca in MARCAS_MUESTRA):
+                        self.con_datos.add(sesion)
+                        break
+        cambiadas = [sesion for sesion in dict.fromkeys(cambiadas) if sesion in self.con_datos]
+        self.catalogar_sesiones(cambiadas)
+        return cambiadas
+
+    # Función para guardar en el catálogo el circuito y el rango de bytes de unas sesiones
+    def catalogar_sesiones(self, sesiones):
+        self.catalogo.guardar_sesiones([(sesion, self.circuitos.get(sesion), self.rangos[sesion][0][0], self.rangos[sesion][-1][2])
+                                        for sesion in sesiones])
+
+    # Función para guardar en el catálogo el resumen de las vueltas leídas de una sesión
+    def catalogar_vueltas(self, sesion, vueltas):
+        self.catalogo.guardar_vueltas(sesion, filas_vueltas(sesion, self.circuitos.get(sesion), vueltas, self.rangos[sesion][-1][2]))
+
+    # Función para leer las muestras de una sesión que aún no se han procesado
+    def leer_rangos(self, sesion, vueltas, estado):
+        vueltas, nuevas, circuitos, estado = leer_sesion(self.ruta_archivo, self.leer, self.calcular, sesion, self.rangos[sesion], vueltas, estado)
+        self.circuitos.update(circuitos)
+        return nuevas, estado
+
+    # Función para leer una sesión (desde la caché si es posible)
+    def abrir(self, sesion):
+        vueltas, estado = self.cargar_sesion(sesion) or ({}, None)
+        nuevas, estado = self.leer_rangos(sesion, vueltas, estado)
+        if nuevas:
+            self.guardar_sesion(sesion, vueltas, estado)
+            self.guardar_indice()
+        if nuevas or not self.catalogo.tiene_vueltas(sesion):
+            self.catalogar_vueltas(sesion, vueltas)
+        self.recordar(sesion, vueltas, estado)
+        return vueltas
+
+    # Función para obtener solo algunas vueltas de una sesión
+    def vueltas(self, sesion, numeros):
+        """
+        Devuelve {vuelta: datos} con las vueltas `numeros` que tiene la
+        sesión. Si la sesión no está abierta y la caché ya tiene todas sus
+        muestras, solo se cargan de la caché esas vueltas; si no, se lee
+        la sesión entera.
+        """
+        if sesion not in self.abiertas and sesion in self.con_datos:
+            cargada = self.cargar_sesion(sesion, numeros)
+            if cargada is not None and cargada[1] is not None and cargada[1]["desplazamiento"] >= self.rangos[sesion][-1][2]:
+                return cargada[0]
+        vueltas = self[sesion]
+        return {vuelta: vueltas[vuelta] for vuelta in numeros if vuelta in vueltas}
+
+    # Función para obtener los circuitos de las sesiones del catálogo
+    def buscar_circuitos(self):
+        return self.catalogo.buscar_circuitos()
+
+    # Función para obtener [(sesion, circuito), ...] de las sesiones del catálogo, de la más reciente a la más antigua
+    def buscar_sesiones(self, circuito=None):
+        return self.catalogo.buscar_sesiones(circuito)
+
+    # Función para buscar en el catálogo vueltas de una sesión o de todas las leídas
+    def buscar_vueltas(self, sesion=None, circuito=None, tiempo_maximo=None):
+        """
+        Como Catalogo.buscar_vueltas. Las vueltas de una sesión se catalogan
+        al leerla, así que si se pide una sesión que aún no se ha leído se lee
+        primero; para buscar en todas las sesiones hay que precargarlas.
+        """
+        if sesion is not None and sesion in self.con_datos and not self.catalogo.tiene_vueltas(sesion):
+            self[sesion]
+        return self.catalogo.buscar_vueltas(sesion, circuito, tiempo_maximo)
+
+    # Función para conservar una sesión leída entre las `capacidad` últimas usadas
+    def recordar(self, sesion, vueltas, estado):
+        self.abiertas[sesion] = (vueltas, estado)
+        self.abiertas.move_to_end(sesion)
+        while len(self.abiertas) > self.capacidad:
+            self.abiertas.popitem(last=False)
+
+    # Función para leer de una vez todas las sesiones que no están en la caché
+    def precargar(self, procesos=None):
+        """
+        Lee en paralelo las sesiones con datos que todavía no se han guardado
+        en la caché, repartiendo sus rangos de bytes entre `procesos` procesos
+        (uno por núcleo si es None). Con procesos=1 se leen una detrás de otra
+        en este mismo proceso. Para usar varios procesos, `leer` y `calcular`
+        tienen que estar en un módulo que se pueda importar (no en el script
+        que se ejecuta) y el script tiene que proteger su código con
+        `if __name__ == "__main__":`, porque en Windows cada proceso lo importa.
+        Un registro comprimido se lee siempre en este proceso y en orden, para
+        descomprimirlo una sola vez.
+        Devuelve las sesiones leídas.
+        """
+        pendientes = [sesion for sesion in self if sesion not in self.abiertas
+                      and not os.path.exists(os.path.join(self.ruta, self.archivo_sesion(sesion)))]
+        if comprimido(self.ruta_archivo):
+            pendientes.sort(key=lambda sesion: self.rangos[sesion][0][0])
+            procesos = 1
+        else:
+            # Las sesiones más largas primero, para que ningún proceso se quede solo al final
+            pendientes.sort(key=lambda sesion: sum(fin - inicio for inicio, _, fin in self.rangos[sesion]), reverse=True)
+
+        if procesos == 1 or len(pendientes) < 2:
+            for sesion in pendientes:
+                self.abrir(sesion)
+            return pendientes
+
+        with ProcessPoolExecutor(max_workers=procesos) as grupo:
+            futuros = {sesion: grupo.submit(leer_sesion, self.ruta_archivo, self.leer, self.calcular, sesion, self.rangos[sesion])
+                       for sesion in pendientes}
+            for sesion in pendientes:
+                vueltas, nuevas, circuitos, estado = futuros.pop(sesion).result()
+                self.circuitos.update(circuitos)
+                self.guardar_sesion(sesion, vueltas, estado)
+                self.catalogar_vueltas(sesion, vueltas)
+                self.recordar(sesion, vueltas, estado)
+        self.guardar_indice()
+        return pendientes
+
+    # Función para incorporar lo que se ha añadido al registro
+    def actualizar(self):
+        """
+        Amplía el índice y lee las muestras nuevas de las sesiones abiertas.
+        Devuelve {sesion: {vuelta: datos nuevos}} con las sesiones que han
+        cambiado; las que no están abiertas aparecen sin vueltas.
+        """
+        cambios = {}
+        for sesion in self.escanear():
+            if sesion in self.abiertas:
+                vueltas, estado = self.abiertas[sesion]
+                cambios[sesion], estado = self.leer_rangos(sesion, vueltas, estado)
+                self.abiertas[sesion] = (vueltas, estado)
+                if cambios[sesion]:
+                    self.catalogar_vueltas(sesion, vueltas)
+            else:
+                cambios[sesion] = {}
+        return cambios
+
+    # Función para cargar el índice guardado si el registro sigue empezando igual
+    def cargar_indice(self):
+        ruta = os.path.join(self.ruta, "indice.json")
+        if not os.path.exists(ruta):
+            return
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                indice = json.load(f)
+            if indice["version"] != VERSION_CACHE:
+                raise ValueError("versión distinta")
+            escaneado = indice["escaneado"]
+            # En un registro comprimido `escaneado` es una posición del registro descomprimido
+            if (not comprimido(self.ruta_archivo) and os.path.getsize(self.ruta_archivo) < escaneado) or firma_registro(self.ruta_archivo, escaneado) != indice["firma"]:
+                raise ValueError("el registro ha cambiado")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Caché '{self.ruta}' no válida, se vuelve a leer el registro: {e}")
+            self.borrar_cache()
+            return
+
+        for sesion, circuito, con_datos, rangos in indice["sesiones"]:
+            self.rangos[sesion] = rangos
+            self.circuitos[sesion] = circuito
+            if con_datos:
+                self.con_datos.add(sesion)
+        self.escaneado = escaneado
+
+    # Función para guardar el índice junto al registro
+    def guardar_indice(self):
+        indice = {
+            "version": VERSION_CACHE,
+            "firma": firma_registro(self.ruta_archivo, self.escaneado),
+            "escaneado": self.escaneado,
+            "sesiones": [[sesion, self.circuitos.get(sesion), sesion in self.con_datos, rangos] for sesion, rangos in self.rangos.items()]
+        }
+        self.escribir("indice.json", lambda f: f.write(json.dumps(indice).encode("utf-8")))
+
+    # Función para obtener el archivo de la caché de una sesión
+    def archivo_sesion(self, sesion):
+        return hashlib.sha1(sesion.encode("utf-8")).hexdigest()[:16] + ".npz"
+
+    # Función para guardar las vueltas leídas de una sesión
+    def guardar_sesion(self, sesion, vueltas, estado):
+        arrays = {}
+        for vuelta, datos in vueltas.items():
+            for lista, valores in datos.items():
+                arrays[f"{vuelta}/{lista}"] = np.asarray(valores)
+        arrays["meta"] = np.array(json.dumps({"sesion": sesion, "estado": estado}))
+        self.escribir(self.archivo_sesion(sesion), lambda f: np.savez(f, **arrays))
+
+    # Función para cargar las vueltas de una sesión desde la caché
+    def cargar_sesion(self, sesion, numeros=None):
+        """
+        Devuelve (vueltas, estado) o None si la sesión no está en la caché.
+        Con `numeros` solo se cargan esas vueltas.
+        """
+        ruta = os.path.join(self.ruta, self.archivo_sesion(sesion))
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with np.load(ruta, allow_pickle=False) as cache:
+                meta = json.loads(str(cache["meta"]))
+                if meta["sesion"] != sesion:
+                    return None
+                vueltas = {}
+                for clave in cache.files:
+                    if clave == "meta":
+                        continue
+                    vuelta, lista = clave.split("/", 1)
+                    if numeros is not None and int(vuelta) not in numeros:
+                        continue
+                    valores = cache[clave]
+                    vueltas.setdefault(int(vuelta), {})[lista] = valores.tolist() if self.como_listas else valores
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            print(f"Caché de la sesión {sesion} no válida, se vuelve a leer: {e}")
+            return None
+        return vueltas, meta["estado"]
+
+    # Función para escribir un archivo de la caché sin dejarlo a medias
+    def escribir(self, nombre, escribir):
+        ruta = os.path.join(self.ruta, nombre)
+        ruta_temporal = ruta + ".tmp"
+        try:
+            os.makedirs(self.ruta, exist_ok=True)
+            with open(ruta_temporal, "wb") as f:
+                escribir(f)
+            os.replace(ruta_temporal, ruta)
+        except OSError as e:
+            print(f"No se pudo guardar la caché '{ruta}': {e}")
+
+    # Función para borrar la caché cuando ya no corresponde al registro
+    def borrar_cache(self):
+        for nombre in os.listdir(self.ruta):
+            try:
+                os.remove(os.path.join(self.ruta, nombre))
+            except OSError:
+                pass
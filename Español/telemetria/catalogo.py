@@ -0,0 +1,170 @@
+import os
+import sqlite3
+import numpy as np
+
+# Tablas del catálogo: una fila por sesión con datos y otra por vuelta leída
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS sesiones (
+    sesion TEXT PRIMARY KEY,
+    circuito TEXT,
+    desde INTEGER,
+    hasta INTEGER
+);
+CREATE TABLE IF NOT EXISTS vueltas (
+    sesion TEXT,
+    vuelta INTEGER,
+    circuito TEXT,
+    tiempo REAL,
+    completa INTEGER,
+    muestras INTEGER,
+    velocidad_media REAL,
+    velocidad_maxima REAL,
+    clima TEXT,
+    desde INTEGER,
+    hasta INTEGER,
+    PRIMARY KEY (sesion, vuelta)
+);
+CREATE INDEX IF NOT EXISTS sesiones_circuito ON sesiones (circuito, sesion);
+CREATE INDEX IF NOT EXISTS vueltas_circuito_tiempo ON vueltas (circuito, tiempo);
+"""
+
+# Columnas de cada vuelta del catálogo, en el orden de la tabla
+COLUMNAS_VUELTA = ["sesion", "vuelta", "circuito", "tiempo", "completa", "muestras",
+                   "velocidad_media", "velocidad_maxima", "clima", "desde", "hasta"]
+
+# Función para resumir las vueltas leídas de una sesión en filas del catálogo
+def filas_vueltas(sesion, circuito, vueltas, hasta):
+    """
+    Devuelve un diccionario por vuelta con las columnas de COLUMNAS_VUELTA.
+    El tiempo de una vuelta es, como en grafica.py, el que pasa de su primera
+    a su última muestra, y solo las vueltas seguidas de otra están completas
+    (la última suele quedar sin terminar). Cada vuelta va del byte de su
+    primera muestra al de la primera de la vuelta siguiente (o `hasta`, el
+    final de la sesión).
+    """
+    filas = []
+    for vuelta, datos in vueltas.items():
+        marcas_tiempo = np.asarray(datos["marcas_tiempo"])
+        if not len(marcas_tiempo):
+            continue
+        velocidades = np.asarray(datos["velocidades"], dtype=float)
+        con_velocidad = velocidades[~np.isnan(velocidades)]
+        climas = [clima for clima in datos.get("climas", []) if clima]
+        filas.append({
+            "sesion": sesion,
+            "vuelta": vuelta,
+            "circuito": circuito,
+            "tiempo": float(marcas_tiempo[-1] - marcas_tiempo[0]),
+            "completa": vuelta != max(vueltas),
+            "muestras": len(marcas_tiempo),
+            "velocidad_media": float(con_velocidad.mean()) if len(con_velocidad) else None,
+            "velocidad_maxima": float(con_velocidad.max()) if len(con_velocidad) else None,
+            "clima": str(climas[-1]) if climas else None,
+            "desde": int(datos["desplazamientos"][0]),
+            "hasta": hasta
+        })
+    filas.sort(key=lambda fila: fila["desde"])
+    for fila, siguiente in zip(filas, filas[1:]):
+        fila["hasta"] = siguiente["desde"]
+    return sorted(filas, key=lambda fila: fila["vuelta"])
+
+# Función para convertir un tiempo "mm:ss.fff" (o solo segundos) en segundos
+def segundos_tiempo(texto):
+    minutos, _, segundos = texto.strip().replace(",", ".").rpartition(":")
+    return int(minutos or 0) * 60 + float(segundos)
+
+# Función para aplicar a unas filas ya calculadas los filtros de Catalogo.buscar_vueltas
+def filtrar_vueltas(filas, circuito=None, tiempo_maximo=None):
+    if circuito is not None:
+        filas = [fila for fila in filas if fila["circuito"] == circuito]
+    if tiempo_maximo is not None:
+        filas = [fila for fila in filas if fila["completa"] and fila["tiempo"] <= tiempo_maximo]
+    return filas
+
+class Catalogo:
+    """
+    Catálogo SQLite de las sesiones y vueltas de un registro, guardado en la
+    carpeta de su caché, para listar y filtrar sesiones y vueltas con
+    consultas indexadas sin leer sus muestras. Las sesiones se añaden al
+    escanear el registro y las vueltas cada vez que se lee una sesión, con su
+    tiempo, número de muestras, velocidad media y máxima, clima y los bytes
+    del registro en los que están. Si el archivo no se puede abrir, el
+    catálogo se guarda solo en memoria.
+    """
+    def __init__(self, ruta, version):
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            # El índice se puede abrir en un hilo y consultar después desde la ventana
+            self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+            if self.conexion.execute("PRAGMA user_version").fetchone()[0] != version:
+                self.conexion.executescript("DROP TABLE IF EXISTS sesiones; DROP TABLE IF EXISTS vueltas;")
+            self.conexion.executescript(ESQUEMA)
+        except (OSError, sqlite3.Error) as e:
+            print(f"No se pudo abrir el catálogo '{ruta}', se guarda en memoria: {e}")
+            self.conexion = sqlite3.connect(":memory:", check_same_thread=False)
+            self.conexion.executescript(ESQUEMA)
+        self.conexion.execute(f"PRAGMA user_version = {int(version)}")
+        self.conexion.row_factory = sqlite3.Row
+
+    # Función para saber si el catálogo no tiene ninguna sesión (por ejemplo, si se acaba de crear)
+    def vacio(self):
+        return self.conexion.execute("SELECT 1 FROM sesiones LIMIT 1").fetchone() is None
+
+    # Función para añadir o actualizar sesiones: [(sesion, circuito, desde, hasta), ...]
+    def guardar_sesiones(self, sesiones):
+        self.escribir(lambda: self.conexion.executemany("INSERT OR REPLACE INTO sesiones VALUES (?, ?, ?, ?)", sesiones))
+
+    # Función para sustituir las vueltas de una sesión por las de filas_vueltas
+    def guardar_vueltas(self, sesion, filas):
+        def escribir():
+            self.conexion.execute("DELETE FROM vueltas WHERE sesion = ?", (sesion,))
+            self.conexion.executemany(f"INSERT INTO vueltas VALUES ({', '.join('?' * len(COLUMNAS_VUELTA))})",
+                                      [[fila[columna] for columna in COLUMNAS_VUELTA] for fila in filas])
+        self.escribir(escribir)
+
+    # Función para hacer cambios en el catálogo en una sola transacción
+    def escribir(self, escribir):
+        try:
+            with self.conexion:
+                escribir()
+        except sqlite3.Error as e:
+            print(f"No se pudo guardar el catálogo: {e}")
+
+    # Función para saber si ya se han catalogado las vueltas de una sesión
+    def tiene_vueltas(self, sesion):
+        return self.conexion.execute("SELECT 1 FROM vueltas WHERE sesion = ? LIMIT 1", (sesion,)).fetchone() is not None
+
+    # Función para obtener los circuitos con alguna sesión
+    def buscar_circuitos(self):
+        return [fila[0] for fila in self.conexion.execute("SELECT DISTINCT circuito FROM sesiones WHERE circuito IS NOT NULL ORDER BY circuito")]
+
+    # Función para obtener [(sesion, circuito), ...] de la más reciente a la más antigua
+    def buscar_sesiones(self, circuito=None):
+        if circuito is None:
+            consulta = self.conexion.execute("SELECT sesion, circuito FROM sesiones ORDER BY sesion DESC")
+        else:
+            consulta = self.conexion.execute("SELECT sesion, circuito FROM sesiones WHERE circuito = ? ORDER BY sesion DESC", (circuito,))
+        return [tuple(fila) for fila in consulta]
+
+    # Función para buscar vueltas catalogadas
+    def buscar_vueltas(self, sesion=None, circuito=None, tiempo_maximo=None):
+        """
+        Devuelve un diccionario por vuelta con las columnas de COLUMNAS_VUELTA:
+        las de una sesión por número de vuelta o, sin sesión, las de todas las
+        sesiones de la más rápida a la más lenta. Con tiempo_maximo (segundos)
+        solo se devuelven las vueltas completas que no lo superan.
+        """
+        condiciones = []
+        parametros = []
+        if sesion is not None:
+            condiciones.append("sesion = ?")
+            parametros.append(sesion)
+        if circuito is not None:
+            condiciones.append("circuito = ?")
+            parametros.append(circuito)
+        if tiempo_maximo is not None:
+            condiciones.append("completa AND tiempo <= ?")
+            parametros.append(tiempo_maximo)
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        orden = "vuelta" if sesion is not None else "tiempo"
+        return [dict(fila) for fila in self.conexion.execute(f"SELECT * FROM vueltas {donde} ORDER BY {orden}", parametros)]
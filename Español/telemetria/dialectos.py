@@ -0,0 +1,70 @@
+import os
+
+# Formatos del registro según el idioma del mod que lo ha escrito
+# Cada dialecto tiene sus marcas de sesión y de muestra, las claves de la
+# cabecera de las muestras y el nombre de cada campo de datos, asociado a la
+# lista de la vuelta en la que se guarda (el mod en inglés escribe menos campos)
+DIALECTOS = {
+    "es": {
+        "sesion": "=== Telemetría iniciada ",
+        "muestra": "Telemetría | ",
+        "fecha": "Fecha",
+        "circuito": "Circuito",
+        "vuelta": "Vuelta",
+        "campos": {
+            "Velocidad": "velocidades",
+            "Velocidad de las ruedas": "velocidades_ruedas",
+            "Freno": "frenos",
+            "RPM": "rpms",
+            "Marcha": "marchas",
+            "Posición": "posiciones",
+            "Clima": "climas",
+            "Hora del juego": "horas_juego",
+            "Embrague": "embragues",
+            "Ángulo de giro": "angulos_giro",
+            "Turbo": "turbos",
+            "Pedal Acelerador": "pedales_acelerador",
+            "Temperatura del motor": "temperaturas_motor",
+            "Acelerador": "aceleradores",
+            "Nivel de suciedad": "suciedades",
+            "Luces": "luces",
+            "Luces Largas": "luces_largas",
+            "Dirección": "direcciones",
+        },
+    },
+    "en": {
+        "sesion": "=== Telemetry started ",
+        "muestra": "Telemetry | ",
+        "fecha": "Date",
+        "circuito": "Track",
+        "vuelta": "Lap",
+        "campos": {
+            "Speed": "velocidades",
+            "Brake": "frenos",
+            "RPM": "rpms",
+            "Gear": "marchas",
+            "Position": "posiciones",
+            "Direction": "direcciones",
+        },
+    },
+}
+
+# Marca de sesión de cada dialecto (en bytes) -> nombre del dialecto
+MARCAS_SESION = {dialecto["sesion"].encode("utf-8"): nombre for nombre, dialecto in DIALECTOS.items()}
+
+# Marcas de muestra de todos los dialectos (en bytes)
+MARCAS_MUESTRA = tuple(dialecto["muestra"].encode("utf-8") for dialecto in DIALECTOS.values())
+
+# Principio común de todas las marcas de sesión, que es lo que se busca en el registro
+PREFIJO_SESION = os.path.commonprefix(list(MARCAS_SESION))
+
+# Función para reconocer la marca de sesión que empieza en `posicion`
+def marca_sesion(datos, posicion=0):
+    """
+    Devuelve (marca, dialecto) si en esa posición de `datos` (bytes) empieza
+    la cabecera de sesión de algún dialecto, o (None, None) si no.
+    """
+    for marca, nombre in MARCAS_SESION.items():
+        if datos.startswith(marca, posicion):
+            return marca, nombre
+    return None, None
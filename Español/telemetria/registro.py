@@ -0,0 +1,494 @@
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+import os
+import threading
+import numpy as np
+from .archivo import IndiceArchivo
+from .cache import IndiceSesiones, leer_lineas
+from .dialectos import DIALECTOS, PREFIJO_SESION, marca_sesion
+
+# Nombre de la caché que comparten los scripts junto al registro
+NOMBRE_CACHE = "telemetria"
+
+# Número máximo de muestras de cada trozo al recorrer el registro por partes
+TAMANO_TROZO = 4096
+
+# Final de las cabeceras de sesión, igual en todos los dialectos
+FIN_SESION = b" ==="
+
+# Conversores de los valores de cada campo (reciben los bytes del valor)
+# Los decimales solo se recortan al leer la línea; se convierten todos a la vez al finalizar la vuelta
+def valor_decimal(valor):
+    return float(valor.replace(b",", b"."))
+
+def valor_texto(valor):
+    return valor.decode("utf-8", errors="replace").strip()
+
+def valor_con_sufijo(sufijo):
+    # Crea un conversor que exige y quita la unidad del final del valor
+    sufijo = sufijo.encode("utf-8")
+    def convertir(valor):
+        if not valor.endswith(sufijo):
+            raise ValueError(valor)
+        return valor[:-len(sufijo)]
+    return convertir
+
+def valor_vector(valor):
+    # "(x, y, z)" -> "x, y, z"
+    valor = valor.strip(b"()")
+    if valor.count(b", ") != 2:
+        raise ValueError(valor)
+    return valor
+
+def valor_hora_juego(valor):
+    hora, minuto, resto = valor.split(b":")
+    segundo, milisegundo = resto.split(b".")
+    return f"{int(hora):02d}:{int(minuto):02d}:{int(segundo):02d}.{int(milisegundo):04d}"
+
+def valor_booleano(valor):
+    if valor not in (b"True", b"False"):
+        raise ValueError(valor)
+    return valor == b"True"
+
+# Lista de la vuelta -> conversor de sus valores (None: se guardan los bytes tal cual)
+conversores = {
+    "velocidades": valor_con_sufijo(" km/h"),
+    "velocidades_ruedas": valor_con_sufijo(" km/h"),
+    "frenos": valor_con_sufijo("%"),
+    "rpms": None,
+    "marchas": None,
+    "posiciones": valor_vector,
+    "climas": valor_texto,
+    "horas_juego": valor_hora_juego,
+    "embragues": None,
+    "angulos_giro": valor_con_sufijo("º"),
+    "turbos": valor_con_sufijo("%"),
+    "pedales_acelerador": valor_con_sufijo("%"),
+    "temperaturas_motor": valor_con_sufijo("ºC"),
+    "aceleradores": valor_con_sufijo("%"),
+    "suciedades": valor_con_sufijo("%"),
+    "luces": valor_booleano,
+    "luces_largas": valor_booleano,
+    "direcciones": valor_vector,
+}
+
+# Función para preparar la tabla de un dialecto: la marca de muestra, las claves
+# de su cabecera y cada campo con su lista y su conversor, todo en bytes
+def compilar_dialecto(dialecto):
+    return (
+        dialecto["muestra"].encode("utf-8"),
+        dialecto["fecha"].encode("utf-8"),
+        dialecto["circuito"].encode("utf-8"),
+        dialecto["vuelta"].encode("utf-8"),
+        {clave.encode("utf-8"): (lista, conversores[lista]) for clave, lista in dialecto["campos"].items()},
+    )
+
+# Tablas de todos los dialectos, preparadas una sola vez al importar el módulo
+tablas_dialectos = {nombre: compilar_dialecto(dialecto) for nombre, dialecto in DIALECTOS.items()}
+
+# Tipo de NumPy de cada lista de una vuelta: (dtype, columnas, en_bloque)
+# Cada lista tiene un valor por muestra, alineado con marcas_tiempo (segundos desde 1970)
+# Las listas en bloque guardan los bytes de sus valores y los convierten al finalizar,
+# con NaN en las muestras a las que les falta el campo (por eso las marchas son decimales)
+# Las listas de texto y booleanas dejan "" y False en las muestras sin el campo
+tipos_listas = {
+    "velocidades": (np.float32, None, True),
+    "velocidades_ruedas": (np.float32, None, True),
+    "frenos": (np.float32, None, True),
+    "rpms": (np.float32, None, True),
+    "marchas": (np.float32, None, True),
+    "posiciones": (np.float32, 3, True),
+    "climas": (np.str_, None, False),
+    "horas_juego": (np.str_, None, False),
+    "embragues": (np.float32, None, True),
+    "angulos_giro": (np.float32, None, True),
+    "turbos": (np.float32, None, True),
+    "pedales_acelerador": (np.float32, None, True),
+    "temperaturas_motor": (np.float32, None, True),
+    "aceleradores": (np.float32, None, True),
+    "suciedades": (np.float32, None, True),
+    "luces": (np.bool_, None, False),
+    "luces_largas": (np.bool_, None, False),
+    "direcciones": (np.float32, 3, True),
+}
+
+class CanalCreciente:
+    """
+    Array de NumPy reservado por bloques que crece al añadir valores.
+    Evita guardar cada dato como objeto de Python mientras se lee el registro.
+    """
+    def __init__(self, tipo, columnas=None, capacidad=256):
+        forma = (capacidad,) if columnas is None else (capacidad, columnas)
+        self.datos = np.empty(forma, dtype=tipo)
+        self.cantidad = 0
+
+    def append(self, valor):
+        if self.cantidad == len(self.datos):
+            # Duplicar la capacidad reservada
+            self.datos = np.concatenate([self.datos, np.empty_like(self.datos)])
+        self.datos[self.cantidad] = valor
+        self.cantidad += 1
+
+    def finalizar(self):
+        return self.datos[:self.cantidad].copy()
+
+class CanalDecimal:
+    """
+    Guarda los bytes de los valores numéricos de una lista, con la muestra
+    (la fila) de la que viene cada uno, mientras se lee el registro y los
+    convierte todos juntos al finalizar: las comas decimales se cambian por
+    puntos en un solo reemplazo y NumPy interpreta todo el texto, en lugar
+    de convertir cada valor por separado en cada línea. Cada valor acaba en
+    la fila de su muestra y las muestras sin él quedan a NaN.
+    """
+    def __init__(self, tipo, columnas=None):
+        self.tipo = tipo
+        self.columnas = columnas
+        self.filas = []
+        self.valores = []
+        self.descartados = []  # Posiciones de los valores que no se han podido convertir
+
+    def append(self, fila, valor):
+        self.filas.append(fila)
+        self.valores.append(valor)
+
+    # Función para convertir un solo valor, si el bloque tiene alguno erróneo
+    def convertir(self, valor):
+        if self.columnas:
+            return [valor_decimal(parte) for parte in valor.split(b", ")]
+        if np.issubdtype(self.tipo, np.integer):
+            return int(valor)
+        return valor_decimal(valor)
+
+    # Función para convertir todos los valores a la vez
+    def convertir_todos(self):
+        texto = b" ".join(self.valores)
+        if self.columnas:
+            texto = texto.replace(b", ", b" ")
+        partes = texto.replace(b",", b".").split()
+        if len(partes) == len(self.valores) * (self.columnas or 1):
+            try:
+                datos = np.array(partes, dtype=self.tipo)
+                return datos.reshape(-1, self.columnas) if self.columnas else datos
+            except ValueError:
+                pass
+
+        # Algún valor no es un número: convertirlos uno a uno y descartar los erróneos
+        convertidos = []
+        for indice, valor in enumerate(self.valores):
+            try:
+                convertidos.append(self.convertir(valor))
+            except ValueError:
+                self.descartados.append(indice)
+        forma = (len(convertidos), self.columnas) if self.columnas else (len(convertidos),)
+        return np.array(convertidos, dtype=self.tipo).reshape(forma)
+
+    def finalizar(self, muestras):
+        datos = self.convertir_todos()
+        filas = np.delete(self.filas, self.descartados) if self.descartados else self.filas
+        forma = (muestras, self.columnas) if self.columnas else (muestras,)
+        alineados = np.full(forma, np.nan, dtype=self.tipo)
+        alineados[filas] = datos
+        return alineados
+
+class CanalFilas:
+    """
+    Valores ya convertidos (texto o booleanos) de una lista con la muestra
+    de la que viene cada uno. Al finalizar se colocan en la fila de su
+    muestra, con `vacio` en las muestras que no tienen el campo.
+    """
+    def __init__(self, tipo, vacio):
+        self.tipo = tipo
+        self.vacio = vacio
+        self.filas = []
+        self.valores = []
+
+    def append(self, fila, valor):
+        self.filas.append(fila)
+        self.valores.append(valor)
+
+    def finalizar(self, muestras):
+        valores = np.array(self.valores, dtype=self.tipo)
+        alineados = np.full(muestras, self.vacio, dtype=valores.dtype)
+        alineados[self.filas] = valores
+        return alineados
+
+class VueltaColumnar:
+    """
+    Almacena las listas de una vuelta mientras se lee el registro, con una
+    fila por muestra: cada cabecera de muestra abre una fila con su marca de
+    tiempo y el byte del registro en el que empieza, y los datos que la
+    siguen van a esa fila.
+    Al finalizar devuelve un diccionario con un array de NumPy por lista,
+    todos con una fila por muestra (posiciones y direcciones como arrays
+    (N, 3)), sin las duraciones.
+    """
+    def __init__(self):
+        self.marcas_tiempo = CanalCreciente(np.float64)
+        self.desplazamientos = CanalCreciente(np.int64)
+        self.listas = {}
+        for lista, (tipo, columnas, en_bloque) in tipos_listas.items():
+            if en_bloque:
+                self.listas[lista] = CanalDecimal(tipo, columnas)
+            else:
+                self.listas[lista] = CanalFilas(tipo, tipo())
+        self.abierta = False  # Si hay una fila a la que añadir datos
+
+    def __len__(self):
+        # Número de muestras
+        return self.marcas_tiempo.cantidad
+
+    # Función para empezar la fila de una muestra
+    def nueva_fila(self, marca_tiempo, desplazamiento):
+        self.marcas_tiempo.append(marca_tiempo)
+        self.desplazamientos.append(desplazamiento)
+        self.abierta = True
+
+    def append(self, lista, valor):
+        self.listas[lista].append(self.marcas_tiempo.cantidad - 1, valor)
+
+    def finalizar(self):
+        muestras = len(self)
+        datos = {"marcas_tiempo": self.marcas_tiempo.finalizar(), "desplazamientos": self.desplazamientos.finalizar()}
+        for lista, canal in self.listas.items():
+            datos[lista] = canal.finalizar(muestras)
+        return datos
+
+# Función para obtener los segundos desde 1970 del inicio de un día "dd/mm/aaaa"
+@lru_cache(maxsize=None)
+def segundos_dia(fecha):
+    dia, mes, anio = fecha.split("/")
+    return (date(int(anio), int(mes), int(dia)) - date(1970, 1, 1)).days * 86400.0
+
+# Función para convertir una marca "dd/mm/aaaa hh:mm:ss.fff" en segundos desde 1970
+def segundos_marca(marca):
+    # Los campos están siempre en la misma posición; la fecha solo cambia una vez al día
+    return segundos_dia(marca[:10]) + int(marca[11:13]) * 3600 + int(marca[14:16]) * 60 + float(marca[17:])
+
+# Función para calcular la duración de cada punto en relación al inicio de la vuelta
+def calcular_duraciones(datos):
+    marcas_tiempo = datos["marcas_tiempo"]
+    if len(marcas_tiempo):
+        datos["duraciones"] = marcas_tiempo - marcas_tiempo[0]
+    else:
+        datos["duraciones"] = np.empty(0)
+
+# Trozo de una vuelta: muestras seguidas de la vuelta como diccionario lista -> array
+Trozo = namedtuple("Trozo", ["sesion", "circuito", "vuelta", "datos"])
+
+class LecturaRegistro:
+    """
+    Recorre el registro recorriendo cada línea una sola vez y devuelve uno a
+    uno trozos de como mucho `tamano` muestras seguidas de una vuelta (sin
+    límite si es None), con la sesión, el circuito y la vuelta a los que
+    pertenecen. Los datos de cada trozo son arrays de NumPy como los de
+    leer_registro, con una fila por muestra y sin las duraciones, y no se guarda nada más, así que se
+    pueden calcular resúmenes de todo el registro con la memoria de un trozo.
+    Lee desde estado["desplazamiento"] (o desde el byte `desde`) hasta el
+    byte `hasta` (o el final); al terminar, `estado` es el punto en el que
+    se ha parado para poder continuar desde ahí.
+    Una cabecera de sesión sin muestras detrás (la que deja el juego al
+    final del registro) no da ningún trozo. El dialecto (el idioma del mod
+    que escribió el registro) se reconoce en cada cabecera de sesión, así
+    que un mismo registro puede mezclar ambos.
+    """
+    def __init__(self, ruta_archivo, estado=None, desde=0, hasta=None, tamano=TAMANO_TROZO):
+        self.ruta_archivo = ruta_archivo
+        self.estado = estado or {"desplazamiento": desde, "dialecto": None, "sesion_actual": None, "circuito_sesion": None, "vuelta_actual": None, "marca_tiempo_actual": None}
+        self.hasta = hasta
+        self.tamano = tamano
+
+    def __iter__(self):
+        desplazamiento = self.estado["desplazamiento"]
+        dialecto = self.estado["dialecto"]
+        sesion_actual = self.estado["sesion_actual"]
+        circuito_sesion = self.estado["circuito_sesion"]
+        vuelta_actual = self.estado["vuelta_actual"]
+        marca_tiempo_actual = self.estado["marca_tiempo_actual"]
+
+        # Tabla de campos del dialecto de la sesión en curso
+        if dialecto is not None:
+            inicio_muestra, clave_fecha, clave_circuito, clave_vuelta, campos = tablas_dialectos[dialecto]
+
+        # Continuar en la vuelta en la que terminó la lectura anterior
+        vuelta = None
+        if sesion_actual is not None and vuelta_actual is not None:
+            vuelta = VueltaColumnar()
+
+        for linea in leer_lineas(self.ruta_archivo, desplazamiento, self.hasta):
+            inicio_linea = desplazamiento
+            desplazamiento += len(linea) + 1
+            linea = linea.strip()
+
+            # Buscar inicio de sesión (en cualquier dialecto)
+            if linea.startswith(PREFIJO_SESION) and linea.endswith(FIN_SESION):
+                marca, nombre = marca_sesion(linea)
+                if marca is None:
+                    continue
+                cabecera = linea[len(marca):-len(FIN_SESION)].decode("utf-8", errors="replace").split(" ", 2)
+                if len(cabecera) < 3:
+                    continue
+                if vuelta is not None:
+                    yield Trozo(sesion_actual, circuito_sesion, vuelta_actual, vuelta.finalizar())
+                    vuelta = None
+                dialecto = nombre
+                inicio_muestra, clave_fecha, clave_circuito, clave_vuelta, campos = tablas_dialectos[dialecto]
+                fecha_sesion, hora_sesion, circuito = cabecera
+                sesion_actual = f"{fecha_sesion} {hora_sesion}"  # Combina fecha y hora
+                circuito_sesion = circuito.strip()
+                vuelta_actual = None
+                continue
+
+            # Si no estamos en ninguna sesión, saltar
+            if sesion_actual is None:
+                continue
+
+            # Cabecera de muestra: "Telemetría | Fecha: ... | Circuito: ... | Vuelta: N"
+            if linea.startswith(inicio_muestra):
+                numero_vuelta = vuelta_actual
+                for campo in linea.split(b" | ")[1:]:
+                    clave, _, valor = campo.partition(b": ")
+                    if clave == clave_fecha:
+                        marca_tiempo_actual = valor.decode("ascii", errors="replace")
+                    elif clave == clave_circuito:
+                        circuito_sesion = valor_texto(valor)
+                    elif clave == clave_vuelta and valor.isdigit():
+                        numero_vuelta = int(valor)
+
+                # Empezar un trozo nuevo al cambiar de vuelta o cuando el actual está lleno
+                if vuelta is None or numero_vuelta != vuelta_actual or (self.tamano and len(vuelta) >= self.tamano):
+                    if vuelta is not None:
+                        yield Trozo(sesion_actual, circuito_sesion, vuelta_actual, vuelta.finalizar())
+                    vuelta = VueltaColumnar() if numero_vuelta is not None else None
+                    vuelta_actual = numero_vuelta
+
+                # Cada muestra ocupa una fila, colocada por su marca de tiempo
+                if vuelta is not None:
+                    if marca_tiempo_actual:
+                        vuelta.nueva_fila(segundos_marca(marca_tiempo_actual), inicio_linea)
+                    else:
+                        vuelta.abierta = False
+                continue
+
+            # Línea de dato: "Clave: valor"
+            clave, _, valor = linea.partition(b": ")
+            campo = campos.get(clave)
+            if campo is None or vuelta is None:
+                continue
+
+            lista, convertir = campo
+            if convertir is None:
+                dato = valor
+            else:
+                try:
+                    dato = convertir(valor)
+                except ValueError:
+                    continue
+
+            if not vuelta.abierta:
+                # Final de una muestra que la lectura anterior dejó a medias: va en otra fila con su misma marca
+                if not marca_tiempo_actual:
+                    continue
+                vuelta.nueva_fila(segundos_marca(marca_tiempo_actual), inicio_linea)
+            vuelta.append(lista, dato)
+
+        if vuelta is not None:
+            yield Trozo(sesion_actual, circuito_sesion, vuelta_actual, vuelta.finalizar())
+
+        self.estado = {
+            "desplazamiento": desplazamiento,
+            "dialecto": dialecto,
+            "sesion_actual": sesion_actual,
+            "circuito_sesion": circuito_sesion,
+            "vuelta_actual": vuelta_actual,
+            "marca_tiempo_actual": marca_tiempo_actual
+        }
+
+# Función para juntar los trozos de una vuelta y calcular sus duraciones
+def unir_trozos(trozos):
+    if len(trozos) == 1:
+        datos = trozos[0]
+    else:
+        datos = {lista: np.concatenate([trozo[lista] for trozo in trozos]) for lista in trozos[0]}
+    calcular_duraciones(datos)
+    return datos
+
+# Función para leer y procesar el registro recorriendo cada línea una sola vez
+def leer_registro(ruta_archivo, estado=None, desde=0, hasta=None):
+    """
+    Lee el registro desde estado["desplazamiento"] (o desde el byte `desde`)
+    hasta el byte `hasta` (o el final) y devuelve
+    (sesiones, circuito_por_sesion, estado), donde estado es el punto en el
+    que ha terminado la lectura para poder continuar desde ahí.
+    Junta por vueltas los trozos de LecturaRegistro, así que una sesión solo
+    se añade cuando llega su primera muestra y una cabecera
+    "=== Telemetría iniciada" sin datos detrás se ignora sin tener que
+    modificar el archivo.
+    Todas las listas de una vuelta tienen una fila por muestra, alineadas
+    con marcas_tiempo, duraciones y desplazamientos (el byte del registro en
+    el que empieza cada muestra), con NaN (o "" y False en las de texto y
+    booleanas) en las muestras a las que les falta ese campo.
+    """
+    lectura = LecturaRegistro(ruta_archivo, estado, desde, hasta, tamano=None)
+    trozos = {}
+    circuito_por_sesion = {}
+    for trozo in lectura:
+        trozos.setdefault(trozo.sesion, {}).setdefault(trozo.vuelta, []).append(trozo.datos)
+        circuito_por_sesion[trozo.sesion] = trozo.circuito
+
+    # Convertir cada vuelta en un solo diccionario de arrays
+    sesiones = {}
+    for sesion, vueltas in trozos.items():
+        sesiones[sesion] = {vuelta: unir_trozos(datos) for vuelta, datos in vueltas.items()}
+    return sesiones, circuito_por_sesion, lectura.estado
+
+# Función para abrir un registro de telemetría
+def cargar(ruta_archivo, nombre=NOMBRE_CACHE, capacidad=8, progreso=None):
+    """
+    Devuelve el índice de sesiones del registro: un diccionario
+    sesion -> {vuelta: {lista: array}} que lee cada sesión al pedirla y la
+    guarda en la caché `nombre` junto al registro. Sus circuitos están en
+    el atributo `circuitos`.
+    El registro puede estar comprimido (.gz, .bz2 o .xz) o ser una carpeta de
+    registros rotados, que se leen como uno solo en orden cronológico.
+    `progreso` (opcional) recibe la fracción del registro ya indexada.
+    """
+    if os.path.isdir(ruta_archivo):
+        return IndiceArchivo(ruta_archivo, nombre, leer_registro, calcular_duraciones, capacidad=capacidad, progreso=progreso)
+    return IndiceSesiones(ruta_archivo, nombre, leer_registro, calcular_duraciones, capacidad=capacidad, progreso=progreso)
+
+class CargaEnSegundoPlano:
+    """
+    Abre un registro con cargar() en un hilo, para que las ventanas se
+    muestren mientras tanto, y deja leída su sesión más reciente, que es la
+    que se muestra al abrirlas. `progreso` es la fracción del registro ya
+    indexada; al terminar, `sesiones` tiene el índice o `error` la
+    excepción. Tk no se puede usar desde otro hilo, así que la ventana
+    consulta terminada() periódicamente con after().
+    """
+    def __init__(self, ruta_archivo, nombre=NOMBRE_CACHE, capacidad=8):
+        self.progreso = 0.0
+        self.sesiones = None
+        self.error = None
+        self.hilo = threading.Thread(target=self.indexar, args=(ruta_archivo, nombre, capacidad), daemon=True)
+        self.hilo.start()
+
+    # Función que se ejecuta en el hilo
+    def indexar(self, ruta_archivo, nombre, capacidad):
+        try:
+            sesiones = cargar(ruta_archivo, nombre, capacidad, self.anotar_progreso)
+            recientes = sesiones.buscar_sesiones()
+            if recientes:
+                sesiones[recientes[0][0]]
+            self.sesiones = sesiones
+        except Exception as e:
+            self.error = e
+
+    # Función para guardar la fracción indexada, que la ventana lee al refrescarse
+    def anotar_progreso(self, fraccion):
+        self.progreso = fraccion
+
+    # Función para saber si ya ha terminado (bien o con error)
+    def terminada(self):
+        return not self.hilo.is_alive()
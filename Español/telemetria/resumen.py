@@ -0,0 +1,69 @@
+import argparse
+import time
+import numpy as np
+from .registro import LecturaRegistro
+
+# Función para calcular la velocidad media de cada vuelta del registro
+def velocidades_medias(ruta_archivo):
+    """
+    Devuelve {(sesion, vuelta): velocidad media}, como la de grafica.py,
+    recorriendo el registro por trozos sin guardar las muestras.
+    """
+    sumas = {}  # (sesion, vuelta) -> [suma de las velocidades, número de velocidades]
+    for trozo in LecturaRegistro(ruta_archivo):
+        velocidades = trozo.datos["velocidades"]
+        suma = sumas.setdefault((trozo.sesion, trozo.vuelta), [0.0, 0])
+        # Las muestras sin velocidad están a NaN
+        suma[0] += float(np.nansum(velocidades, dtype=np.float64))
+        suma[1] += int(np.count_nonzero(~np.isnan(velocidades)))
+    return {vuelta: suma / cantidad for vuelta, (suma, cantidad) in sumas.items() if cantidad}
+
+# Función para buscar la vuelta más rápida de cada circuito
+def mejores_vueltas(ruta_archivo):
+    """
+    Devuelve {circuito: (tiempo, sesion, vuelta)} con la vuelta más rápida de
+    cada circuito en todo el registro, recorriéndolo por trozos. El tiempo de
+    una vuelta es, como en grafica.py, el que pasa de su primera a su última
+    muestra. Solo cuentan las vueltas completas, es decir, las que tienen otra
+    vuelta detrás en la misma sesión (la última suele quedar a medias).
+    """
+    vueltas = {}  # (sesion, vuelta) -> [circuito, primera marca, última marca]
+    ultima_vuelta = {}  # sesion -> número de su última vuelta
+    for trozo in LecturaRegistro(ruta_archivo):
+        ultima_vuelta[trozo.sesion] = max(ultima_vuelta.get(trozo.sesion, trozo.vuelta), trozo.vuelta)
+        marcas_tiempo = trozo.datos["marcas_tiempo"]
+        if not len(marcas_tiempo):
+            continue
+        clave = (trozo.sesion, trozo.vuelta)
+        if clave in vueltas:
+            vueltas[clave][0] = trozo.circuito
+            vueltas[clave][2] = marcas_tiempo[-1]
+        else:
+            vueltas[clave] = [trozo.circuito, marcas_tiempo[0], marcas_tiempo[-1]]
+
+    mejores = {}
+    for (sesion, vuelta), (circuito, inicio, fin) in vueltas.items():
+        if vuelta == ultima_vuelta[sesion]:
+            continue
+        tiempo = float(fin - inicio)
+        if circuito not in mejores or tiempo < mejores[circuito][0]:
+            mejores[circuito] = (tiempo, sesion, vuelta)
+    return mejores
+
+# Mostrar los resúmenes de todo el registro sin cargarlo en memoria
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(prog="python -m telemetria.resumen", description="Muestra la mejor vuelta de cada circuito y la velocidad media de cada vuelta del registro")
+    analizador.add_argument("registro", help="Ruta del registro de telemetría")
+    argumentos = analizador.parse_args()
+
+    inicio_lectura = time.perf_counter()
+    mejores = mejores_vueltas(argumentos.registro)
+    medias = velocidades_medias(argumentos.registro)
+
+    print("Mejor vuelta por circuito:")
+    for circuito, (tiempo, sesion, vuelta) in sorted(mejores.items()):
+        print(f"  {circuito}: {int(tiempo // 60):02d}:{tiempo % 60:06.3f} (sesión {sesion}, vuelta {vuelta})")
+    print("Velocidad media por vuelta:")
+    for (sesion, vuelta), media in medias.items():
+        print(f"  {sesion} vuelta {vuelta}: {media:.1f} km/h")
+    print(f"Registro resumido en {time.perf_counter() - inicio_lectura:.2f} s")
@@ -0,0 +1,140 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import tkinter as tk
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Line3D
+
+class VistaMapa3D:
+    """
+    Visualización 3D de las trazadas de una sesión dentro de un marco de Tk.
+    Dibuja directamente las posiciones del índice de sesiones que recibe, así
+    que grafica.py y mapa3D.py pueden compartir los datos ya leídos sin
+    volver a procesar el registro ni copiar las vueltas.
+    """
+    def __init__(self, master, sesiones, circuito_por_sesion):
+        self.sesiones = sesiones
+        self.circuito_por_sesion = circuito_por_sesion
+        self.sesion = None
+        self.lineas = {}  # vuelta -> línea 3D dibujada
+
+        # Crear figura 3D (sin pyplot, para no mezclarla con otras figuras abiertas)
+        self.figura = Figure(figsize=(8, 10))
+        self.ax = self.figura.add_subplot(111, projection='3d')
+        self.configurar_ejes()
+        self.ax.set_title("Seleccione una sesión", pad=20)
+
+        # Ajustar la relación de aspecto del gráfico
+        self.ax.set_box_aspect([1, 1, 0.1])
+
+        # Lienzo para el gráfico
+        self.lienzo = FigureCanvasTkAgg(self.figura, master=master)
+        self.lienzo.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        # Asociar eventos de scroll
+        self.lienzo.get_tk_widget().bind("<MouseWheel>", self.zoom)
+
+    # Función para quitar los ejes y los paneles del gráfico
+    def configurar_ejes(self):
+        self.ax.set_xticks([])
+        self.ax.set_yticks([])
+        self.ax.set_zticks([])
+        self.ax.grid(False)
+
+        for eje in [self.ax.xaxis, self.ax.yaxis, self.ax.zaxis]:
+            eje.pane.fill = False
+            eje.line.set_color((0.0, 0.0, 0.0, 0.0))
+
+    # Función para dibujar las vueltas de una sesión (todas si vueltas es None)
+    def mostrar(self, sesion, vueltas=None, colores=None):
+        self.ax.cla()
+        self.lineas = {}
+        self.sesion = sesion
+
+        if sesion not in self.sesiones:
+            self.lienzo.draw()
+            return
+
+        datos_sesion = self.sesiones[sesion]
+        if vueltas is None:
+            vueltas = list(datos_sesion)
+        if colores is None:
+            vueltas = [vuelta for vuelta in vueltas if vuelta in datos_sesion]
+            colores = plt.cm.viridis(np.linspace(0, 1, len(vueltas)))
+        # Cada vuelta conserva su color aunque otras no tengan datos
+        colores = dict(zip(vueltas, colores))
+        vueltas = [vuelta for vuelta in vueltas if vuelta in datos_sesion]
+
+        # Primero recolectamos todos los puntos para calcular los rangos (sin las muestras sin posición)
+        posiciones = [datos_sesion[vuelta]['posiciones'] for vuelta in vueltas if not np.isnan(datos_sesion[vuelta]['posiciones'][:, 0]).all()]
+
+        if not posiciones:
+            self.lienzo.draw()
+            return
+
+        # Calculamos los rangos de cada eje
+        minimos = np.min([np.nanmin(vuelta, axis=0) for vuelta in posiciones], axis=0)
+        maximos = np.max([np.nanmax(vuelta, axis=0) for vuelta in posiciones], axis=0)
+        rango_x, rango_y, rango_z = maximos - minimos
+
+        # Ajustamos la relación de aspecto basada en los rangos reales
+        relacion_aspecto = [rango_x, rango_y, rango_z * 0.2]  # Reducimos la importancia del eje Z
+        self.ax.set_box_aspect(relacion_aspecto)
+
+        # Dibujamos las vueltas con las columnas de sus posiciones, sin copiarlas
+        for vuelta in vueltas:
+            posiciones = datos_sesion[vuelta]['posiciones']
+            if len(posiciones):
+                x, y, z = posiciones.T
+                self.lineas[vuelta] = Line3D(x, y, z, color=colores[vuelta], alpha=0.7, linewidth=2,
+                                             label=f"Vuelta {vuelta}")
+                self.ax.add_line(self.lineas[vuelta])
+        self.ax.auto_scale_xyz(*zip(minimos, maximos), had_data=False)
+
+        # Configuración del gráfico
+        self.configurar_ejes()
+
+        # Ajustamos la vista para mejor perspectiva
+        self.ax.view_init(elev=30, azim=45)  # Ángulo de visualización
+
+        if sesion in self.circuito_por_sesion:
+            self.ax.set_title(f"Circuito: {self.circuito_por_sesion[sesion]}\nSesión: {sesion}", pad=20)
+
+        self.ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+        self.lienzo.draw()
+
+    # Función para alargar las trazadas de las vueltas que han recibido datos (modo directo)
+    def refrescar(self, vueltas):
+        datos_sesion = self.sesiones[self.sesion]
+        cambiadas = False
+        for vuelta in vueltas:
+            if vuelta in self.lineas:
+                x, y, z = datos_sesion[vuelta]['posiciones'].T
+                self.lineas[vuelta].set_data_3d(x, y, z)
+                cambiadas = True
+        if cambiadas:
+            self.lienzo.draw_idle()
+
+    # Función para manejar el zoom con la rueda del ratón
+    def zoom(self, evento):
+        if evento.delta > 0 or evento.num == 4:
+            escala = 0.9  # Acercar
+        else:
+            escala = 1.1  # Alejar
+
+        # Obtener límites actuales
+        limites_x = self.ax.get_xlim3d()
+        limites_y = self.ax.get_ylim3d()
+        limites_z = self.ax.get_zlim3d()
+
+        def escalar(limites):
+            medio = (limites[0] + limites[1]) / 2
+            rango = (limites[1] - limites[0]) * escala / 2
+            return (medio - rango, medio + rango)
+
+        self.ax.set_xlim3d(escalar(limites_x))
+        self.ax.set_ylim3d(escalar(limites_y))
+        self.ax.set_zlim3d(escalar(limites_z))
+
+        self.lienzo.draw()